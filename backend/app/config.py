@@ -49,6 +49,34 @@ class Settings(BaseSettings):
     # ===========================================
     database_url: str = f"sqlite+aiosqlite:///{BASE_DIR}/app.db"
 
+    # Ajustes de SQLite aplicados a cada conexión (ignorados en otros motores)
+    sqlite_wal: bool = True                     # journal_mode=WAL: lectores no bloquean al escritor
+    sqlite_synchronous: str = "NORMAL"          # Seguro con WAL y con muchos menos fsync que FULL
+    sqlite_busy_timeout_ms: int = 5000          # Esperar el lock en vez de fallar con "database is locked"
+    sqlite_mmap_size: int = 268435456           # 256 MB de lectura mapeada en memoria
+    sqlite_cache_size: int = -20000             # Negativo = KiB (~20 MB de caché de páginas)
+    sqlite_temp_store_memory: bool = True       # Tablas temporales (GROUP BY, ORDER BY) en memoria
+    sqlite_foreign_keys: bool = True            # Claves foráneas y sus ON DELETE CASCADE (no desactivar)
+    sqlite_optimize_interval_seconds: int = 3600  # PRAGMA optimize periódico (0 = desactivado)
+
+    # Base de datos de lectura para análisis y calendario (vacío = usar la principal).
+    # En SQLite puede ser el mismo archivo en modo solo lectura:
+    # sqlite+aiosqlite:///file:/ruta/app.db?mode=ro&uri=true
+    database_url_read: str = ""
+    database_read_pool_size: int = 5
+    database_read_pool_timeout_seconds: float = 0.5  # Espera máxima antes de leer del principal
+
+    # Registros borrados por lote al eliminar datos en segundo plano
+    delete_batch_size: int = 500
+
+    # Instrumentación de consultas por petición (cabecera Server-Timing)
+    query_instrumentation_enabled: bool = True
+    n_plus_one_threshold: int = 10  # Ejecuciones de la misma sentencia que se reportan como N+1
+
+    # Métricas en formato Prometheus en /metrics
+    metrics_enabled: bool = True
+    metrics_token: str = ""  # Si se define, /metrics exige "Authorization: Bearer <token>"
+
     # ===========================================
     # SEGURIDAD - JWT
     # ===========================================
@@ -56,6 +84,14 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080  # 7 días
 
+    # Caché de tokens verificados en get_current_user (0 desactiva)
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 1024
+
+    # Hashing bcrypt fuera del event loop
+    bcrypt_max_workers: int = 2    # Hilos dedicados a bcrypt
+    bcrypt_max_pending: int = 32   # Operaciones en cola/ejecución antes de responder 503
+
     # ===========================================
     # CORS - Orígenes Permitidos
     # ===========================================
@@ -68,6 +104,19 @@ class Settings(BaseSettings):
     vapid_private_key: str = ""
     vapid_claims_email: str = "mailto:admin@example.com"
 
+    # Entrega de notificaciones (pool HTTP keep-alive compartido)
+    push_max_concurrency: int = 64          # Envíos simultáneos como máximo
+    push_max_connections_per_origin: int = 16  # Conexiones abiertas por servicio push
+    push_timeout_seconds: float = 10.0
+
+    # Outbox de notificaciones (worker en segundo plano)
+    outbox_worker_enabled: bool = True
+    outbox_batch_size: int = 100            # Notificaciones por lote
+    outbox_poll_interval_seconds: float = 5.0
+    outbox_max_attempts: int = 5            # Intentos antes de marcarla como fallida
+    outbox_retry_base_seconds: float = 30.0  # Espera del primer reintento (se duplica en cada uno)
+    outbox_lease_seconds: float = 300.0     # Tras esto, una notificación tomada por un worker caído se reintenta
+
     @property
     def cors_origins_list(self) -> List[str]:
         """Convierte la cadena de orígenes CORS en una lista."""
@@ -1,8 +1,13 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as TimeoutPool
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase, Session
+import asyncio
 import logging
+from typing import Optional
 
-from app.config import get_settings
+from app.config import Settings, get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,88 @@ except Exception as e:
     logger.error(f"❌ Error al crear motor de base de datos: {str(e)}")
     raise
 
+
+def pragmas_sqlite(config: Settings, solo_lectura: bool = False) -> list[str]:
+    """
+    Construye la lista de PRAGMA a ejecutar en cada conexión SQLite.
+
+    Args:
+        config: Configuración con los ajustes sqlite_*
+        solo_lectura: Conexión de lectura: no cambia el journal_mode (es
+            persistente y lo fija el escritor) y activa query_only
+
+    Returns:
+        Sentencias PRAGMA en el orden en que deben ejecutarse
+    """
+    pragmas = [f"PRAGMA busy_timeout = {int(config.sqlite_busy_timeout_ms)}"]
+    if solo_lectura:
+        pragmas.append("PRAGMA query_only = ON")
+    elif config.sqlite_wal:
+        pragmas.append("PRAGMA journal_mode = WAL")
+    if config.sqlite_synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError(f"sqlite_synchronous inválido: {config.sqlite_synchronous}")
+    pragmas.append(f"PRAGMA synchronous = {config.sqlite_synchronous.upper()}")
+    pragmas.append(f"PRAGMA mmap_size = {int(config.sqlite_mmap_size)}")
+    pragmas.append(f"PRAGMA cache_size = {int(config.sqlite_cache_size)}")
+    if config.sqlite_temp_store_memory:
+        pragmas.append("PRAGMA temp_store = MEMORY")
+    pragmas.append(f"PRAGMA foreign_keys = {'ON' if config.sqlite_foreign_keys else 'OFF'}")
+    return pragmas
+
+
+def configurar_sqlite(motor: AsyncEngine, config: Settings, solo_lectura: bool = False) -> None:
+    """
+    Registra un hook de conexión que aplica los PRAGMA de SQLite configurados.
+
+    No hace nada si el motor no es SQLite.
+
+    Args:
+        motor: Motor asíncrono de SQLAlchemy
+        config: Configuración con los ajustes sqlite_*
+        solo_lectura: Ver pragmas_sqlite
+    """
+    if motor.dialect.name != "sqlite":
+        return
+
+    pragmas = pragmas_sqlite(config, solo_lectura)
+
+    @event.listens_for(motor.sync_engine, "connect")
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+async def optimizar_sqlite(motor: AsyncEngine) -> None:
+    """Ejecuta PRAGMA optimize para refrescar las estadísticas del planificador."""
+    if motor.dialect.name != "sqlite":
+        return
+    async with motor.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA optimize")
+
+
+async def optimizar_sqlite_periodicamente(motor: AsyncEngine, intervalo_segundos: int) -> None:
+    """
+    Tarea en segundo plano que ejecuta PRAGMA optimize cada cierto intervalo.
+
+    Args:
+        motor: Motor asíncrono de SQLAlchemy
+        intervalo_segundos: Segundos entre ejecuciones
+    """
+    while True:
+        await asyncio.sleep(intervalo_segundos)
+        try:
+            await optimizar_sqlite(motor)
+            logger.info("🧹 PRAGMA optimize ejecutado")
+        except Exception as e:
+            logger.warning(f"⚠️  No se pudo ejecutar PRAGMA optimize: {str(e)}")
+
+
+configurar_sqlite(engine, settings)
+
 # Crear la fábrica de sesiones asíncronas
 async_session = async_sessionmaker(
     engine,
@@ -33,11 +120,99 @@ async_session = async_sessionmaker(
 )
 
 
+def opciones_solo_lectura(motor: AsyncEngine) -> dict:
+    """
+    Opciones de ejecución para conexiones que solo leen.
+
+    - PostgreSQL: la transacción se abre en modo READ ONLY (equivale a
+      SET TRANSACTION READ ONLY; el servidor rechaza cualquier escritura)
+    - SQLite: ninguna. El driver solo emite BEGIN antes de la primera
+      escritura, así que los SELECT corren en transacciones diferidas de una
+      sentencia y no retienen locks; forzar AUTOCOMMIT solo agregaría dos
+      viajes al hilo de aiosqlite por checkout para cambiar y restaurar el modo.
+    """
+    if motor.dialect.name == "postgresql":
+        return {"postgresql_readonly": True}
+    return {}
+
+
+class SesionSoloLectura(Session):
+    """Sesión que rechaza escrituras del ORM: las rutas de lectura no deben modificar datos."""
+
+    def flush(self, objects=None) -> None:
+        if self.new or self.deleted or self.dirty:
+            raise RuntimeError("La sesión de solo lectura no admite escrituras")
+        super().flush(objects)
+
+
+# Motor para lecturas: comparte el pool del principal, con las opciones de solo lectura
+engine_lectura = engine.execution_options(**opciones_solo_lectura(engine))
+
+async_session_lectura = async_sessionmaker(
+    engine_lectura,
+    class_=AsyncSession,
+    sync_session_class=SesionSoloLectura,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
+
+def crear_engine_replica(config: Settings) -> Optional[AsyncEngine]:
+    """
+    Crea el motor de la base de datos de lectura, si está configurada.
+
+    Con PostgreSQL es una réplica; con SQLite, un pool propio de conexiones
+    al mismo archivo que solo leen: en WAL ven el último commit sin bloquear
+    al escritor ni competir con las conexiones del pool principal.
+    El pool es acotado y con espera corta para poder caer al principal.
+    """
+    if not config.database_url_read:
+        return None
+    motor = create_async_engine(
+        config.database_url_read,
+        echo=config.debug,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=config.database_read_pool_size,
+        max_overflow=0,
+        pool_timeout=config.database_read_pool_timeout_seconds,
+    )
+    configurar_sqlite(motor, config, solo_lectura=True)
+    return motor.execution_options(**opciones_solo_lectura(motor))
+
+
+engine_replica = crear_engine_replica(settings)
+
+async_session_replica = async_sessionmaker(
+    engine_replica,
+    class_=AsyncSession,
+    sync_session_class=SesionSoloLectura,
+    expire_on_commit=False,
+    autoflush=False,
+) if engine_replica is not None else async_session_lectura
+
+# Veces que una lectura pasó al principal por tener el pool de la réplica agotado
+respaldos_replica = 0
+
+
 # Clase base para todos los modelos ORM
 class Base(DeclarativeBase):
     pass
 
 
+
+def insert_con_conflictos(db: AsyncSession, modelo):
+    """
+    Retorna el insert() del dialecto de la sesión, que soporta ON CONFLICT.
+
+    SQLite y PostgreSQL exponen la misma API (on_conflict_do_nothing /
+    on_conflict_do_update), así que el código que lo usa es común a ambos.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(modelo)
+    return sqlite.insert(modelo)
+
+
 async def get_db() -> AsyncSession:
     """
     Generador de dependencia para obtener una sesión de base de datos.
@@ -54,6 +229,54 @@ async def get_db() -> AsyncSession:
             await session.close()  # Cerrar la sesión siempre
 
 
+async def get_db_lectura() -> AsyncSession:
+    """
+    Dependencia de sesión para rutas que solo leen.
+
+    No hace commit: al cerrar la sesión se descarta la transacción de solo
+    lectura (en SQLite ni siquiera se abre). Las escrituras del ORM fallan.
+    """
+    async with async_session_lectura() as session:
+        yield session
+
+
+async def abrir_sesion_replica(
+    fabrica_replica: async_sessionmaker,
+    fabrica_principal: async_sessionmaker
+) -> AsyncSession:
+    """
+    Abre una sesión de lectura en la réplica, o en el principal si su pool está agotado.
+
+    La conexión se pide al abrir la sesión, con la espera corta del pool de la
+    réplica: una consulta pesada de análisis no debe quedarse esperando cuando
+    el principal puede atenderla.
+    """
+    global respaldos_replica
+    if fabrica_replica is fabrica_principal:
+        return fabrica_principal()
+    session = fabrica_replica()
+    try:
+        await session.connection()
+        return session
+    except TimeoutPool:
+        await session.close()
+        respaldos_replica += 1
+        logger.warning("⚠️  Pool de lectura agotado, leyendo de la base de datos principal")
+        return fabrica_principal()
+
+
+async def get_db_replica() -> AsyncSession:
+    """
+    Dependencia de sesión para las lecturas pesadas (análisis y calendario).
+
+    Usa la base de datos de lectura si hay una configurada (`database_url_read`)
+    y la sesión de solo lectura del principal en caso contrario.
+    """
+    session = await abrir_sesion_replica(async_session_replica, async_session_lectura)
+    async with session:
+        yield session
+
+
 async def init_db():
     """
     Inicializar la base de datos creando todas las tablas definidas en los modelos.
@@ -0,0 +1,166 @@
+"""
+Instrumentación de consultas SQL por petición.
+
+Cuenta las sentencias y el tiempo de base de datos de cada petición con
+eventos del engine de SQLAlchemy y los expone en la cabecera Server-Timing:
+
+    Server-Timing: db;dur=12.40;desc="7 consultas", app;dur=31.02
+
+Si una misma sentencia se ejecuta más de `n_plus_one_threshold` veces en una
+petición se registra un warning y se agrega la entrada `n1` a la cabecera:
+casi siempre es una consulta dentro de un bucle (N+1). Las sentencias se
+comparan por su forma: el SQL con parámetros, con las listas IN (?, ?, ...)
+reducidas a una sola, así que no cuentan los valores concretos.
+
+Las consultas se atribuyen a la petición mediante una ContextVar, por lo que
+el trabajo en segundo plano (worker del outbox, tareas periódicas) no se mezcla.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Un parámetro en cualquiera de los estilos de los drivers soportados (asyncpg agrega "::TIPO")
+_PARAMETRO = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+(?:::\w+)?)"
+# Lista de dos o más parámetros, p. ej. "(?, ?, ?)" en un IN
+PATRON_LISTA_PARAMETROS = re.compile(rf"\(\s*{_PARAMETRO}(?:\s*,\s*{_PARAMETRO})+\s*\)")
+PATRON_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_sentencia(sentencia: str) -> str:
+    """Normaliza una sentencia para agrupar las que solo difieren en el largo de sus listas IN."""
+    sentencia = PATRON_LISTA_PARAMETROS.sub("(?)", sentencia)
+    return PATRON_ESPACIOS.sub(" ", sentencia).strip()
+
+
+class ConsultasPeticion:
+    """Sentencias ejecutadas durante una petición y el tiempo que tomaron."""
+
+    def __init__(self):
+        self.total = 0
+        self.duracion_segundos = 0.0
+        self.por_forma: Counter[str] = Counter()
+
+    def registrar(self, sentencia: str, duracion_segundos: float) -> None:
+        self.total += 1
+        self.duracion_segundos += duracion_segundos
+        self.por_forma[forma_sentencia(sentencia)] += 1
+
+    def repetidas(self, umbral: int) -> list[tuple[str, int]]:
+        """Formas ejecutadas más de `umbral` veces, de la más repetida a la menos."""
+        return [(forma, veces) for forma, veces in self.por_forma.most_common() if veces > umbral]
+
+
+_consultas_actuales: ContextVar[Optional[ConsultasPeticion]] = ContextVar(
+    "consultas_peticion", default=None
+)
+
+
+@contextmanager
+def medir_consultas() -> Iterator[ConsultasPeticion]:
+    """
+    Acumula las consultas ejecutadas dentro del bloque.
+
+    Las tareas creadas dentro del bloque heredan el contexto, así que sus
+    consultas también se cuentan.
+    """
+    consultas = ConsultasPeticion()
+    token = _consultas_actuales.set(consultas)
+    try:
+        yield consultas
+    finally:
+        _consultas_actuales.reset(token)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _consultas_actuales.get() is not None:
+        context._inicio_instrumentacion = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    consultas = _consultas_actuales.get()
+    inicio = getattr(context, "_inicio_instrumentacion", None)
+    if consultas is not None and inicio is not None:
+        consultas.registrar(statement, time.perf_counter() - inicio)
+
+
+def instrumentar_engine(motor: AsyncEngine) -> None:
+    """
+    Registra los eventos que atribuyen cada sentencia a la petición en curso.
+
+    Es idempotente: llamarla dos veces sobre el mismo motor no duplica conteos.
+    """
+    sync_engine = motor.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _antes_de_ejecutar):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(sync_engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+def server_timing(
+    consultas: ConsultasPeticion,
+    duracion_segundos: float,
+    repetidas: list[tuple[str, int]]
+) -> str:
+    """Arma el valor de la cabecera Server-Timing (duraciones en milisegundos)."""
+    descripcion = "1 consulta" if consultas.total == 1 else f"{consultas.total} consultas"
+    entradas = [
+        f'db;dur={consultas.duracion_segundos * 1000:.2f};desc="{descripcion}"',
+        f"app;dur={duracion_segundos * 1000:.2f}",
+    ]
+    if repetidas:
+        entradas.append(f'n1;desc="sentencia repetida {repetidas[0][1]} veces"')
+    return ", ".join(entradas)
+
+
+class MiddlewareConsultas:
+    """
+    Middleware ASGI que mide las consultas de cada petición HTTP.
+
+    La cabecera se escribe al iniciar la respuesta: en una respuesta en
+    streaming, las consultas hechas mientras se envía el cuerpo no aparecen.
+    """
+
+    def __init__(self, app: ASGIApp, umbral_n_mas_uno: Optional[int] = None):
+        self.app = app
+        self.umbral_n_mas_uno = (
+            settings.n_plus_one_threshold if umbral_n_mas_uno is None else umbral_n_mas_uno
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        with medir_consultas() as consultas:
+            async def enviar(mensaje: Message) -> None:
+                if mensaje["type"] == "http.response.start":
+                    repetidas = consultas.repetidas(self.umbral_n_mas_uno)
+                    for forma, veces in repetidas:
+                        logger.warning(
+                            f"⚠️  Posible N+1 en {scope['method']} {scope['path']}: "
+                            f"{veces} ejecuciones de: {forma[:300]}"
+                        )
+                    cabeceras = MutableHeaders(scope=mensaje)
+                    cabeceras.append(
+                        "Server-Timing",
+                        server_timing(consultas, time.perf_counter() - inicio, repetidas)
+                    )
+                await send(mensaje)
+
+            await self.app(scope, receive, enviar)
@@ -1,13 +1,28 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import logging
+import secrets
 import traceback
 
+from app import database
 from app.config import get_settings
-from app.database import init_db
-from app.routers import usuarios, categorias, habitos, registros, habito_dias, auth, analisis, notifications
+from app.database import engine, engine_replica, init_db, optimizar_sqlite, optimizar_sqlite_periodicamente
+from app.instrumentacion import MiddlewareConsultas, instrumentar_engine
+from app.metricas import (
+    TIPO_CONTENIDO,
+    MiddlewareMetricas,
+    instrumentar_pool,
+    razon_aciertos,
+    recolector_medidor,
+    registro as registro_metricas
+)
+from app.security import bcrypt_pendientes, cache_autenticacion
+from app.services.outbox import trabajador_outbox
+from app.services.push_service import push_service
+from app.routers import usuarios, categorias, habitos, registros, habito_dias, auth, analisis, notifications, exportar
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -27,9 +42,32 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Error al inicializar la aplicación: {str(e)}")
         logger.error(f"📋 Traceback: {traceback.format_exc()}")
         # No lanzar la excepción para que la app siga corriendo
+
+    # PRAGMA optimize periódico (solo SQLite)
+    tarea_optimizar = None
+    if engine.dialect.name == "sqlite" and settings.sqlite_optimize_interval_seconds > 0:
+        tarea_optimizar = asyncio.create_task(
+            optimizar_sqlite_periodicamente(engine, settings.sqlite_optimize_interval_seconds)
+        )
+
+    # Worker que entrega las notificaciones encoladas en el outbox
+    tarea_outbox = None
+    if settings.outbox_worker_enabled:
+        tarea_outbox = asyncio.create_task(trabajador_outbox.ejecutar())
+
     yield
     # Shutdown
     logger.info("👋 Cerrando aplicación...")
+    for tarea in (tarea_optimizar, tarea_outbox):
+        if tarea is not None:
+            tarea.cancel()
+            with suppress(asyncio.CancelledError):
+                await tarea
+    await push_service.cerrar()
+    with suppress(Exception):
+        await optimizar_sqlite(engine)
+    if engine_replica is not None:
+        await engine_replica.dispose()
 
 
 
@@ -70,6 +108,34 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Conteo de consultas y tiempo de base de datos por petición (Server-Timing)
+if settings.query_instrumentation_enabled:
+    instrumentar_engine(engine)
+    if engine_replica is not None:
+        instrumentar_engine(engine_replica)
+    app.add_middleware(MiddlewareConsultas)
+
+# Métricas Prometheus (la última en agregarse envuelve a las demás y mide la petición completa)
+if settings.metrics_enabled:
+    instrumentar_pool(engine)
+    if engine_replica is not None:
+        instrumentar_pool(engine_replica, "read")
+    app.add_middleware(MiddlewareMetricas)
+    for nombre, tipo, ayuda, leer in (
+        ("auth_cache_hits_total", "counter", "Aciertos de la caché de autenticación",
+         lambda: cache_autenticacion.aciertos),
+        ("auth_cache_misses_total", "counter", "Fallos de la caché de autenticación",
+         lambda: cache_autenticacion.fallos),
+        ("auth_cache_hit_ratio", "gauge", "Proporción de aciertos de la caché de autenticación",
+         lambda: razon_aciertos(cache_autenticacion.aciertos, cache_autenticacion.fallos)),
+        ("auth_cache_entries", "gauge", "Entradas en la caché de autenticación",
+         lambda: cache_autenticacion.estadisticas()["entries"]),
+        ("bcrypt_pending", "gauge", "Operaciones bcrypt en cola o en ejecución", bcrypt_pendientes),
+        ("db_read_fallback_total", "counter", "Lecturas atendidas por el principal con el pool de lectura agotado",
+         lambda: database.respaldos_replica),
+    ):
+        registro_metricas.agregar_recolector(recolector_medidor(nombre, ayuda, leer, tipo))
+
 
 # Handler explícito para OPTIONS (preflight CORS)
 @app.options("/{rest_of_path:path}")
@@ -125,6 +191,7 @@ app.include_router(registros.router, prefix="/api")
 app.include_router(habito_dias.router, prefix="/api")
 app.include_router(analisis.router, prefix="/api")
 app.include_router(notifications.router, prefix="/api")
+app.include_router(exportar.router, prefix="/api")
 
 
 @app.get("/")
@@ -146,10 +213,23 @@ async def health_check():
         "status": "healthy",
         "app": settings.app_name,
         "version": settings.api_version,
-        "environment": settings.environment
+        "environment": settings.environment,
+        "auth_cache": cache_autenticacion.estadisticas(),
+        "bcrypt_pending": bcrypt_pendientes()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Métricas en formato de texto de Prometheus."""
+    if not settings.metrics_enabled:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Not Found"})
+    autorizacion = request.headers.get("authorization", "")
+    if settings.metrics_token and not secrets.compare_digest(autorizacion, f"Bearer {settings.metrics_token}"):
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "No autorizado"})
+    return PlainTextResponse(registro_metricas.exponer(), media_type=TIPO_CONTENIDO)
+
+
 @app.get("/debug/cors")
 async def debug_cors():
     """Endpoint de debug para verificar configuración CORS."""
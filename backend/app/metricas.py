@@ -0,0 +1,348 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Un registro mínimo en memoria (contadores, medidores e histogramas con
+etiquetas) sin dependencias externas, expuesto en /metrics:
+
+- Peticiones HTTP: total y latencia por método, plantilla de ruta y estado,
+  y peticiones en curso
+- Pool de conexiones: espera al obtener una conexión, tamaño y en uso
+- Notificaciones push por resultado
+- Valores que se leen al exponer (aciertos de caché, bcrypt en cola...)
+  mediante recolectores
+
+Las etiquetas de ruta usan la plantilla ("/api/habitos/{habito_id}") y no la
+ruta concreta, para que la cantidad de series no crezca con los IDs.
+Las métricas son por proceso: con varias instancias, Prometheus las suma.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Iterable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Límites por defecto de los histogramas de latencia (segundos)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Esperas del pool: casi siempre 0, interesa ver cuándo deja de serlo
+BUCKETS_ESPERA_POOL = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    """Base de las métricas: nombre, ayuda, etiquetas y series por valores de etiqueta."""
+
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: dict) -> tuple:
+        return tuple(str(valores[nombre]) for nombre in self.etiquetas)
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for clave, valor in series:
+            lineas.extend(self._lineas_serie(clave, valor))
+        return lineas
+
+    def _lineas_serie(self, clave: tuple, valor) -> list[str]:
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}"]
+
+
+class Contador(_Metrica):
+    """Valor que solo crece."""
+
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def valor(self, **etiquetas) -> float:
+        return self._series.get(self._clave(etiquetas), 0)
+
+
+class Medidor(_Metrica):
+    """Valor que sube y baja (gauge)."""
+
+    tipo = "gauge"
+
+    def inc(self, valor: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def dec(self, valor: float = 1, **etiquetas) -> None:
+        self.inc(-valor, **etiquetas)
+
+    def set(self, valor: float, **etiquetas) -> None:
+        with self._lock:
+            self._series[self._clave(etiquetas)] = valor
+
+    def valor(self, **etiquetas) -> float:
+        return self._series.get(self._clave(etiquetas), 0)
+
+
+class Histograma(_Metrica):
+    """Distribución en buckets acumulados, con suma y cantidad de observaciones."""
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS_LATENCIA
+    ):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        # Índice del primer bucket cuyo límite es >= valor (el último es +Inf)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {"conteos": [0] * (len(self.buckets) + 1), "suma": 0.0}
+            serie["conteos"][indice] += 1
+            serie["suma"] += valor
+
+    def cantidad(self, **etiquetas) -> int:
+        serie = self._series.get(self._clave(etiquetas))
+        return sum(serie["conteos"]) if serie else 0
+
+    def _lineas_serie(self, clave: tuple, serie: dict) -> list[str]:
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip((*self.buckets, float("inf")), serie["conteos"]):
+            acumulado += conteo
+            le = f'le="{_formatear_numero(limite)}"'
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+        etiquetas = _etiquetas(self.etiquetas, clave)
+        lineas.append(f"{self.nombre}_sum{etiquetas} {_formatear_numero(serie['suma'])}")
+        lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+# Un recolector retorna (nombre, tipo, ayuda, [(etiquetas, valor)]) leídos al exponer
+Recolector = Callable[[], Iterable[tuple[str, str, str, Sequence[tuple[dict, float]]]]]
+
+
+class RegistroMetricas:
+    """Conjunto de métricas y recolectores que se exponen juntos."""
+
+    def __init__(self):
+        self._metricas: list[_Metrica] = []
+        self._recolectores: list[Recolector] = []
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self.registrar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Medidor:
+        return self.registrar(Medidor(nombre, ayuda, etiquetas))
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS_LATENCIA
+    ) -> Histograma:
+        return self.registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def agregar_recolector(self, recolector: Recolector) -> None:
+        """Agrega una función que aporta valores calculados en el momento de exponer."""
+        self._recolectores.append(recolector)
+
+    def exponer(self) -> str:
+        """Texto en formato de exposición de Prometheus."""
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+
+        # Varios recolectores pueden aportar series de la misma métrica (p. ej. un
+        # pool por engine); cada métrica se declara una sola vez
+        familias: dict[str, tuple[str, str, list]] = {}
+        for recolector in self._recolectores:
+            for nombre, tipo, ayuda, muestras in recolector():
+                familias.setdefault(nombre, (tipo, ayuda, []))[2].extend(muestras)
+        for nombre, (tipo, ayuda, muestras) in familias.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in muestras:
+                lineas.append(
+                    f"{nombre}{_etiquetas(list(etiquetas), list(etiquetas.values()))} "
+                    f"{_formatear_numero(valor)}"
+                )
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global de la aplicación
+registro = RegistroMetricas()
+
+peticiones_http = registro.contador(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+latencia_http = registro.histograma(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+)
+peticiones_en_curso = registro.medidor(
+    "http_requests_in_progress", "Peticiones HTTP en curso"
+)
+espera_pool = registro.histograma(
+    "db_pool_checkout_wait_seconds",
+    "Espera para obtener una conexión del pool (incluye abrirla si hace falta)",
+    buckets=BUCKETS_ESPERA_POOL
+)
+notificaciones_push = registro.contador(
+    "push_notifications_total", "Envíos push por resultado", ("result",)
+)
+
+
+@lru_cache(maxsize=1024)
+def _regex_sufijo(patron: str) -> re.Pattern:
+    return re.compile(patron.lstrip("^"))
+
+
+def plantilla_ruta(scope: Scope) -> str:
+    """
+    Plantilla de la ruta que atendió la petición, o "sin_ruta" si ninguna coincidió.
+
+    Según la versión de FastAPI, la ruta que queda en el scope es la del router
+    incluido, sin el prefijo de include_router ("/habitos/{habito_id}" en vez
+    de "/api/habitos/{habito_id}"). En ese caso el prefijo se toma de la parte
+    de la URL anterior a la que coincide con la ruta.
+    """
+    ruta = scope.get("route")
+    plantilla = getattr(ruta, "path_format", None) or getattr(ruta, "path", None)
+    if plantilla is None:
+        return "sin_ruta"
+    regex = getattr(ruta, "path_regex", None)
+    if regex is not None and not regex.match(scope["path"]):
+        coincidencia = _regex_sufijo(regex.pattern).search(scope["path"])
+        if coincidencia:
+            plantilla = scope["path"][:coincidencia.start()] + plantilla
+    return plantilla
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mide cada petición HTTP por plantilla de ruta."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        inicio = time.perf_counter()
+        peticiones_en_curso.inc()
+
+        async def enviar(mensaje: Message) -> None:
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            peticiones_en_curso.dec()
+            ruta = plantilla_ruta(scope)
+            latencia_http.observe(time.perf_counter() - inicio, method=scope["method"], route=ruta)
+            peticiones_http.inc(method=scope["method"], route=ruta, status=estado)
+
+
+@lru_cache(maxsize=None)
+def _pool_con_espera(clase: type) -> type:
+    """Subclase del pool que mide cuánto tarda cada checkout."""
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return clase._do_get(self)
+        finally:
+            espera_pool.observe(time.perf_counter() - inicio)
+
+    return type(f"{clase.__name__}ConEspera", (clase,), {"_do_get": _do_get})
+
+
+def instrumentar_pool(motor: AsyncEngine, nombre: str = "primary") -> None:
+    """
+    Mide la espera de checkout del pool y expone su tamaño y conexiones en uso.
+
+    SQLAlchemy no emite un evento antes de esperar por una conexión, así que
+    el pool pasa a ser una subclase que cronometra `_do_get`. Se hace con la
+    clase (y no con el objeto) para que sobreviva a `engine.dispose()`, que
+    recrea el pool con la misma clase.
+    """
+    pool = motor.sync_engine.pool
+    if type(pool).__name__.endswith("ConEspera"):
+        return
+    pool.__class__ = _pool_con_espera(type(pool))
+
+    def recolectar():
+        pool_actual = motor.sync_engine.pool
+        etiquetas = {"pool": nombre}
+        muestras = [
+            ("db_pool_size", "Conexiones que el pool mantiene abiertas", getattr(pool_actual, "size", None)),
+            ("db_pool_checked_out", "Conexiones del pool en uso", getattr(pool_actual, "checkedout", None)),
+            ("db_pool_overflow", "Conexiones abiertas por encima del tamaño del pool", getattr(pool_actual, "overflow", None)),
+        ]
+        for metrica, ayuda, leer in muestras:
+            if leer is not None:
+                yield metrica, "gauge", ayuda, [(etiquetas, leer())]
+
+    registro.agregar_recolector(recolectar)
+
+
+def recolector_medidor(nombre: str, ayuda: str, leer: Callable[[], float], tipo: str = "gauge") -> Recolector:
+    """Recolector de un solo valor sin etiquetas."""
+    def recolectar():
+        yield nombre, tipo, ayuda, [({}, leer())]
+    return recolectar
+
+
+def razon_aciertos(aciertos: float, fallos: float) -> float:
+    """Proporción de aciertos de una caché (0 si aún no hubo consultas)."""
+    total = aciertos + fallos
+    return aciertos / total if total else 0.0
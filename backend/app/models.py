@@ -1,5 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, func
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, func
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
+from app.utils import dias_a_mascara, proximo_recordatorio_utc
 
 
 class usuario(Base):
@@ -15,9 +19,35 @@ class usuario(Base):
     recordatorios_activos = Column(Boolean, default=False)
     hora_recordatorio = Column(String, default="08:00")  # Formato HH:MM
     timezone = Column(String, default="America/Santo_Domingo")
+    # Próximo recordatorio en UTC (NULL si no hay recordatorios activos)
+    next_reminder_at_utc = Column(DateTime, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Los datos dependientes los borra la base de datos (ON DELETE CASCADE):
+    # passive_deletes evita cargarlos para borrarlos uno por uno
+    habitos = relationship("habitos", cascade="all", passive_deletes=True, lazy="raise")
+    registros = relationship("registros", cascade="all", passive_deletes=True, lazy="raise")
+    rollups = relationship("daily_rollups", cascade="all", passive_deletes=True, lazy="raise")
+    suscripciones = relationship("push_subscriptions", cascade="all", passive_deletes=True, lazy="raise")
+    notificaciones = relationship("notification_outbox", cascade="all", passive_deletes=True, lazy="raise")
+
+    @validates("notificaciones_activas", "hora_recordatorio", "timezone")
+    def _sincronizar_proximo_recordatorio(self, key, value):
+        """Recalcula next_reminder_at_utc cuando cambia la configuración de recordatorios."""
+        config = {
+            "notificaciones_activas": self.notificaciones_activas,
+            "hora_recordatorio": self.hora_recordatorio,
+            "timezone": self.timezone,
+        }
+        config[key] = value
+        if config["notificaciones_activas"]:
+            self.next_reminder_at_utc = proximo_recordatorio_utc(
+                config["hora_recordatorio"], config["timezone"], datetime.now(timezone.utc)
+            )
+        else:
+            self.next_reminder_at_utc = None
+        return value
 
 
 class categorias(Base):
@@ -34,29 +64,46 @@ class habitos(Base):
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String, index=True, nullable=False)
     descripcion = Column(String, nullable=True)
-    categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=False)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=False, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
     unidad_medida = Column(String, nullable=False)
     meta_diaria = Column(Float, nullable=False)
     dias = Column(String, nullable=False)  # Store as JSON string
+    dias_mask = Column(Integer, nullable=False, default=0, server_default="0")  # Bit 0 = Lunes ... bit 6 = Domingo
     color = Column(String, nullable=False)
     activo = Column(Integer, default=1)  # 1 for True, 0 for False
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    progresos = relationship("progreso_habitos", cascade="all", passive_deletes=True, lazy="raise")
+    dias_habito = relationship("habito_dias", cascade="all", passive_deletes=True, lazy="raise")
+
+    __table_args__ = (
+        Index('ix_habitos_usuario_activo', 'usuario_id', 'activo'),
+    )
+
+    @validates("dias")
+    def _sincronizar_dias_mask(self, key, value):
+        """Mantiene dias_mask sincronizada con la lista JSON de días."""
+        self.dias_mask = dias_a_mascara(value)
+        return value
+
 class registros(Base):
     """Registro diario único por usuario y fecha"""
     __tablename__ = "registros"
 
     id = Column(Integer, primary_key=True, index=True)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
     fecha = Column(String, nullable=False)  # Formato: YYYY-MM-DD
     notas = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    progresos = relationship("progreso_habitos", cascade="all", passive_deletes=True, lazy="raise")
+
     # Unique constraint: un registro por usuario por día
     __table_args__ = (
+        Index('uq_registros_usuario_fecha', 'usuario_id', 'fecha', unique=True),
         {'sqlite_autoincrement': True},
     )
 
@@ -66,21 +113,38 @@ class progreso_habitos(Base):
     __tablename__ = "progreso_habitos"
 
     id = Column(Integer, primary_key=True, index=True)
-    registro_id = Column(Integer, ForeignKey("registros.id"), nullable=False)
-    habito_id = Column(Integer, ForeignKey("habitos.id"), nullable=False)
+    registro_id = Column(Integer, ForeignKey("registros.id", ondelete="CASCADE"), nullable=False)
+    habito_id = Column(Integer, ForeignKey("habitos.id", ondelete="CASCADE"), nullable=False)
     valor = Column(Float, default=0)  # Valor actual del progreso
     completado = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Cubre los progresos de un registro y los completados por registro/hábito
+        Index('ix_progreso_habitos_registro_habito', 'registro_id', 'habito_id', 'completado'),
+        Index('ix_progreso_habitos_habito_id', 'habito_id'),
+    )
+
+
+class daily_rollups(Base):
+    """Agregado diario precalculado por usuario y fecha (una fila por registro)"""
+    __tablename__ = "daily_rollups"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    fecha = Column(String, primary_key=True)  # Formato: YYYY-MM-DD
+    programados = Column(Integer, nullable=False, default=0)  # Hábitos que aplican ese día
+    completados = Column(Integer, nullable=False, default=0)  # Progresos completados ese día
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 class registro_habito_dias(Base):
     """Tabla intermedia para relación muchos a muchos entre registros y habito_dias"""
     __tablename__ = "registro_habito_dias"
 
     id = Column(Integer, primary_key=True, index=True)
-    registro_id = Column(Integer, ForeignKey("registros.id"), nullable=False)
-    habito_dia_id = Column(Integer, ForeignKey("habito_dias.id"), nullable=False)
+    registro_id = Column(Integer, ForeignKey("registros.id", ondelete="CASCADE"), nullable=False, index=True)
+    habito_dia_id = Column(Integer, ForeignKey("habito_dias.id", ondelete="CASCADE"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -88,7 +152,7 @@ class habito_dias(Base):
     __tablename__ = "habito_dias"
 
     id = Column(Integer, primary_key=True, index=True)
-    habito_id = Column(Integer, ForeignKey("habitos.id"), nullable=False)
+    habito_id = Column(Integer, ForeignKey("habitos.id", ondelete="CASCADE"), nullable=False, index=True)
     estado = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -99,10 +163,37 @@ class push_subscriptions(Base):
     __tablename__ = "push_subscriptions"
 
     id = Column(Integer, primary_key=True, index=True)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
     endpoint = Column(String, nullable=False, unique=True)
     p256dh_key = Column(String, nullable=False)  # Clave pública del cliente
     auth_key = Column(String, nullable=False)  # Token de autenticación
     user_agent = Column(String, nullable=True)  # Navegador/dispositivo
     activa = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_push_subscriptions_usuario_activa', 'usuario_id', 'activa'),
+    )
+
+
+class notification_outbox(Base):
+    """Notificaciones pendientes de entrega; un worker en segundo plano las envía en lotes"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
+    clave_idempotencia = Column(String, nullable=False, unique=True)  # ej: recordatorio:5:2024-05-01
+    titulo = Column(String, nullable=False)
+    cuerpo = Column(String, nullable=False)
+    url = Column(String, nullable=True)
+    estado = Column(String, nullable=False, default="pendiente")  # pendiente, enviando, enviada, fallida, descartada
+    intentos = Column(Integer, nullable=False, default=0)
+    disponible_en = Column(DateTime, nullable=False)  # UTC: próximo intento o fin del bloqueo del worker
+    ultimo_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    enviada_at = Column(DateTime, nullable=True)  # UTC
+
+    __table_args__ = (
+        # Cubre la búsqueda de notificaciones listas para enviar
+        Index('ix_notification_outbox_estado_disponible', 'estado', 'disponible_en'),
+    )
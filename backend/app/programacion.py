@@ -0,0 +1,96 @@
+"""
+Programación de hábitos por días de la semana.
+
+Cálculos sobre la máscara de días de un hábito (bit 0 = Lunes ... bit 6 =
+Domingo) que evitan recorrer el calendario día a día:
+
+- iterar_fechas_programadas: las fechas en que aplica, de forma perezosa
+- IndiceSemanal: conteos sobre un conjunto arbitrario de fechas (p. ej. las
+  fechas con registro) en O(7 · log n) por hábito
+"""
+
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Iterable, Iterator, Optional
+
+# Máscara con los 7 días de la semana
+SEMANA_COMPLETA = 0b1111111
+
+
+def _inicio_efectivo(inicio: date, creado: Optional[date]) -> date:
+    """El hábito no aplica antes de su fecha de creación."""
+    return creado if creado is not None and creado > inicio else inicio
+
+
+def _dias_hasta_siguiente(dias_mask: int, weekday: int) -> int:
+    """Días (0-6) desde `weekday` hasta el siguiente día incluido en la máscara."""
+    for salto in range(7):
+        if dias_mask & (1 << ((weekday + salto) % 7)):
+            return salto
+    raise ValueError("La máscara de días está vacía")
+
+
+def iterar_fechas_programadas(
+    dias_mask: int,
+    inicio: date,
+    fin: date,
+    creado: Optional[date] = None
+) -> Iterator[date]:
+    """
+    Genera de forma perezosa las fechas de [inicio, fin] en las que aplica un hábito.
+
+    Args:
+        dias_mask: Máscara de días del hábito
+        inicio: Primera fecha del rango (inclusive)
+        fin: Última fecha del rango (inclusive)
+        creado: Fecha de creación del hábito; no genera fechas anteriores
+
+    Yields:
+        Fechas programadas en orden ascendente
+    """
+    dias_mask &= SEMANA_COMPLETA
+    if not dias_mask:
+        return
+
+    fecha = _inicio_efectivo(inicio, creado)
+    while True:
+        fecha += timedelta(days=_dias_hasta_siguiente(dias_mask, fecha.weekday()))
+        if fecha > fin:
+            return
+        yield fecha
+        fecha += timedelta(days=1)
+
+
+class IndiceSemanal:
+    """
+    Índice de un conjunto de fechas agrupadas por día de la semana.
+
+    Permite contar cuántas fechas del conjunto aplican para un hábito (o cuál
+    es la primera) con búsquedas binarias, sin recorrer todas las fechas.
+    """
+
+    def __init__(self, fechas: Iterable[date]):
+        self._por_dia: list[list[date]] = [[] for _ in range(7)]
+        for fecha in fechas:
+            self._por_dia[fecha.weekday()].append(fecha)
+        for lista in self._por_dia:
+            lista.sort()
+
+    def contar(self, dias_mask: int, desde: Optional[date] = None) -> int:
+        """Cuenta las fechas del índice en los días de la máscara y >= desde."""
+        total = 0
+        for weekday, lista in enumerate(self._por_dia):
+            if dias_mask & (1 << weekday):
+                total += len(lista) - (bisect_left(lista, desde) if desde else 0)
+        return total
+
+    def primera(self, dias_mask: int, desde: Optional[date] = None) -> Optional[date]:
+        """Primera fecha del índice en los días de la máscara y >= desde."""
+        candidata = None
+        for weekday, lista in enumerate(self._por_dia):
+            if not dias_mask & (1 << weekday):
+                continue
+            pos = bisect_left(lista, desde) if desde else 0
+            if pos < len(lista) and (candidata is None or lista[pos] < candidata):
+                candidata = lista[pos]
+        return candidata
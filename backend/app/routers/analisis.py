@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_
 from typing import List
 from datetime import datetime, date
-import json
 
-from app.database import get_db
-from app.models import habitos, registros, progreso_habitos, usuario
+from app.database import get_db_replica
+from app.models import habitos, registros, progreso_habitos, usuario, daily_rollups
 from app.schemas import RendimientoDiaResponse, CumplimientoHabitoResponse
-from app.security import get_current_user
+from app.security import get_current_user_lectura
+from app.utils import dia_en_mascara
+from app.programacion import IndiceSemanal
 
 router = APIRouter(prefix="/analisis", tags=["analisis"])
 
@@ -19,22 +20,17 @@ def get_dia_letra(fecha: date) -> str:
     return dias_semana[fecha.weekday()]
 
 
-def dia_aplica_para_habito(dias_json: str, fecha: date) -> bool:
-    """Verifica si una fecha aplica para los días configurados del hábito."""
-    try:
-        dias = json.loads(dias_json) if dias_json else []
-        dia_letra = get_dia_letra(fecha)
-        return dia_letra in dias
-    except (json.JSONDecodeError, TypeError):
-        return False
+def dia_aplica_para_habito(dias_mask: int, fecha: date) -> bool:
+    """Verifica si una fecha aplica para la máscara de días del hábito."""
+    return dia_en_mascara(dias_mask, fecha)
 
 
 @router.get("/rendimiento", response_model=List[RendimientoDiaResponse])
 async def get_rendimiento_por_dia(
     fecha_inicio: str,  # Formato: YYYY-MM-DD
     fecha_fin: str,     # Formato: YYYY-MM-DD
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_replica)
 ):
     """
     Obtiene el rendimiento de hábitos por día en un rango de fechas.
@@ -63,81 +59,36 @@ async def get_rendimiento_por_dia(
             detail="Formato de fecha inválido. Use YYYY-MM-DD"
         )
 
-    # Obtener todas las fechas del rango donde el usuario tiene registros
-    fechas_query = (
-        select(registros.fecha)
+    # Agregados diarios precalculados (una fila por fecha con registro)
+    rollups_query = (
+        select(daily_rollups.fecha, daily_rollups.programados, daily_rollups.completados)
         .where(
             and_(
-                registros.usuario_id == current_user.id,
-                registros.fecha >= fecha_inicio,
-                registros.fecha <= fecha_fin
+                daily_rollups.usuario_id == current_user.id,
+                daily_rollups.fecha >= fecha_inicio,
+                daily_rollups.fecha <= fecha_fin
             )
         )
-        .distinct()
-        .order_by(registros.fecha)
-    )
-    fechas_result = await db.execute(fechas_query)
-    fechas = [row[0] for row in fechas_result.all()]
-
-    # Obtener todos los hábitos del usuario con sus días configurados y fecha de creación
-    habitos_query = (
-        select(habitos.id, habitos.dias, habitos.created_at)
-        .where(habitos.usuario_id == current_user.id)
+        .order_by(daily_rollups.fecha)
     )
-    habitos_result = await db.execute(habitos_query)
-    habitos_list = habitos_result.all()
-
-    respuesta = []
-    for fecha in fechas:
-        # Convertir fecha a objeto date si es string
-        if isinstance(fecha, str):
-            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
-        else:
-            fecha_obj = fecha
-
-        # Contar cuántos hábitos aplican para este día de la semana
-        # Solo contar hábitos que ya existían en esa fecha
-        habitos_del_dia = sum(
-            1 for h in habitos_list
-            if dia_aplica_para_habito(h.dias, fecha_obj) and h.created_at.date() <= fecha_obj
-        )
-
-        # Contar hábitos completados ese día
-        completados_query = (
-            select(func.count())
-            .select_from(progreso_habitos)
-            .join(registros, registros.id == progreso_habitos.registro_id)
-            .where(
-                and_(
-                    registros.usuario_id == current_user.id,
-                    registros.fecha == fecha,
-                    progreso_habitos.completado == True
-                )
-            )
-        )
-        completados_result = await db.execute(completados_query)
-        habitos_completados = completados_result.scalar() or 0
+    rollups_result = await db.execute(rollups_query)
 
-        # Convertir fecha a string si es necesario
-        fecha_str = fecha_obj.strftime("%Y-%m-%d") if isinstance(fecha_obj, date) else fecha
-
-        respuesta.append(
-            RendimientoDiaResponse(
-                fecha=fecha_str,
-                habitos=habitos_del_dia,
-                habitos_completados=habitos_completados
-            )
+    return [
+        RendimientoDiaResponse(
+            fecha=fecha,
+            habitos=programados,
+            habitos_completados=completados
         )
-
-    return respuesta
+        for fecha, programados, completados in rollups_result.all()
+    ]
 
 
 @router.get("/cumplimiento", response_model=List[CumplimientoHabitoResponse])
 async def get_cumplimiento_habitos(
     fecha_inicio: str,  # Formato: YYYY-MM-DD
     fecha_fin: str,     # Formato: YYYY-MM-DD
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_replica)
 ):
     """
     Obtiene el cumplimiento de cada hábito en un rango de fechas.
@@ -193,7 +144,7 @@ async def get_cumplimiento_habitos(
             habitos.id,
             habitos.nombre.label('nombre_habito'),
             habitos.color,
-            habitos.dias,
+            habitos.dias_mask,
             habitos.created_at
         )
         .where(habitos.usuario_id == current_user.id)
@@ -201,50 +152,44 @@ async def get_cumplimiento_habitos(
     habitos_result = await db.execute(habitos_query)
     habitos_list = habitos_result.all()
 
-    # Convertir fechas string a objetos date para poder obtener el día de la semana
-    fechas_date = []
-    for f in fechas:
-        if isinstance(f, str):
-            fechas_date.append(datetime.strptime(f, "%Y-%m-%d").date())
-        else:
-            fechas_date.append(f)
+    # Una sola consulta agrupada: pares (hábito, fecha) completados en el rango
+    completados_query = (
+        select(progreso_habitos.habito_id, registros.fecha)
+        .join(registros, registros.id == progreso_habitos.registro_id)
+        .where(
+            and_(
+                registros.usuario_id == current_user.id,
+                registros.fecha >= fecha_inicio,
+                registros.fecha <= fecha_fin,
+                progreso_habitos.completado == True
+            )
+        )
+        .group_by(progreso_habitos.habito_id, registros.fecha)
+    )
+    completados_result = await db.execute(completados_query)
+    completados_por_habito: dict[int, set[str]] = {}
+    for habito_id, fecha in completados_result.all():
+        completados_por_habito.setdefault(habito_id, set()).add(fecha)
+
+    # Índice de las fechas con registro por día de la semana: cada hábito se
+    # resuelve con búsquedas binarias en lugar de recorrer todas las fechas
+    indice_fechas = IndiceSemanal(
+        datetime.strptime(f, "%Y-%m-%d").date() if isinstance(f, str) else f
+        for f in fechas
+    )
 
     respuesta = []
     for habito in habitos_list:
-        # Para cada fecha, buscar si hay progreso (solo si aplica para ese día)
-        total_habitos = 0
-        habitos_completados = 0
-        fecha_primera = None
-
-        for fecha in fechas_date:
-            # Verificar si el hábito ya existía en esta fecha
-            if habito.created_at.date() > fecha:
-                continue
-            
-            # Verificar si el hábito aplica para este día de la semana
-            if not dia_aplica_para_habito(habito.dias, fecha):
-                continue
+        # Solo cuentan las fechas en que el hábito ya existía y aplica por día de la semana
+        creado = habito.created_at.date()
+        total_habitos = indice_fechas.contar(habito.dias_mask, desde=creado)
+        fecha_primera = indice_fechas.primera(habito.dias_mask, desde=creado)
 
-            # Buscar progreso para este hábito y fecha
-            fecha_str = fecha.strftime("%Y-%m-%d") if isinstance(fecha, date) else fecha
-            prog_query = (
-                select(progreso_habitos.completado)
-                .join(registros, registros.id == progreso_habitos.registro_id)
-                .where(
-                    and_(
-                        progreso_habitos.habito_id == habito.id,
-                        registros.fecha == fecha_str,
-                        registros.usuario_id == current_user.id
-                    )
-                )
-            )
-            prog_result = await db.execute(prog_query)
-            prog = prog_result.scalar()
-            total_habitos += 1
-            if prog:
+        habitos_completados = 0
+        for fecha_str in completados_por_habito.get(habito.id, ()):
+            fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+            if fecha >= creado and dia_aplica_para_habito(habito.dias_mask, fecha):
                 habitos_completados += 1
-            if fecha_primera is None or fecha < fecha_primera:
-                fecha_primera = fecha
 
         # Solo agregar si el hábito tiene al menos un día aplicable en el rango
         if total_habitos > 0:
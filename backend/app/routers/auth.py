@@ -4,21 +4,25 @@ Router de autenticación.
 Endpoints para registro, login y obtención del usuario actual.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, delete
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from app.database import get_db
-from app.models import usuario, registros, progreso_habitos, habitos
+from app.models import usuario
 from app.schemas import LoginRequest, RegisterRequest, TokenResponse, UsuarioResponse, UsuarioUpdate
 from app.security import (
     authenticate_user,
+    bloquear_usuario_en_eliminacion,
     create_access_token,
     get_current_user,
-    hash_password,
-    verify_password
+    get_current_user_lectura,
+    hash_password_async,
+    invalidar_usuario_en_cache,
+    verify_password_async
 )
+from app.services.eliminacion import eliminar_cuenta, eliminar_datos_usuario, eliminar_en_lotes
 
 
 class VerifyPasswordRequest(BaseModel):
@@ -76,7 +80,7 @@ async def register(
         )
 
     # Crear nuevo usuario con contraseña hasheada
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
 
     new_user = usuario(
         nombre=user_data.nombre,
@@ -175,7 +179,7 @@ async def login(
     description="Retorna los datos del usuario autenticado."
 )
 async def get_me(
-    current_user: usuario = Depends(get_current_user)
+    current_user: usuario = Depends(get_current_user_lectura)
 ) -> UsuarioResponse:
     """
     Obtiene los datos del usuario autenticado actual.
@@ -256,6 +260,7 @@ async def update_me(
         setattr(current_user, key, value)
 
     await db.commit()
+    invalidar_usuario_en_cache(current_user.id)
     await db.refresh(current_user)
 
     return UsuarioResponse(
@@ -290,7 +295,7 @@ async def verify_user_password(
     Raises:
         HTTPException 401: Si la contraseña es incorrecta
     """
-    if not verify_password(data.password, current_user.contrasena):
+    if not await verify_password_async(data.password, current_user.contrasena):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Contraseña incorrecta"
@@ -303,32 +308,26 @@ async def verify_user_password(
     "/delete-all-data",
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Eliminar todos los registros del usuario",
-    description="Elimina todos los registros y progresos del usuario autenticado, pero mantiene la cuenta."
+    description=(
+        "Elimina todos los registros y progresos del usuario autenticado, pero mantiene la cuenta. "
+        "Con en_segundo_plano=true responde 202 y borra por lotes tras la respuesta."
+    )
 )
 async def delete_all_user_data(
+    background_tasks: BackgroundTasks,
+    en_segundo_plano: bool = False,
     current_user: usuario = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Elimina todos los registros y progresos del usuario, pero mantiene la cuenta y los hábitos.
     """
-    # Obtener todos los registros del usuario
-    registros_result = await db.execute(
-        select(registros).where(registros.usuario_id == current_user.id)
-    )
-    registros_usuario = registros_result.scalars().all()
-    
-    # Eliminar progresos de cada registro
-    for registro in registros_usuario:
-        await db.execute(
-            delete(progreso_habitos).where(progreso_habitos.registro_id == registro.id)
-        )
-    
-    # Eliminar registros
-    await db.execute(
-        delete(registros).where(registros.usuario_id == current_user.id)
-    )
-    
+    if en_segundo_plano:
+        background_tasks.add_task(eliminar_en_lotes, current_user.id)
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+
+    # Un solo DELETE: los progresos se borran en cascada
+    await eliminar_datos_usuario(db, current_user.id)
     await db.commit()
 
 
@@ -336,38 +335,29 @@ async def delete_all_user_data(
     "/delete-account",
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Eliminar cuenta del usuario",
-    description="Elimina la cuenta del usuario y todos sus datos asociados."
+    description=(
+        "Elimina la cuenta del usuario y todos sus datos asociados. "
+        "Con en_segundo_plano=true responde 202 y borra por lotes tras la respuesta."
+    )
 )
 async def delete_user_account(
+    background_tasks: BackgroundTasks,
+    en_segundo_plano: bool = False,
     current_user: usuario = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Elimina la cuenta del usuario y todos sus datos (registros, progresos, hábitos).
     """
-    # Obtener todos los registros del usuario
-    registros_result = await db.execute(
-        select(registros).where(registros.usuario_id == current_user.id)
-    )
-    registros_usuario = registros_result.scalars().all()
-    
-    # Eliminar progresos de cada registro
-    for registro in registros_usuario:
-        await db.execute(
-            delete(progreso_habitos).where(progreso_habitos.registro_id == registro.id)
-        )
-    
-    # Eliminar registros
-    await db.execute(
-        delete(registros).where(registros.usuario_id == current_user.id)
-    )
-    
-    # Eliminar hábitos
-    await db.execute(
-        delete(habitos).where(habitos.usuario_id == current_user.id)
-    )
-    
-    # Eliminar usuario
-    await db.delete(current_user)
-    
+    usuario_id = current_user.id
+    if en_segundo_plano:
+        # Antes del 202: el token deja de autenticar mientras corren los lotes
+        bloquear_usuario_en_eliminacion(usuario_id)
+        background_tasks.add_task(eliminar_en_lotes, usuario_id, incluir_cuenta=True)
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+
+    # Un solo DELETE: hábitos, registros, progresos, agregados, suscripciones
+    # y notificaciones se borran en cascada
+    await eliminar_cuenta(db, usuario_id)
     await db.commit()
+    invalidar_usuario_en_cache(usuario_id)
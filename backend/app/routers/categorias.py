@@ -3,10 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
-from app.database import get_db
-from app.models import categorias, usuario
+from app.database import get_db, get_db_lectura
+from app.models import categorias, habitos, usuario
 from app.schemas import CategoriaCreate, CategoriaUpdate, CategoriaResponse
-from app.security import get_current_user
+from app.security import get_current_user, get_current_user_lectura
 
 router = APIRouter(prefix="/categorias", tags=["categorias"])
 
@@ -15,8 +15,8 @@ router = APIRouter(prefix="/categorias", tags=["categorias"])
 async def get_categorias(
     skip: int = 0,
     limit: int = 100,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene la lista de todas las categorías de hábitos (requiere autenticación)."""
     result = await db.execute(select(categorias).offset(skip).limit(limit))
@@ -26,8 +26,8 @@ async def get_categorias(
 @router.get("/{categoria_id}", response_model=CategoriaResponse)
 async def get_categoria(
     categoria_id: int,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene una categoría específica por su ID (requiere autenticación)."""
     result = await db.execute(select(categorias).where(categorias.id == categoria_id))
@@ -107,5 +107,13 @@ async def delete_categoria(
     if not db_categoria:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
 
+    # Con las claves foráneas activas, borrar una categoría en uso fallaría en la base de datos
+    en_uso = await db.scalar(select(select(habitos.id).where(habitos.categoria_id == categoria_id).exists()))
+    if en_uso:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La categoría tiene hábitos asociados; reasígnalos o elimínalos primero"
+        )
+
     await db.delete(db_categoria)
     await db.commit()
@@ -0,0 +1,203 @@
+"""
+Router de exportación del historial.
+
+`GET /api/export` envía todos los registros del usuario con sus progresos y
+los datos de cada hábito, en NDJSON (una línea por registro) o CSV (una fila
+por progreso), opcionalmente comprimidos con gzip.
+
+La consulta se lee con un cursor del lado del servidor (`stream()` con
+`yield_per`) y la respuesta es un StreamingResponse: la memoria usada no
+depende del largo del historial, solo del tamaño de lote y de bloque.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from enum import Enum
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app import database
+from app.models import categorias, habitos, progreso_habitos, registros, usuario
+from app.security import get_current_user_lectura
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Filas pedidas al cursor en cada vuelta
+FILAS_POR_LOTE = 1000
+# Bytes acumulados antes de enviar (y comprimir) un bloque
+TAMANO_BLOQUE = 64 * 1024
+
+COLUMNAS_CSV = [
+    "fecha", "registro_id", "notas", "habito_id", "habito", "categoria",
+    "unidad_medida", "meta_diaria", "color", "valor", "completado",
+]
+
+
+class FormatoExportacion(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+TIPOS_CONTENIDO = {
+    FormatoExportacion.ndjson: "application/x-ndjson",
+    FormatoExportacion.csv: "text/csv; charset=utf-8",
+}
+
+
+def consulta_exportacion(usuario_id: int):
+    """
+    Registros del usuario con sus progresos y hábitos, una fila por progreso.
+
+    Los registros sin progresos salen igual (LEFT JOIN) con las columnas del
+    progreso en NULL. El orden agrupa las filas de cada registro seguidas y
+    sigue el índice (usuario_id, fecha) de registros.
+    """
+    return (
+        select(
+            registros.id.label("registro_id"),
+            registros.fecha,
+            registros.notas,
+            progreso_habitos.habito_id,
+            progreso_habitos.valor,
+            progreso_habitos.completado,
+            habitos.nombre.label("habito"),
+            habitos.unidad_medida,
+            habitos.meta_diaria,
+            habitos.color,
+            categorias.nombre.label("categoria"),
+        )
+        .outerjoin(progreso_habitos, progreso_habitos.registro_id == registros.id)
+        .outerjoin(habitos, habitos.id == progreso_habitos.habito_id)
+        .outerjoin(categorias, categorias.id == habitos.categoria_id)
+        .where(registros.usuario_id == usuario_id)
+        .order_by(registros.fecha, registros.id, progreso_habitos.id)
+        .execution_options(yield_per=FILAS_POR_LOTE)
+    )
+
+
+def progreso_exportado(fila) -> dict:
+    return {
+        "habito_id": fila.habito_id,
+        "habito": fila.habito,
+        "categoria": fila.categoria,
+        "unidad_medida": fila.unidad_medida,
+        "meta_diaria": fila.meta_diaria,
+        "color": fila.color,
+        "valor": fila.valor,
+        "completado": bool(fila.completado),
+    }
+
+
+def linea_ndjson(registro: dict) -> str:
+    return json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+async def lineas_ndjson(filas) -> AsyncIterator[str]:
+    """Agrupa las filas consecutivas de un mismo registro en una línea JSON."""
+    actual: Optional[dict] = None
+    async for fila in filas:
+        if actual is None or actual["id"] != fila.registro_id:
+            if actual is not None:
+                yield linea_ndjson(actual)
+            actual = {"id": fila.registro_id, "fecha": fila.fecha, "notas": fila.notas, "progresos": []}
+        if fila.habito_id is not None:
+            actual["progresos"].append(progreso_exportado(fila))
+    if actual is not None:
+        yield linea_ndjson(actual)
+
+
+async def lineas_csv(filas) -> AsyncIterator[str]:
+    """Encabezado y una fila por progreso, repitiendo los datos del registro."""
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator="\n")
+
+    def linea(valores: list) -> str:
+        salida.seek(0)
+        salida.truncate()
+        escritor.writerow(valores)
+        return salida.getvalue()
+
+    yield linea(COLUMNAS_CSV)
+    async for fila in filas:
+        completado = "" if fila.habito_id is None else int(bool(fila.completado))
+        yield linea([
+            fila.fecha, fila.registro_id, fila.notas, fila.habito_id, fila.habito,
+            fila.categoria, fila.unidad_medida, fila.meta_diaria, fila.color,
+            fila.valor, completado,
+        ])
+
+
+async def exportar_historial(
+    usuario_id: int,
+    formato: FormatoExportacion,
+    comprimir: bool
+) -> AsyncIterator[bytes]:
+    """
+    Genera el cuerpo de la exportación en bloques de ~TAMANO_BLOQUE bytes.
+
+    Abre su propia sesión de lectura (réplica si hay una configurada): el
+    generador se consume después de que la ruta retorna, y la sesión de la
+    dependencia no tiene por qué seguir abierta para entonces.
+    """
+    compresor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if comprimir else None
+    lineas = lineas_ndjson if formato == FormatoExportacion.ndjson else lineas_csv
+
+    def bloque(partes: list[str]) -> bytes:
+        datos = "".join(partes).encode("utf-8")
+        return compresor.compress(datos) if compresor else datos
+
+    session = await database.abrir_sesion_replica(
+        database.async_session_replica, database.async_session_lectura
+    )
+    async with session:
+        filas = await session.stream(consulta_exportacion(usuario_id))
+        partes: list[str] = []
+        pendientes = 0
+        try:
+            async for texto in lineas(filas):
+                partes.append(texto)
+                pendientes += len(texto)
+                if pendientes >= TAMANO_BLOQUE:
+                    datos = bloque(partes)
+                    partes, pendientes = [], 0
+                    if datos:
+                        yield datos
+        finally:
+            await filas.close()
+
+    datos = bloque(partes)
+    if compresor:
+        datos += compresor.flush()
+    if datos:
+        yield datos
+
+
+@router.get("")
+async def exportar(
+    formato: FormatoExportacion = Query(FormatoExportacion.ndjson),
+    gzip: bool = Query(False, description="Comprimir la respuesta con gzip"),
+    current_user: usuario = Depends(get_current_user_lectura)
+):
+    """
+    Exporta todo el historial del usuario autenticado.
+
+    - **formato**: `ndjson` (un registro por línea con sus progresos anidados) o `csv` (una fila por progreso)
+    - **gzip**: si es true, el cuerpo va comprimido (`Content-Encoding: gzip`)
+    """
+    extension = formato.value + (".gz" if gzip else "")
+    cabeceras = {
+        "Content-Disposition": f'attachment; filename="marco-export-{date.today().isoformat()}.{extension}"'
+    }
+    if gzip:
+        cabeceras["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        exportar_historial(current_user.id, formato, gzip),
+        media_type=TIPOS_CONTENIDO[formato],
+        headers=cabeceras
+    )
@@ -3,29 +3,29 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
-from app.database import get_db
-from app.models import habito_dias
+from app.database import get_db, get_db_lectura
+from app.models import habito_dias, habitos
 from app.schemas import HabitoDiaCreate, HabitoDiaUpdate, HabitoDiaResponse
 
 router = APIRouter(prefix="/habito-dias", tags=["habito_dias"])
 
 
 @router.get("/", response_model=List[HabitoDiaResponse])
-async def get_habito_dias(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+async def get_habito_dias(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db_lectura)):
     """Obtiene la lista de todos los días de hábitos con paginación."""
     result = await db.execute(select(habito_dias).offset(skip).limit(limit))
     return result.scalars().all()
 
 
 @router.get("/habito/{habito_id}", response_model=List[HabitoDiaResponse])
-async def get_habito_dias_by_habito(habito_id: int, db: AsyncSession = Depends(get_db)):
+async def get_habito_dias_by_habito(habito_id: int, db: AsyncSession = Depends(get_db_lectura)):
     """Obtiene todos los días registrados para un hábito específico."""
     result = await db.execute(select(habito_dias).where(habito_dias.habito_id == habito_id))
     return result.scalars().all()
 
 
 @router.get("/{habito_dia_id}", response_model=HabitoDiaResponse)
-async def get_habito_dia(habito_dia_id: int, db: AsyncSession = Depends(get_db)):
+async def get_habito_dia(habito_dia_id: int, db: AsyncSession = Depends(get_db_lectura)):
     """Obtiene un día de hábito específico por su ID."""
     result = await db.execute(select(habito_dias).where(habito_dias.id == habito_dia_id))
     db_habito_dia = result.scalar_one_or_none()
@@ -37,6 +37,11 @@ async def get_habito_dia(habito_dia_id: int, db: AsyncSession = Depends(get_db))
 @router.post("/", response_model=HabitoDiaResponse, status_code=status.HTTP_201_CREATED)
 async def create_habito_dia(habito_dia_data: HabitoDiaCreate, db: AsyncSession = Depends(get_db)):
     """Crea un nuevo registro de día para un hábito."""
+    # Con las claves foráneas activas, un hábito inexistente fallaría en la base de datos
+    habito = await db.execute(select(habitos.id).where(habitos.id == habito_dia_data.habito_id))
+    if habito.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Hábito no encontrado")
+
     db_habito_dia = habito_dias(**habito_dia_data.model_dump())
     db.add(db_habito_dia)
     await db.commit()
@@ -1,49 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, delete
 from typing import List
 from datetime import date
 import logging
-import json
 
-from app.database import get_db
-from app.models import habitos, registros, progreso_habitos, usuario
+from app.database import get_db, get_db_lectura
+from app.models import habitos, registros, progreso_habitos, usuario, categorias
 from app.schemas import HabitoCreate, HabitoUpdate, HabitoResponse
-from app.security import get_current_user
-from app.utils import dia_en_lista, obtener_dia_letra
+from app.security import get_current_user, get_current_user_lectura
+from app.services.rollups import recalcular_rollups
+from app.utils import dia_en_mascara
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/habitos", tags=["habitos"])
-def dia_en_lista(dias_str: str, dia_letra: str) -> bool:
-    """
-    Verifica si un día está en la lista de días del hábito.
 
-    Args:
-        dias_str: String JSON con lista de días (ej: '["L", "M", "X"]')
-        dia_letra: Letra del día a verificar (L, M, X, J, V, S, D)
 
-    Returns:
-        True si el día está en la lista, False en caso contrario
+async def verificar_categoria_existe(categoria_id: int, db: AsyncSession) -> None:
+    """
+    Verifica que la categoría exista antes de asignarla a un hábito.
 
     Raises:
-        ValueError: Si dias_str no es un JSON válido
-        TypeError: Si el JSON no contiene una lista
+        HTTPException: 400 si la categoría no existe
     """
-    try:
-        dias = json.loads(dias_str)
-    except json.JSONDecodeError as e:
-        raise ValueError(
-            f"Error al parsear días del hábito. JSON inválido: {dias_str}"
-        ) from e
-
-    if not isinstance(dias, list):
-        raise TypeError(
-            f"El campo 'dias' debe ser una lista, no {type(dias).__name__}. "
-            f"Valor recibido: {dias_str}"
-        )
-
-    return dia_letra in dias
+    result = await db.execute(select(categorias.id).where(categorias.id == categoria_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=400, detail="La categoría no existe")
 
 
 async def agregar_habito_a_registro_hoy(
@@ -142,8 +125,8 @@ async def quitar_habito_de_registro_hoy(
 async def get_habitos(
     skip: int = 0,
     limit: int = 100,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene todos los hábitos del usuario autenticado con paginación."""
     result = await db.execute(
@@ -158,8 +141,8 @@ async def get_habitos(
 @router.get("/{habito_id}", response_model=HabitoResponse)
 async def get_habito(
     habito_id: int,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene un hábito específico por su ID (solo si pertenece al usuario)."""
     result = await db.execute(
@@ -180,6 +163,8 @@ async def create_habito(
     db: AsyncSession = Depends(get_db)
 ):
     """Crea un nuevo hábito para el usuario autenticado."""
+    await verificar_categoria_existe(habito_data.categoria_id, db)
+
     # Agregar el usuario_id del usuario autenticado
     habito_dict = habito_data.model_dump()
     habito_dict['usuario_id'] = current_user.id
@@ -189,10 +174,15 @@ async def create_habito(
     await db.flush()  # Para obtener el ID
 
     # Si el día actual está en los días del hábito y está activo, agregarlo al registro de hoy
-    dia_hoy = obtener_dia_letra(date.today())
-    if db_habito.activo and dia_en_lista(db_habito.dias, dia_hoy):
+    if db_habito.activo and dia_en_mascara(db_habito.dias_mask, date.today()):
         await agregar_habito_a_registro_hoy(db_habito.id, current_user.id, db)
 
+    # El nuevo hábito solo afecta a los agregados desde su fecha de creación
+    await db.refresh(db_habito)
+    await recalcular_rollups(
+        db, current_user.id, desde=db_habito.created_at.date().isoformat()
+    )
+
     await db.commit()
     await db.refresh(db_habito)
     return db_habito
@@ -216,17 +206,19 @@ async def update_habito(
         raise HTTPException(status_code=404, detail="Hábito no encontrado")
     
     # Guardar estado anterior de días y activo
-    dias_antes = db_habito.dias
+    dias_mask_antes = db_habito.dias_mask
     activo_antes = db_habito.activo
     
     update_data = habito_data.model_dump(exclude_unset=True)
+    if update_data.get("categoria_id") is not None:
+        await verificar_categoria_existe(update_data["categoria_id"], db)
     for key, value in update_data.items():
         setattr(db_habito, key, value)
 
     # Verificar si cambió la configuración de días o activo
-    dia_hoy = obtener_dia_letra(date.today())
-    estaba_en_hoy = activo_antes and dia_en_lista(dias_antes, dia_hoy)
-    esta_en_hoy = db_habito.activo and dia_en_lista(db_habito.dias, dia_hoy)
+    hoy = date.today()
+    estaba_en_hoy = bool(activo_antes) and dia_en_mascara(dias_mask_antes, hoy)
+    esta_en_hoy = bool(db_habito.activo) and dia_en_mascara(db_habito.dias_mask, hoy)
     
     if not estaba_en_hoy and esta_en_hoy:
         # Ahora debe aparecer en el día de hoy
@@ -234,7 +226,16 @@ async def update_habito(
     elif estaba_en_hoy and not esta_en_hoy:
         # Ya no debe aparecer en el día de hoy
         await quitar_habito_de_registro_hoy(db_habito.id, db_habito.usuario_id, db)
-    
+
+    # Mantener los agregados diarios: cambiar los días afecta a todo el historial,
+    # mientras que agregar/quitar el progreso de hoy solo afecta al día actual
+    if db_habito.dias_mask != dias_mask_antes:
+        await db.flush()
+        await recalcular_rollups(db, db_habito.usuario_id)
+    elif estaba_en_hoy != esta_en_hoy:
+        await db.flush()
+        await recalcular_rollups(db, db_habito.usuario_id, [hoy.isoformat()])
+
     await db.commit()
     await db.refresh(db_habito)
     return db_habito
@@ -247,23 +248,18 @@ async def delete_habito(
     db: AsyncSession = Depends(get_db)
 ):
     """Elimina un hábito del usuario por su ID (solo si pertenece al usuario)."""
+    # Un solo DELETE: sus progresos y días configurados se borran en cascada
     result = await db.execute(
-        select(habitos).where(
-            and_(habitos.id == habito_id, habitos.usuario_id == current_user.id)
-        )
+        delete(habitos)
+        .where(and_(habitos.id == habito_id, habitos.usuario_id == current_user.id))
+        .returning(habitos.id, habitos.created_at)
     )
-    db_habito = result.scalar_one_or_none()
-    if not db_habito:
+    eliminado = result.first()
+    if eliminado is None:
         raise HTTPException(status_code=404, detail="Hábito no encontrado")
-    
-    # Eliminar todos los progresos asociados a este hábito
-    progresos_result = await db.execute(
-        select(progreso_habitos).where(progreso_habitos.habito_id == habito_id)
-    )
-    progresos = progresos_result.scalars().all()
-    for progreso in progresos:
-        await db.delete(progreso)
-    
-    # Eliminar el hábito
-    await db.delete(db_habito)
+
+    # El hábito contaba como programado (activo o no) en cada fecha desde su
+    # creación, tenga o no progreso ese día: recalcular desde entonces
+    desde = eliminado.created_at.date().isoformat() if eliminado.created_at else None
+    await recalcular_rollups(db, current_user.id, desde=desde)
     await db.commit()
@@ -4,6 +4,9 @@ Router de notificaciones push.
 Endpoints para gestionar suscripciones push y preferencias de notificación.
 """
 
+from collections import defaultdict
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,9 +21,17 @@ from app.schemas import (
     TestNotificationRequest,
     VapidPublicKeyResponse
 )
-from app.security import get_current_user
+from app.security import get_current_user, get_current_user_lectura, invalidar_usuario_en_cache
 from app.config import get_settings
 from app.services.push_service import push_service
+from app.services.outbox import clave_recordatorio, encolar_notificaciones, trabajador_outbox
+from app.services.recordatorios import (
+    RETRASO_MAXIMO,
+    contar_habitos_pendientes,
+    fecha_local,
+    reprogramar_recordatorios,
+    seleccionar_recordatorios_vencidos
+)
 
 settings = get_settings()
 router = APIRouter(prefix="/notifications", tags=["notificaciones"])
@@ -101,6 +112,7 @@ async def subscribe(
     if not current_user.notificaciones_activas:
         current_user.notificaciones_activas = True
         await db.commit()
+        invalidar_usuario_en_cache(current_user.id)
 
     return new_subscription
 
@@ -147,6 +159,7 @@ async def unsubscribe(
     if not remaining:
         current_user.notificaciones_activas = False
         await db.commit()
+        invalidar_usuario_en_cache(current_user.id)
 
 
 @router.get(
@@ -156,7 +169,7 @@ async def unsubscribe(
     description="Retorna las preferencias de notificación del usuario autenticado."
 )
 async def get_preferences(
-    current_user: usuario = Depends(get_current_user)
+    current_user: usuario = Depends(get_current_user_lectura)
 ) -> NotificationPreferencesResponse:
     """Obtiene las preferencias de notificación del usuario."""
     return NotificationPreferencesResponse(
@@ -184,6 +197,7 @@ async def update_preferences(
         setattr(current_user, key, value)
 
     await db.commit()
+    invalidar_usuario_en_cache(current_user.id)
     await db.refresh(current_user)
 
     return NotificationPreferencesResponse(
@@ -250,79 +264,86 @@ async def send_scheduled_reminders(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Envía recordatorios a usuarios que tienen la hora actual configurada.
+    Encola los recordatorios de los usuarios cuyo próximo recordatorio ya venció.
     Cloud Scheduler llama este endpoint cada 30 minutos.
-    Tiene una ventana de tolerancia de ±5 minutos.
+
+    Los usuarios se seleccionan con una consulta de rango sobre el índice de
+    next_reminder_at_utc. Los recordatorios no se envían aquí: se encolan en
+    el outbox con una clave por usuario y día (ticks solapados no los
+    duplican) y el worker en segundo plano los entrega. Se encola hasta 5
+    minutos antes de la hora; los vencidos hace más de una hora solo se
+    reprograman. Tampoco se notifica a quien ya completó los hábitos del día
+    en su zona horaria: los pendientes de todo el lote se cuentan con una
+    sola consulta y el conteo va en el mensaje.
     """
-    from datetime import datetime, timedelta
-    from zoneinfo import ZoneInfo
-    
-    # Obtener usuarios con recordatorios activos
-    result = await db.execute(
-        select(usuario).where(
-            usuario.notificaciones_activas == True
-        )
-    )
-    users = result.scalars().all()
-    
-    stats = {"checked": 0, "sent": 0, "failed": 0, "skipped": 0}
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    vencidos = await seleccionar_recordatorios_vencidos(db, ahora)
+
+    stats = {"checked": 0, "enqueued": 0, "duplicates": 0, "skipped": 0, "no_pending": 0}
     debug_info = []  # Info de debug para cada usuario
-    
-    for user in users:
+    a_notificar = []  # (fila, debug, fecha local) de los que no se saltan
+    usuarios_por_fecha = defaultdict(list)
+
+    for fila in vencidos:
         stats["checked"] += 1
         user_debug = {
-            "user_id": user.id,
-            "timezone": user.timezone or "America/Santo_Domingo",
-            "hora_recordatorio": user.hora_recordatorio or "08:00"
+            "user_id": fila.id,
+            "timezone": fila.timezone or "America/Santo_Domingo",
+            "hora_recordatorio": fila.hora_recordatorio or "08:00",
+            "recordatorio_utc": fila.next_reminder_at_utc.isoformat()
         }
-        
-        try:
-            # Obtener hora actual en zona horaria del usuario
-            user_tz = ZoneInfo(user.timezone or "America/Santo_Domingo")
-            now_user = datetime.now(user_tz)
-            user_debug["hora_actual_usuario"] = now_user.strftime("%H:%M:%S")
-            
-            # Parsear hora del recordatorio del usuario
-            hora_recordatorio = user.hora_recordatorio or "08:00"
-            hora, minuto = map(int, hora_recordatorio.split(":"))
-            
-            # Crear datetime del recordatorio para hoy
-            recordatorio_hoy = now_user.replace(hour=hora, minute=minuto, second=0, microsecond=0)
-            
-            # Calcular diferencia en minutos
-            diferencia = (now_user - recordatorio_hoy).total_seconds() / 60
-            user_debug["diferencia_minutos"] = round(diferencia, 2)
-            
-            # ¿Está dentro de la ventana de ±5 minutos?
-            if abs(diferencia) <= 5:
-                user_debug["accion"] = "enviando"
-                notification_stats = await push_service.send_to_user(
-                    db=db,
-                    user_id=user.id,
-                    title="⏰ Recordatorio de hábitos",
-                    body="¡No olvides registrar tus hábitos de hoy!",
-                    url="/habitos"
-                )
-                
-                if notification_stats["sent"] > 0:
-                    stats["sent"] += 1
-                    user_debug["resultado"] = "enviado"
-                else:
-                    stats["failed"] += 1
-                    user_debug["resultado"] = "fallido"
-            else:
-                stats["skipped"] += 1
-                user_debug["accion"] = "saltado"
-                user_debug["razon"] = f"Diferencia de {round(diferencia, 1)} min, fuera de ventana ±5"
-        except Exception as e:
-            stats["failed"] += 1
-            user_debug["error"] = str(e)
-        
+        retraso = ahora - fila.next_reminder_at_utc
+        user_debug["diferencia_minutos"] = round(retraso.total_seconds() / 60, 2)
+
+        if retraso > RETRASO_MAXIMO:
+            stats["skipped"] += 1
+            user_debug["accion"] = "saltado"
+            user_debug["razon"] = f"Vencido hace {round(retraso.total_seconds() / 60, 1)} min"
+        else:
+            fecha = fecha_local(fila.next_reminder_at_utc, fila.timezone)
+            usuarios_por_fecha[fecha].append(fila.id)
+            a_notificar.append((fila, user_debug, fecha))
+
         debug_info.append(user_debug)
-    
+
+    pendientes_por_usuario = await contar_habitos_pendientes(db, usuarios_por_fecha)
+
+    notificaciones = []
+    for fila, user_debug, fecha in a_notificar:
+        pendientes = pendientes_por_usuario.get(fila.id, 0)
+        user_debug["pendientes"] = pendientes
+        if not pendientes:
+            stats["no_pending"] += 1
+            user_debug["accion"] = "sin_pendientes"
+            continue
+        user_debug["accion"] = "encolado"
+        notificaciones.append({
+            "usuario_id": fila.id,
+            "clave_idempotencia": clave_recordatorio(fila.id, fecha),
+            "titulo": "⏰ Recordatorio de hábitos",
+            "cuerpo": (
+                "¡Te queda 1 hábito pendiente hoy!" if pendientes == 1
+                else f"¡Te quedan {pendientes} hábitos pendientes hoy!"
+            ),
+            "url": "/habitos"
+        })
+
+    stats["enqueued"] = await encolar_notificaciones(db, notificaciones, ahora)
+    stats["duplicates"] = len(notificaciones) - stats["enqueued"]
+
+    # Pasar al recordatorio del día siguiente (también los saltados)
+    await reprogramar_recordatorios(db, vencidos, ahora)
+    await db.commit()
+    # El UPDATE masivo no pasa por la caché: sus snapshots tendrían el recordatorio viejo
+    for fila in vencidos:
+        invalidar_usuario_en_cache(fila.id)
+
+    if stats["enqueued"]:
+        trabajador_outbox.despertar()
+
     return {
-        "message": "Recordatorios procesados",
+        "message": "Recordatorios encolados",
         "stats": stats,
         "debug": debug_info,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": ahora.isoformat()
     }
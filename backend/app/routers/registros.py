@@ -1,31 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List
+from sqlalchemy.orm import aliased
+from sqlalchemy import select, and_, case, false, func, insert, literal, not_, update
+from typing import List, Optional
 from datetime import date, datetime
 import logging
 
-from app.database import get_db
-from app.models import registros, progreso_habitos, usuario, habitos
+from app.database import get_db, get_db_lectura, get_db_replica, insert_con_conflictos
+from app.models import registros, progreso_habitos, usuario, habitos, daily_rollups
 from app.schemas import (
-    RegistroCreate, RegistroUpdate, RegistroResponse, RegistroConProgresos,
-    ProgresoHabitoCreate, ProgresoHabitoUpdate, ProgresoHabitoResponse,
-    ProgresoDiaCalendario, ProgresoHabitoDiaCalendario
+    RegistroCreate, RegistroUpdate, RegistroResponse, RegistroDelDia, ProgresoDelDia,
+    ProgresoHabitoCreate, ProgresoHabitoUpdate, ProgresoHabitoResponse, ProgresoHabitoLote,
+    ProgresoDiaCalendario, ProgresoHabitoDiaCalendario, MatrizHabitosMes
 )
-from app.security import get_current_user
-from app.utils import parsear_dias_habito, obtener_dia_letra
+from app.security import get_current_user, get_current_user_lectura
+from app.services.rollups import ajustar_completados, crear_rollup_registro_nuevo, recalcular_rollups
+from app.utils import bit_dia, contador_habitos_programados, respuesta_revalidable
+from app.programacion import iterar_fechas_programadas
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/registros", tags=["registros"])
 
 
+async def crear_registro_del_dia(db: AsyncSession, usuario_id: int, fecha: date) -> Optional[int]:
+    """
+    Crea el registro de un día con sus progresos sin riesgo de duplicados.
+
+    El registro se inserta con INSERT ... ON CONFLICT DO NOTHING sobre
+    (usuario_id, fecha): si otra petición concurrente lo creó primero, no se
+    inserta nada y la que lo creó es la única que agrega los progresos (un
+    INSERT ... SELECT desde los hábitos activos programados) y el agregado diario.
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+        fecha: Fecha del registro
+
+    Returns:
+        ID del registro creado, o None si ya existía
+    """
+    fecha_str = fecha.strftime("%Y-%m-%d")
+
+    insertar = (
+        insert_con_conflictos(db, registros)
+        .values(usuario_id=usuario_id, fecha=fecha_str)
+        .on_conflict_do_nothing(index_elements=[registros.usuario_id, registros.fecha])
+        .returning(registros.id)
+    )
+    registro_id = (await db.execute(insertar)).scalar_one_or_none()
+    if registro_id is None:
+        return None
+
+    # Un progreso por cada hábito activo del usuario programado ese día de la semana
+    habitos_del_dia = select(
+        literal(registro_id),
+        habitos.id,
+        literal(0.0),
+        literal(False)
+    ).where(
+        and_(
+            habitos.usuario_id == usuario_id,
+            habitos.activo == 1,
+            habitos.dias_mask.op("&")(bit_dia(fecha)) != 0
+        )
+    )
+    await db.execute(
+        insert(progreso_habitos).from_select(
+            ["registro_id", "habito_id", "valor", "completado"], habitos_del_dia
+        )
+    )
+
+    # Crear el agregado diario del nuevo registro en la misma transacción
+    await crear_rollup_registro_nuevo(db, usuario_id, fecha_str)
+
+    return registro_id
+
+
 @router.get("/", response_model=List[RegistroResponse])
 async def get_registros(
     skip: int = 0,
     limit: int = 100,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene todos los registros del usuario autenticado."""
     result = await db.execute(
@@ -40,8 +97,8 @@ async def get_registros(
 @router.get("/existe/{fecha}")
 async def verificar_registro_existe(
     fecha: str,  # Formato: YYYY-MM-DD
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """
     Verifica si existe un registro para una fecha específica SIN crearlo.
@@ -77,95 +134,50 @@ async def verificar_registro_existe(
     }
 
 
-@router.get("/fecha/{fecha}", response_model=RegistroConProgresos)
-async def get_or_create_registro_por_fecha(
-    fecha: str,  # Formato: YYYY-MM-DD
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
+def validar_fecha_del_dia(fecha: str, current_user: usuario) -> date:
     """
-    Obtiene el registro del usuario autenticado para una fecha específica.
-    Si no existe, lo crea automáticamente con los hábitos activos para ese día.
-    Si la fecha es futura, verifica que el usuario tenga 'ver_futuro' activado.
+    Convierte la fecha de la ruta y verifica que el usuario pueda verla.
+
+    Raises:
+        HTTPException: 400 si el formato es inválido, 403 si es futura sin 'ver_futuro'
     """
-    # Validar formato de fecha
     try:
         fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
 
-    # Verificar si es fecha futura
-    hoy = date.today()
-    if fecha_obj > hoy:
-        if not current_user.ver_futuro:
-            raise HTTPException(
-                status_code=403,
-                detail="No puedes ver fechas futuras. Activa 'Ver futuro' en configuración."
-            )
-    
-    # Buscar registro existente
+    if fecha_obj > date.today() and not current_user.ver_futuro:
+        raise HTTPException(
+            status_code=403,
+            detail="No puedes ver fechas futuras. Activa 'Ver futuro' en configuración."
+        )
+    return fecha_obj
+
+
+async def leer_registro_del_dia(db: AsyncSession, usuario_id: int, fecha: str) -> Optional[RegistroDelDia]:
+    """Lee el registro guardado de un día con sus progresos, o None si no existe."""
     result = await db.execute(
         select(registros).where(
-            and_(registros.usuario_id == current_user.id, registros.fecha == fecha)
+            and_(registros.usuario_id == usuario_id, registros.fecha == fecha)
         )
     )
     db_registro = result.scalar_one_or_none()
-
-    # Si no existe, crear uno nuevo
     if not db_registro:
-        db_registro = registros(usuario_id=current_user.id, fecha=fecha)
-        db.add(db_registro)
-        await db.flush()
-
-        # Obtener hábitos activos del usuario para ese día de la semana
-        dia_letra = obtener_dia_letra(fecha_obj)
+        return None
 
-        habitos_result = await db.execute(
-            select(habitos).where(
-                and_(habitos.usuario_id == current_user.id, habitos.activo == 1)
-            )
-        )
-        habitos_usuario = habitos_result.scalars().all()
-
-        # Crear progreso para cada hábito activo ese día
-        for habito in habitos_usuario:
-            try:
-                dias_habito = parsear_dias_habito(habito.dias)
-
-                if dia_letra in dias_habito:
-                    progreso = progreso_habitos(
-                        registro_id=db_registro.id,
-                        habito_id=habito.id,
-                        valor=0,
-                        completado=False
-                    )
-                    db.add(progreso)
-
-            except ValueError as e:
-                # Log del error pero continuar con otros hábitos
-                logger.warning(
-                    f"Error parseando días del hábito {habito.id}: {e}. "
-                    f"Saltando este hábito."
-                )
-                continue
-        
-        await db.commit()
-        await db.refresh(db_registro)
-    
-    # Obtener progresos del registro
     progresos_result = await db.execute(
-        select(progreso_habitos).where(progreso_habitos.registro_id == db_registro.id)
+        select(progreso_habitos)
+        .where(progreso_habitos.registro_id == db_registro.id)
+        .order_by(progreso_habitos.id)
     )
-    progresos = progresos_result.scalars().all()
-    
-    return RegistroConProgresos(
+    return RegistroDelDia(
         id=db_registro.id,
         usuario_id=db_registro.usuario_id,
         fecha=db_registro.fecha,
         notas=db_registro.notas,
         created_at=db_registro.created_at,
         updated_at=db_registro.updated_at,
-        progresos=[ProgresoHabitoResponse(
+        progresos=[ProgresoDelDia(
             id=p.id,
             registro_id=p.registro_id,
             habito_id=p.habito_id,
@@ -173,10 +185,172 @@ async def get_or_create_registro_por_fecha(
             completado=p.completado,
             created_at=p.created_at,
             updated_at=p.updated_at
-        ) for p in progresos]
+        ) for p in progresos_result.scalars().all()]
+    )
+
+
+async def sintetizar_registro_del_dia(db: AsyncSession, usuario_id: int, fecha: date) -> RegistroDelDia:
+    """
+    Arma en memoria el día que crearía crear_registro_del_dia, sin escribir nada.
+
+    Tiene un progreso sin completar por cada hábito activo programado ese día
+    de la semana, los mismos que se insertan al materializar el registro.
+    """
+    result = await db.execute(
+        select(habitos.id)
+        .where(
+            and_(
+                habitos.usuario_id == usuario_id,
+                habitos.activo == 1,
+                habitos.dias_mask.op("&")(bit_dia(fecha)) != 0
+            )
+        )
+        .order_by(habitos.id)
+    )
+    return RegistroDelDia(
+        usuario_id=usuario_id,
+        fecha=fecha.strftime("%Y-%m-%d"),
+        virtual=True,
+        progresos=[ProgresoDelDia(habito_id=habito_id) for habito_id in result.scalars().all()]
     )
 
 
+@router.get("/dia/{fecha}", response_model=RegistroDelDia)
+async def get_dia_por_fecha(
+    fecha: str,  # Formato: YYYY-MM-DD
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Obtiene el día del usuario autenticado sin crear el registro (solo lectura).
+
+    Si el registro existe lo devuelve; si no, lo arma en memoria desde la
+    programación de los hábitos (virtual: true, sin ids). Se materializa con
+    POST /registros/fecha/{fecha} en la primera escritura. Usa la sesión de
+    solo lectura, así que navegar por el historial nunca toma el lock de escritura.
+    """
+    fecha_obj = validar_fecha_del_dia(fecha, current_user)
+
+    registro_del_dia = await leer_registro_del_dia(db, current_user.id, fecha)
+    if registro_del_dia:
+        return registro_del_dia
+    return await sintetizar_registro_del_dia(db, current_user.id, fecha_obj)
+
+
+@router.get("/fecha/{fecha}", response_model=RegistroDelDia)
+async def get_or_create_registro_por_fecha(
+    fecha: str,  # Formato: YYYY-MM-DD
+    current_user: usuario = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Obtiene el registro del usuario autenticado para una fecha específica.
+    Si no existe, lo crea automáticamente con los hábitos activos para ese día.
+    Para ver un día sin crearlo, usar GET /registros/dia/{fecha}.
+    Si la fecha es futura, verifica que el usuario tenga 'ver_futuro' activado.
+    """
+    fecha_obj = validar_fecha_del_dia(fecha, current_user)
+
+    registro_del_dia = await leer_registro_del_dia(db, current_user.id, fecha)
+    if registro_del_dia:
+        return registro_del_dia
+
+    # Si no existe, crearlo con un número fijo de sentencias
+    await crear_registro_del_dia(db, current_user.id, fecha_obj)
+    await db.commit()
+    return await leer_registro_del_dia(db, current_user.id, fecha)
+
+
+@router.post("/fecha/{fecha}", response_model=RegistroDelDia)
+async def materializar_registro_por_fecha(
+    fecha: str,  # Formato: YYYY-MM-DD
+    current_user: usuario = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Crea el registro de un día (si aún no existe) y lo devuelve con sus progresos.
+
+    Es la primera escritura de un día que se estaba viendo en modo virtual;
+    llamarlo sobre un día ya creado no cambia nada.
+    """
+    fecha_obj = validar_fecha_del_dia(fecha, current_user)
+
+    await crear_registro_del_dia(db, current_user.id, fecha_obj)
+    await db.commit()
+    return await leer_registro_del_dia(db, current_user.id, fecha)
+
+
+@router.put("/progreso/lote", response_model=List[ProgresoHabitoResponse])
+async def update_progresos_lote(
+    lote: ProgresoHabitoLote,
+    current_user: usuario = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Aplica varios cambios de progreso en una sola transacción (solo del usuario autenticado).
+
+    La propiedad se verifica con un único JOIN contra registros y los cambios
+    se aplican con un solo UPDATE con CASE por columna. Si algún progreso no
+    existe o es de otro usuario no se aplica ninguno.
+    """
+    cambios = {cambio.id: cambio.model_dump(exclude_unset=True) for cambio in lote.cambios}
+    if len(cambios) != len(lote.cambios):
+        raise HTTPException(status_code=400, detail="Un progreso aparece más de una vez en el lote")
+    if not cambios:
+        return []
+
+    # Estado previo y fecha de cada progreso, solo si el registro es del usuario
+    result = await db.execute(
+        select(progreso_habitos.id, progreso_habitos.completado, registros.fecha)
+        .join(registros, registros.id == progreso_habitos.registro_id)
+        .where(
+            and_(
+                progreso_habitos.id.in_(cambios),
+                registros.usuario_id == current_user.id
+            )
+        )
+    )
+    previos = {fila.id: fila for fila in result.all()}
+    faltantes = sorted(set(cambios) - set(previos))
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Progresos no encontrados: {faltantes}")
+
+    # Un CASE por columna con los valores de los progresos que la cambian
+    valores = {}
+    for columna in ("valor", "completado"):
+        por_id = {id_: datos[columna] for id_, datos in cambios.items() if columna in datos}
+        if por_id:
+            valores[columna] = case(
+                por_id,
+                value=progreso_habitos.id,
+                else_=getattr(progreso_habitos, columna)
+            )
+
+    if valores:
+        sentencia = (
+            update(progreso_habitos)
+            .where(progreso_habitos.id.in_(cambios))
+            .values(**valores)
+            .returning(progreso_habitos)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        sentencia = select(progreso_habitos).where(progreso_habitos.id.in_(cambios))
+    actualizados = (await db.execute(sentencia)).scalars().all()
+
+    # Mantener los agregados diarios: un ajuste por fecha afectada
+    deltas: dict[str, int] = {}
+    for progreso in actualizados:
+        previo = previos[progreso.id]
+        delta = int(bool(progreso.completado)) - int(bool(previo.completado))
+        deltas[previo.fecha] = deltas.get(previo.fecha, 0) + delta
+    for fecha, delta in deltas.items():
+        await ajustar_completados(db, current_user.id, fecha, delta)
+
+    await db.commit()
+    return sorted(actualizados, key=lambda p: p.id)
+
+
 @router.put("/progreso/{progreso_id}", response_model=ProgresoHabitoResponse)
 async def update_progreso(
     progreso_id: int,
@@ -204,10 +378,16 @@ async def update_progreso(
             detail="No tienes permiso para modificar este progreso"
         )
 
+    completado_antes = bool(db_progreso.completado)
+
     update_data = progreso_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_progreso, key, value)
 
+    # Mantener el agregado diario
+    delta = int(bool(db_progreso.completado)) - int(completado_antes)
+    await ajustar_completados(db, current_user.id, registro.fecha, delta)
+
     await db.commit()
     await db.refresh(db_progreso)
     return db_progreso
@@ -219,49 +399,64 @@ async def toggle_progreso(
     current_user: usuario = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Alterna el estado de completado de un progreso (solo del usuario autenticado)."""
-    result = await db.execute(
-        select(progreso_habitos).where(progreso_habitos.id == progreso_id)
-    )
-    db_progreso = result.scalar_one_or_none()
-    if not db_progreso:
-        raise HTTPException(status_code=404, detail="Progreso no encontrado")
+    """
+    Alterna el estado de completado de un progreso (solo del usuario autenticado).
 
-    # Verificar que el progreso pertenece al usuario actual
-    registro_result = await db.execute(
-        select(registros).where(registros.id == db_progreso.registro_id)
+    Es un solo UPDATE ... FROM registros, habitos con RETURNING: la propiedad
+    se verifica en el WHERE y el valor pasa a la meta diaria al completar y a 0
+    al desmarcar (las expresiones del SET leen el estado anterior). La fecha
+    del registro, necesaria para el agregado diario, se obtiene con una
+    subconsulta porque SQLite no permite usar las tablas del FROM en RETURNING.
+    """
+    completado_antes = func.coalesce(progreso_habitos.completado, false())
+    registro_del_progreso = aliased(registros)
+    fecha_registro = (
+        select(registro_del_progreso.fecha)
+        .where(registro_del_progreso.id == progreso_habitos.registro_id)
+        .scalar_subquery()
     )
-    registro = registro_result.scalar_one_or_none()
+    result = await db.execute(
+        update(progreso_habitos)
+        .where(
+            and_(
+                progreso_habitos.id == progreso_id,
+                registros.id == progreso_habitos.registro_id,
+                registros.usuario_id == current_user.id,
+                habitos.id == progreso_habitos.habito_id
+            )
+        )
+        .values(
+            completado=not_(completado_antes),
+            valor=case((completado_antes, 0), else_=habitos.meta_diaria)
+        )
+        .returning(progreso_habitos, fecha_registro)
+        .execution_options(synchronize_session=False)
+    )
+    fila = result.one_or_none()
 
-    if not registro or registro.usuario_id != current_user.id:
+    if fila is None:
+        # Solo en el caso de error: distinguir "no existe" de "no es tuyo"
+        existe = await db.scalar(select(progreso_habitos.id).where(progreso_habitos.id == progreso_id))
+        if existe is None:
+            raise HTTPException(status_code=404, detail="Progreso no encontrado")
         raise HTTPException(
             status_code=403,
             detail="No tienes permiso para modificar este progreso"
         )
 
-    # Obtener la meta del hábito
-    habito_result = await db.execute(
-        select(habitos).where(habitos.id == db_progreso.habito_id)
-    )
-    db_habito = habito_result.scalar_one_or_none()
-
-    if db_progreso.completado:
-        db_progreso.completado = False
-        db_progreso.valor = 0
-    else:
-        db_progreso.completado = True
-        db_progreso.valor = db_habito.meta_diaria if db_habito else 1
+    db_progreso, fecha = fila
+    # Mantener el agregado diario
+    await ajustar_completados(db, current_user.id, fecha, 1 if db_progreso.completado else -1)
 
     await db.commit()
-    await db.refresh(db_progreso)
     return db_progreso
 
 
 @router.get("/{registro_id}", response_model=RegistroResponse)
 async def get_registro(
     registro_id: int,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene un registro específico por su ID (solo del usuario autenticado)."""
     result = await db.execute(select(registros).where(registros.id == registro_id))
@@ -327,7 +522,12 @@ async def delete_registro(
             detail="No tienes permiso para eliminar este registro"
         )
 
+    # Sus progresos se borran en cascada en la base de datos
     await db.delete(db_registro)
+    await db.flush()
+
+    # Recalcular el agregado del día (se elimina si no quedan registros esa fecha)
+    await recalcular_rollups(db, current_user.id, [db_registro.fecha])
     await db.commit()
 
 
@@ -335,8 +535,9 @@ async def delete_registro(
 async def get_progreso_mes(
     year: int,
     month: int,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_replica)
 ):
     """
     Obtiene el progreso de cada día del mes para mostrar en el calendario.
@@ -348,7 +549,8 @@ async def get_progreso_mes(
         db: Sesión de base de datos
 
     Returns:
-        Lista con progreso diario del mes
+        Lista con progreso diario del mes, con ETag para revalidar la navegación
+        entre meses (304 si no cambió)
     """
     import calendar
     from datetime import timedelta
@@ -362,9 +564,9 @@ async def get_progreso_mes(
     _, ultimo_dia_mes = calendar.monthrange(year, month)
     ultimo_dia = date(year, month, ultimo_dia_mes)
 
-    # Obtener hábitos activos del usuario creados antes del último día del mes
+    # Programación de los hábitos activos creados antes del último día del mes
     habitos_result = await db.execute(
-        select(habitos).where(
+        select(habitos.dias_mask, habitos.created_at).where(
             and_(
                 habitos.usuario_id == current_user.id,
                 habitos.activo == 1,
@@ -372,36 +574,19 @@ async def get_progreso_mes(
             )
         )
     )
-    habitos_usuario = habitos_result.scalars().all()
+    contar_programados = contador_habitos_programados(habitos_result.all())
 
-    # Obtener todos los registros del mes
-    registros_result = await db.execute(
-        select(registros).where(
+    # Completados por día desde los agregados precalculados (una fila por registro)
+    rollups_result = await db.execute(
+        select(daily_rollups.fecha, daily_rollups.completados).where(
             and_(
-                registros.usuario_id == current_user.id,
-                registros.fecha >= primer_dia.strftime("%Y-%m-%d"),
-                registros.fecha <= ultimo_dia.strftime("%Y-%m-%d")
+                daily_rollups.usuario_id == current_user.id,
+                daily_rollups.fecha >= primer_dia.strftime("%Y-%m-%d"),
+                daily_rollups.fecha <= ultimo_dia.strftime("%Y-%m-%d")
             )
         )
     )
-    registros_mes = {r.fecha: r for r in registros_result.scalars().all()}
-
-    # Obtener todos los progresos de esos registros
-    if registros_mes:
-        registro_ids = [r.id for r in registros_mes.values()]
-        progresos_result = await db.execute(
-            select(progreso_habitos).where(progreso_habitos.registro_id.in_(registro_ids))
-        )
-        progresos_list = progresos_result.scalars().all()
-
-        # Agrupar progresos por registro_id
-        progresos_por_registro = {}
-        for p in progresos_list:
-            if p.registro_id not in progresos_por_registro:
-                progresos_por_registro[p.registro_id] = []
-            progresos_por_registro[p.registro_id].append(p)
-    else:
-        progresos_por_registro = {}
+    completados_mes = dict(rollups_result.all())
 
     # Generar respuesta para cada día del mes
     resultado = []
@@ -410,56 +595,27 @@ async def get_progreso_mes(
     while fecha_actual <= ultimo_dia:
         fecha_str = fecha_actual.strftime("%Y-%m-%d")
 
-        # Calcular día de la semana
-        dia_letra = obtener_dia_letra(fecha_actual)
-
-        # Contar hábitos programados para este día
-        habitos_del_dia = []
-        for habito in habitos_usuario:
-            # Solo considerar el hábito si ya existía en esta fecha
-            if habito.created_at.date() > fecha_actual:
-                continue
-            
-            try:
-                dias_habito = parsear_dias_habito(habito.dias)
-
-                if dia_letra in dias_habito:
-                    habitos_del_dia.append(habito.id)
-
-            except ValueError as e:
-                # Log del error pero continuar con otros hábitos
-                logger.warning(
-                    f"Error parseando días del hábito {habito.id} en calendario: {e}. "
-                    f"Saltando este hábito."
-                )
-                continue
-
-        total_habitos = len(habitos_del_dia)
-
-        # Verificar si hay registro para este día
-        registro = registros_mes.get(fecha_str)
-        tiene_registro = registro is not None
-
-        # Contar hábitos completados
-        habitos_completados = 0
-        if registro and registro.id in progresos_por_registro:
-            progresos = progresos_por_registro[registro.id]
-            habitos_completados = sum(1 for p in progresos if p.completado)
+        # Hábitos programados para este día (solo si ya existían en esta fecha)
+        total_habitos = contar_programados(fecha_actual)
+
+        # Verificar si hay registro para este día y cuántos hábitos se completaron
+        tiene_registro = fecha_str in completados_mes
+        habitos_completados = completados_mes.get(fecha_str, 0)
 
         # Calcular porcentaje
         porcentaje = (habitos_completados / total_habitos * 100) if total_habitos > 0 else 0
 
-        resultado.append(ProgresoDiaCalendario(
-            fecha=fecha_str,
-            total_habitos=total_habitos,
-            habitos_completados=habitos_completados,
-            porcentaje=round(porcentaje, 1),
-            tiene_registro=tiene_registro
-        ))
+        resultado.append({
+            "fecha": fecha_str,
+            "total_habitos": total_habitos,
+            "habitos_completados": habitos_completados,
+            "porcentaje": round(porcentaje, 1),
+            "tiene_registro": tiene_registro
+        })
 
         fecha_actual += timedelta(days=1)
 
-    return resultado
+    return respuesta_revalidable(request, resultado)
 
 
 @router.get("/calendario/{year}/{month}/habito/{habito_id}", response_model=List[ProgresoHabitoDiaCalendario])
@@ -467,8 +623,8 @@ async def get_progreso_mes_habito(
     year: int,
     month: int,
     habito_id: int,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_replica)
 ):
     """
     Obtiene el progreso de un hábito específico para cada día del mes.
@@ -509,58 +665,38 @@ async def get_progreso_mes_habito(
     _, ultimo_dia_mes = calendar.monthrange(year, month)
     ultimo_dia = date(year, month, ultimo_dia_mes)
 
-    # Parsear días del hábito
-    try:
-        dias_habito = parsear_dias_habito(habito.dias)
-    except ValueError as e:
-        logger.error(f"Error parseando días del hábito {habito_id}: {e}")
-        raise HTTPException(status_code=500, detail="Error al procesar los días del hábito")
-
-    # Obtener todos los registros del mes
-    registros_result = await db.execute(
-        select(registros).where(
+    # Progresos del hábito en el mes junto a la fecha de su registro (una consulta)
+    progresos_result = await db.execute(
+        select(registros.fecha, progreso_habitos.completado)
+        .join(progreso_habitos, progreso_habitos.registro_id == registros.id)
+        .where(
             and_(
                 registros.usuario_id == current_user.id,
                 registros.fecha >= primer_dia.strftime("%Y-%m-%d"),
-                registros.fecha <= ultimo_dia.strftime("%Y-%m-%d")
+                registros.fecha <= ultimo_dia.strftime("%Y-%m-%d"),
+                progreso_habitos.habito_id == habito_id
             )
         )
     )
-    registros_mes = {r.fecha: r for r in registros_result.scalars().all()}
-
-    # Obtener progresos del hábito específico
-    progresos_por_fecha = {}
-    if registros_mes:
-        registro_ids = [r.id for r in registros_mes.values()]
-        progresos_result = await db.execute(
-            select(progreso_habitos).where(
-                and_(
-                    progreso_habitos.registro_id.in_(registro_ids),
-                    progreso_habitos.habito_id == habito_id
-                )
-            )
-        )
-        for p in progresos_result.scalars().all():
-            # Encontrar la fecha del registro
-            for fecha, reg in registros_mes.items():
-                if reg.id == p.registro_id:
-                    progresos_por_fecha[fecha] = p
-                    break
+    completado_por_fecha = dict(progresos_result.all())
 
     # Generar respuesta para cada día del mes
     resultado = []
     fecha_actual = primer_dia
 
+    # Fechas del mes en que el hábito está programado (desde su creación)
+    fechas_programadas = set(iterar_fechas_programadas(
+        habito.dias_mask, primer_dia, ultimo_dia, creado=habito.created_at.date()
+    ))
+
     while fecha_actual <= ultimo_dia:
         fecha_str = fecha_actual.strftime("%Y-%m-%d")
-        dia_letra = obtener_dia_letra(fecha_actual)
-        
+
         # Verificar si el hábito está programado para este día
-        programado = dia_letra in dias_habito and habito.created_at.date() <= fecha_actual
-        
+        programado = fecha_actual in fechas_programadas
+
         # Verificar si fue completado
-        progreso = progresos_por_fecha.get(fecha_str)
-        completado = progreso.completado if progreso else False
+        completado = bool(completado_por_fecha.get(fecha_str, False))
 
         resultado.append(ProgresoHabitoDiaCalendario(
             fecha=fecha_str,
@@ -571,3 +707,92 @@ async def get_progreso_mes_habito(
         fecha_actual += timedelta(days=1)
 
     return resultado
+
+
+@router.get("/calendario/{year}/{month}/habitos", response_model=MatrizHabitosMes)
+async def get_matriz_habitos_mes(
+    year: int,
+    month: int,
+    request: Request,
+    habito_ids: Optional[List[int]] = Query(None, alias="habito_id"),
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_replica)
+):
+    """
+    Obtiene el progreso de varios hábitos en el mes como una matriz hábitos × días.
+
+    Reemplaza llamar a /calendario/{year}/{month}/habito/{id} una vez por hábito:
+    todo sale de una sola consulta (hábitos con sus completados del mes).
+
+    Args:
+        year: Año del calendario
+        month: Mes del calendario (1-12)
+        request: Petición entrante (para revalidar con ETag)
+        habito_ids: IDs de hábitos (?habito_id=1&habito_id=2); por defecto los activos
+        current_user: Usuario autenticado
+        db: Sesión de base de datos
+
+    Returns:
+        Matriz compacta: por hábito, un dígito por día con bit 0 = programado
+        y bit 1 = completado
+    """
+    import calendar
+
+    # Validar mes
+    if month < 1 or month > 12:
+        raise HTTPException(status_code=400, detail="Mes inválido. Debe estar entre 1 y 12")
+
+    primer_dia = date(year, month, 1)
+    _, dias_mes = calendar.monthrange(year, month)
+    ultimo_dia = date(year, month, dias_mes)
+
+    # Pares (hábito, fecha) completados en el mes
+    completados = (
+        select(progreso_habitos.habito_id, registros.fecha)
+        .join(registros, registros.id == progreso_habitos.registro_id)
+        .where(
+            and_(
+                registros.usuario_id == current_user.id,
+                registros.fecha >= primer_dia.strftime("%Y-%m-%d"),
+                registros.fecha <= ultimo_dia.strftime("%Y-%m-%d"),
+                progreso_habitos.completado == True
+            )
+        )
+        .subquery()
+    )
+
+    filtro_habitos = [habitos.usuario_id == current_user.id]
+    if habito_ids:
+        filtro_habitos.append(habitos.id.in_(habito_ids))
+    else:
+        filtro_habitos.append(habitos.activo == 1)
+
+    # Hábitos del usuario con sus fechas completadas (NULL si ninguna)
+    result = await db.execute(
+        select(habitos.id, habitos.dias_mask, habitos.created_at, completados.c.fecha)
+        .outerjoin(completados, completados.c.habito_id == habitos.id)
+        .where(and_(*filtro_habitos))
+        .order_by(habitos.id)
+    )
+
+    filas: dict[int, list[int]] = {}
+    for habito_id, dias_mask, created_at, fecha in result.all():
+        estados = filas.get(habito_id)
+        if estados is None:
+            estados = [0] * dias_mes
+            for programada in iterar_fechas_programadas(
+                dias_mask, primer_dia, ultimo_dia, creado=created_at.date()
+            ):
+                estados[programada.day - 1] = 1
+            filas[habito_id] = estados
+        if fecha is not None:
+            estados[int(fecha[8:10]) - 1] |= 2
+
+    return respuesta_revalidable(request, {
+        "fecha_inicio": primer_dia.strftime("%Y-%m-%d"),
+        "dias": dias_mes,
+        "habitos": [
+            {"habito_id": habito_id, "estados": "".join(map(str, estados))}
+            for habito_id, estados in filas.items()
+        ]
+    })
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select
 from typing import List
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_db_lectura
 from app.models import usuario
 from app.schemas import UsuarioCreate, UsuarioUpdate, UsuarioResponse
-from app.security import get_current_user, hash_password
+from app.security import (
+    get_current_user,
+    get_current_user_lectura,
+    hash_password_async,
+    invalidar_usuario_en_cache
+)
+from app.services.eliminacion import eliminar_cuenta
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +44,8 @@ router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
 async def get_usuario(
     usuario_id: int,
-    current_user: usuario = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: usuario = Depends(get_current_user_lectura),
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     """Obtiene un usuario específico por su ID (solo el propio usuario)."""
     # Verificar que es el mismo usuario
@@ -120,12 +126,13 @@ async def update_usuario(
 
     # Si se está actualizando la contraseña, hashearla
     if 'contrasena' in update_data:
-        update_data['contrasena'] = hash_password(update_data['contrasena'])
+        update_data['contrasena'] = await hash_password_async(update_data['contrasena'])
 
     for key, value in update_data.items():
         setattr(db_usuario, key, value)
 
     await db.commit()
+    invalidar_usuario_en_cache(usuario_id)
     await db.refresh(db_usuario)
     return db_usuario
 
@@ -144,10 +151,8 @@ async def delete_usuario(
             detail="Solo puedes eliminar tu propio perfil"
         )
 
-    result = await db.execute(select(usuario).where(usuario.id == usuario_id))
-    db_usuario = result.scalar_one_or_none()
-    if not db_usuario:
+    # Un solo DELETE: la base de datos borra en cascada todos los datos del usuario
+    if not await eliminar_cuenta(db, usuario_id):
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-    await db.delete(db_usuario)
     await db.commit()
+    invalidar_usuario_en_cache(usuario_id)
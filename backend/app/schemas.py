@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 # ==================== Usuario Schemas ====================
@@ -144,6 +144,16 @@ class ProgresoHabitoUpdate(BaseModel):
     completado: Optional[bool] = None
 
 
+class ProgresoHabitoCambio(ProgresoHabitoUpdate):
+    """Cambio de un progreso dentro de una actualización por lote."""
+    id: int
+
+
+class ProgresoHabitoLote(BaseModel):
+    """Cambios de progreso acumulados por el cliente, aplicados juntos."""
+    cambios: List[ProgresoHabitoCambio] = Field(..., max_length=200)
+
+
 class ProgresoHabitoResponse(ProgresoHabitoBase):
     id: int
     created_at: datetime
@@ -157,6 +167,34 @@ class RegistroConProgresos(RegistroResponse):
     progresos: list[ProgresoHabitoResponse] = []
 
 
+# ==================== Registro del día (real o virtual) ====================
+class ProgresoDelDia(BaseModel):
+    """Progreso de un hábito en la vista del día; sin id mientras el día sea virtual."""
+    id: Optional[int] = None
+    registro_id: Optional[int] = None
+    habito_id: int
+    valor: float = 0
+    completado: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class RegistroDelDia(BaseModel):
+    """
+    Vista de un día. Si `virtual` es True el registro no existe en la base de
+    datos: se armó desde la programación de los hábitos y se crea con
+    POST /registros/fecha/{fecha} antes de la primera escritura.
+    """
+    id: Optional[int] = None
+    usuario_id: int
+    fecha: str  # Formato: YYYY-MM-DD
+    notas: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    virtual: bool = False
+    progresos: list[ProgresoDelDia] = []
+
+
 # ==================== RegistroHabitoDias Schemas ====================
 class RegistroHabitoDiaBase(BaseModel):
     registro_id: int
@@ -310,6 +348,19 @@ class ProgresoHabitoDiaCalendario(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MatrizHabitoMes(BaseModel):
+    """Fila de la matriz mensual: estado de un hábito en cada día del mes."""
+    habito_id: int
+    # Un dígito por día: bit 0 = programado, bit 1 = completado ("0".."3")
+    estados: str
+
+
+class MatrizHabitosMes(BaseModel):
+    """Esquema compacto con el progreso de varios hábitos en un mes."""
+    fecha_inicio: str  # Formato YYYY-MM-DD (primer día del mes)
+    dias: int  # Número de días del mes (longitud de cada fila)
+    habitos: List[MatrizHabitoMes]
+
 # ==================== Push Notifications Schemas ====================
 class PushSubscriptionCreate(BaseModel):
     """Esquema para crear una suscripción push."""
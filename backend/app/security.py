@@ -2,13 +2,16 @@
 Módulo de seguridad para autenticación y autorización.
 
 Proporciona funciones para:
-- Hashing y verificación de contraseñas con bcrypt
+- Hashing y verificación de contraseñas con bcrypt (síncrono y en un
+  pool de hilos acotado para uso desde endpoints async)
 - Generación y verificación de tokens JWT
 - Dependencias para obtener el usuario autenticado
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -18,8 +21,9 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_db, get_db_lectura
 from app.models import usuario
+from app.services.cache_autenticacion import CacheAutenticacion
 
 # Configuración
 settings = get_settings()
@@ -32,6 +36,44 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.jwt_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+# Caché de tokens verificados → usuario (ver get_current_user)
+cache_autenticacion = CacheAutenticacion(
+    ttl_segundos=settings.auth_cache_ttl_seconds,
+    max_entradas=settings.auth_cache_max_entries
+)
+
+
+# Pool dedicado a bcrypt: cada hash bloquea decenas de ms, fuera del event loop
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=settings.bcrypt_max_workers,
+    thread_name_prefix="bcrypt"
+)
+_bcrypt_pendientes = 0
+
+T = TypeVar("T")
+
+
+def invalidar_usuario_en_cache(usuario_id: int) -> None:
+    """
+    Descarta los usuarios cacheados de un usuario modificado o eliminado.
+
+    Debe llamarse después del commit que cambia los datos del usuario.
+    """
+    cache_autenticacion.invalidar_usuario(usuario_id)
+
+
+def bloquear_usuario_en_eliminacion(usuario_id: int) -> None:
+    """
+    Rechaza los tokens del usuario mientras su cuenta se elimina en segundo plano.
+
+    El bloqueo es por proceso, como la caché; eliminar_en_lotes lo levanta al terminar.
+    """
+    cache_autenticacion.bloquear_usuario(usuario_id)
+
+
+def desbloquear_usuario_en_eliminacion(usuario_id: int) -> None:
+    cache_autenticacion.desbloquear_usuario(usuario_id)
+
 
 def hash_password(password: str) -> str:
     """
@@ -78,6 +120,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+async def _ejecutar_bcrypt(funcion: Callable[..., T], *args) -> T:
+    """
+    Ejecuta una operación bcrypt en el pool dedicado.
+
+    Si ya hay `bcrypt_max_pending` operaciones en cola o en ejecución, rechaza
+    la petición con 503 en lugar de acumular trabajo: durante una ráfaga de
+    logins el resto de endpoints sigue respondiendo.
+
+    Raises:
+        HTTPException 503: Si la cola de bcrypt está llena
+    """
+    global _bcrypt_pendientes
+
+    if _bcrypt_pendientes >= settings.bcrypt_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
+    _bcrypt_pendientes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_bcrypt_executor, funcion, *args)
+    finally:
+        _bcrypt_pendientes -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """Versión async de hash_password que no bloquea el event loop."""
+    return await _ejecutar_bcrypt(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versión async de verify_password que no bloquea el event loop."""
+    return await _ejecutar_bcrypt(verify_password, plain_password, hashed_password)
+
+
+def bcrypt_pendientes() -> int:
+    """Operaciones bcrypt en cola o en ejecución (para monitoreo)."""
+    return _bcrypt_pendientes
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Crea un token JWT de acceso.
@@ -102,36 +187,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> usuario:
-    """
-    Dependencia para obtener el usuario autenticado actual.
-
-    Extrae el token JWT del header Authorization, lo valida,
-    y retorna el usuario correspondiente.
-
-    Args:
-        credentials: Credenciales HTTP Bearer (token)
-        db: Sesión de base de datos
-
-    Returns:
-        Usuario autenticado
-
-    Raises:
-        HTTPException 401: Si el token es inválido o el usuario no existe
-    """
+async def _resolver_usuario(token: str, db: AsyncSession) -> usuario:
+    """Valida el token y retorna su usuario adjunto a la sesión `db`."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        # Extraer token
-        token = credentials.credentials
+    # Token ya verificado: adjuntar el snapshot a la sesión sin emitir SQL
+    snapshot = cache_autenticacion.obtener(token)
+    if snapshot is not None:
+        return await db.merge(snapshot, load=False)
 
+    try:
         # Decodificar token JWT
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -142,6 +211,10 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    # Cuenta en eliminación por lotes: la fila aún existe pero ya no autentica
+    if cache_autenticacion.bloqueado(int(user_id)):
+        raise credentials_exception
+
     # Buscar usuario en la base de datos
     result = await db.execute(
         select(usuario).where(usuario.id == int(user_id))
@@ -151,9 +224,47 @@ async def get_current_user(
     if db_user is None:
         raise credentials_exception
 
+    cache_autenticacion.guardar(token, db_user, expira_token=payload.get("exp"))
     return db_user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> usuario:
+    """
+    Dependencia para obtener el usuario autenticado actual.
+
+    Extrae el token JWT del header Authorization, lo valida,
+    y retorna el usuario correspondiente. Los tokens ya verificados se
+    sirven desde cache_autenticacion sin consultar la base de datos.
+
+    Args:
+        credentials: Credenciales HTTP Bearer (token)
+        db: Sesión de base de datos
+
+    Returns:
+        Usuario autenticado
+
+    Raises:
+        HTTPException 401: Si el token es inválido o el usuario no existe
+    """
+    return await _resolver_usuario(credentials.credentials, db)
+
+
+async def get_current_user_lectura(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db_lectura)
+) -> usuario:
+    """
+    Igual que get_current_user, pero con la sesión de solo lectura.
+
+    Las rutas que solo leen la usan junto con get_db_lectura: FastAPI
+    reutiliza la misma sesión para ambas dependencias en la petición.
+    """
+    return await _resolver_usuario(credentials.credentials, db)
+
+
 async def authenticate_user(identifier: str, password: str, db: AsyncSession) -> Optional[usuario]:
     """
     Autentica un usuario verificando nombre/email y contraseña.
@@ -178,7 +289,7 @@ async def authenticate_user(identifier: str, password: str, db: AsyncSession) ->
         return None
 
     # Verificar contraseña
-    if not verify_password(password, db_user.contrasena):
+    if not await verify_password_async(password, db_user.contrasena):
         return None
 
     return db_user
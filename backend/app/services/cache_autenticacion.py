@@ -0,0 +1,170 @@
+"""
+Caché en memoria de tokens verificados y usuarios autenticados.
+
+Evita decodificar el JWT y consultar la tabla usuarios en cada petición
+autenticada. Cada entrada guarda una copia desacoplada (snapshot) del
+usuario; la dependencia get_current_user la adjunta a la sesión de la
+petición sin emitir SQL.
+
+- TTL: una entrada vive como máximo `ttl_segundos` y nunca más que el token
+- LRU: al superar `max_entradas` se descarta la usada hace más tiempo
+- Invalidación explícita por usuario al modificar o eliminar su cuenta
+- Bloqueo por usuario mientras su cuenta se elimina por lotes: sus tokens se
+  rechazan aunque la fila todavía exista
+
+La caché es por proceso: con varios workers, un cambio hecho en otro proceso
+se ve como tarde al vencer el TTL.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import usuario
+
+
+@dataclass
+class _Entrada:
+    """Usuario cacheado para un token y el instante (monotónico) en que vence."""
+    usuario_id: int
+    snapshot: usuario
+    vence: float
+
+
+def _copiar_usuario(db_user: usuario) -> usuario:
+    """
+    Crea una copia desacoplada del usuario que se puede adjuntar a otra sesión.
+
+    La instancia se crea sin __init__ y los valores se cargan como ya
+    confirmados: así no corren los @validates del modelo (que recalcularían
+    next_reminder_at_utc desde "ahora") ni queda historial de cambios.
+    """
+    mapper = sa_inspect(usuario)
+    copia = mapper.class_manager.new_instance()
+    for attr in mapper.column_attrs:
+        set_committed_value(copia, attr.key, getattr(db_user, attr.key))
+    make_transient_to_detached(copia)
+    return copia
+
+
+class CacheAutenticacion:
+    """Caché acotada (TTL + LRU) de token → snapshot del usuario."""
+
+    def __init__(
+        self,
+        ttl_segundos: float,
+        max_entradas: int,
+        reloj: Callable[[], float] = time.monotonic
+    ):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._reloj = reloj
+        self._entradas: OrderedDict[str, _Entrada] = OrderedDict()
+        self._tokens_por_usuario: dict[int, set[str]] = {}
+        self._bloqueados: set[int] = set()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    @property
+    def activa(self) -> bool:
+        return self.ttl_segundos > 0 and self.max_entradas > 0
+
+    def obtener(self, token: str) -> Optional[usuario]:
+        """
+        Retorna el snapshot del usuario para un token ya verificado.
+
+        Returns:
+            Usuario desacoplado, o None si no está o venció
+        """
+        entrada = self._entradas.get(token)
+        if entrada is None or entrada.vence <= self._reloj():
+            if entrada is not None:
+                self._quitar(token)
+            self.fallos += 1
+            return None
+
+        self._entradas.move_to_end(token)
+        self.aciertos += 1
+        return entrada.snapshot
+
+    def guardar(self, token: str, db_user: usuario, expira_token: Optional[float] = None) -> None:
+        """
+        Guarda el usuario de un token recién verificado.
+
+        Args:
+            token: JWT verificado
+            db_user: Usuario cargado de la base de datos
+            expira_token: Claim "exp" del token (segundos epoch), si existe
+        """
+        if not self.activa or db_user.id in self._bloqueados:
+            return
+
+        vida = self.ttl_segundos
+        if expira_token is not None:
+            vida = min(vida, expira_token - time.time())
+        if vida <= 0:
+            return
+
+        if token in self._entradas:
+            self._quitar(token)
+        self._entradas[token] = _Entrada(
+            usuario_id=db_user.id,
+            snapshot=_copiar_usuario(db_user),
+            vence=self._reloj() + vida
+        )
+        self._tokens_por_usuario.setdefault(db_user.id, set()).add(token)
+
+        while len(self._entradas) > self.max_entradas:
+            token_antiguo = next(iter(self._entradas))
+            self._quitar(token_antiguo)
+            self.descartes += 1
+
+    def invalidar_usuario(self, usuario_id: int) -> None:
+        """Descarta todas las entradas de un usuario (tras modificarlo o eliminarlo)."""
+        for token in list(self._tokens_por_usuario.get(usuario_id, ())):
+            self._quitar(token)
+
+    def bloquear_usuario(self, usuario_id: int) -> None:
+        """Descarta las entradas del usuario y rechaza sus tokens hasta desbloquearlo."""
+        self._bloqueados.add(usuario_id)
+        self.invalidar_usuario(usuario_id)
+
+    def desbloquear_usuario(self, usuario_id: int) -> None:
+        self._bloqueados.discard(usuario_id)
+
+    def bloqueado(self, usuario_id: int) -> bool:
+        return usuario_id in self._bloqueados
+
+    def limpiar(self) -> None:
+        """Vacía la caché y reinicia los contadores."""
+        self._entradas.clear()
+        self._tokens_por_usuario.clear()
+        self._bloqueados.clear()
+        self.aciertos = self.fallos = self.descartes = 0
+
+    def estadisticas(self) -> dict:
+        """Contadores de aciertos y fallos para monitoreo."""
+        consultas = self.aciertos + self.fallos
+        return {
+            "hits": self.aciertos,
+            "misses": self.fallos,
+            "evictions": self.descartes,
+            "entries": len(self._entradas),
+            "hit_ratio": round(self.aciertos / consultas, 4) if consultas else 0.0,
+        }
+
+    def _quitar(self, token: str) -> None:
+        entrada = self._entradas.pop(token, None)
+        if entrada is None:
+            return
+        tokens = self._tokens_por_usuario.get(entrada.usuario_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_por_usuario[entrada.usuario_id]
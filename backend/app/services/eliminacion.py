@@ -0,0 +1,112 @@
+"""
+Eliminación de los datos de un usuario.
+
+Las claves foráneas tienen ON DELETE CASCADE: borrar un usuario, un registro
+o un hábito es una sola sentencia DELETE y la base de datos elimina progresos,
+días, agregados, suscripciones y notificaciones dependientes.
+
+Para cuentas con mucho historial, `eliminar_en_lotes` borra los registros por
+lotes con un commit por lote, así el lock de escritura de SQLite se libera
+entre lotes y las demás peticiones no esperan a que termine todo el borrado.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.database import async_session
+from app.models import registros, usuario
+from app.security import desbloquear_usuario_en_eliminacion
+from app.services.rollups import eliminar_rollups
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def eliminar_datos_usuario(db: AsyncSession, usuario_id: int) -> None:
+    """
+    Elimina los registros del usuario (y en cascada sus progresos) y sus agregados.
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+    """
+    await db.execute(delete(registros).where(registros.usuario_id == usuario_id))
+    await eliminar_rollups(db, usuario_id)
+
+
+async def eliminar_cuenta(db: AsyncSession, usuario_id: int) -> bool:
+    """
+    Elimina el usuario; la base de datos borra en cascada todos sus datos.
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+
+    Returns:
+        False si el usuario no existía
+    """
+    result = await db.execute(delete(usuario).where(usuario.id == usuario_id))
+    return result.rowcount > 0
+
+
+async def eliminar_en_lotes(
+    usuario_id: int,
+    incluir_cuenta: bool = False,
+    tamano_lote: Optional[int] = None,
+    fabrica_sesiones: Optional[async_sessionmaker] = None
+) -> int:
+    """
+    Elimina los registros del usuario por lotes y luego sus agregados (y la cuenta).
+
+    Pensada para ejecutarse en segundo plano: usa sus propias sesiones y hace
+    commit después de cada lote. Con incluir_cuenta, al terminar (o fallar)
+    levanta el bloqueo de autenticación que la ruta puso antes de responder.
+
+    Args:
+        usuario_id: ID del usuario
+        incluir_cuenta: Si es True, al final elimina también el usuario
+        tamano_lote: Registros por lote (por defecto `delete_batch_size`)
+        fabrica_sesiones: Fábrica de sesiones (por defecto la del motor principal)
+
+    Returns:
+        Número de registros eliminados
+    """
+    tamano_lote = tamano_lote or settings.delete_batch_size
+    fabrica_sesiones = fabrica_sesiones or async_session
+    eliminados = 0
+    try:
+        while True:
+            lote = (
+                select(registros.id)
+                .where(registros.usuario_id == usuario_id)
+                .order_by(registros.id)
+                .limit(tamano_lote)
+            )
+            async with fabrica_sesiones() as db:
+                result = await db.execute(delete(registros).where(registros.id.in_(lote)))
+                await db.commit()
+            if result.rowcount == 0:
+                break
+            eliminados += result.rowcount
+            # Ceder el event loop (y el lock de escritura) entre lotes
+            await asyncio.sleep(0)
+
+        async with fabrica_sesiones() as db:
+            await eliminar_rollups(db, usuario_id)
+            if incluir_cuenta:
+                await eliminar_cuenta(db, usuario_id)
+            await db.commit()
+    except Exception as e:
+        logger.error(f"❌ Error eliminando en lotes los datos del usuario {usuario_id}: {str(e)}")
+        raise
+    finally:
+        if incluir_cuenta:
+            desbloquear_usuario_en_eliminacion(usuario_id)
+
+    logger.info(f"🗑️  Usuario {usuario_id}: {eliminados} registros eliminados en lotes de {tamano_lote}")
+    return eliminados
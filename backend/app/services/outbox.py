@@ -0,0 +1,250 @@
+"""
+Outbox de notificaciones.
+
+Las notificaciones no se envían dentro de la petición que las origina: se
+encolan en notification_outbox con una clave de idempotencia (INSERT ... ON
+CONFLICT DO NOTHING), así ticks solapados del scheduler o varias instancias no
+las duplican. Un worker en segundo plano toma lotes, los entrega con
+PushService y reintenta los fallos transitorios con espera exponencial.
+"""
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+from sqlalchemy import Row, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.database import async_session, insert_con_conflictos
+from app.models import notification_outbox
+from app.services.push_service import PushService, push_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Estados de una notificación
+PENDIENTE = "pendiente"
+ENVIANDO = "enviando"      # Tomada por un worker hasta `disponible_en`
+ENVIADA = "enviada"
+FALLIDA = "fallida"        # Agotó los reintentos
+DESCARTADA = "descartada"  # El usuario no tiene suscripciones activas
+
+# Filas por INSERT multi-fila (por debajo del límite de parámetros de SQLite)
+FILAS_POR_INSERT = 500
+
+
+def ahora_utc() -> datetime:
+    """Instante actual en UTC sin tzinfo, como se guardan las fechas del outbox."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def clave_recordatorio(usuario_id: int, fecha_local: date) -> str:
+    """Clave de idempotencia del recordatorio diario de un usuario."""
+    return f"recordatorio:{usuario_id}:{fecha_local.isoformat()}"
+
+
+def espera_reintento(intentos: int, base_segundos: float) -> timedelta:
+    """Espera antes del siguiente intento: base, 2·base, 4·base..."""
+    return timedelta(seconds=base_segundos * 2 ** (intentos - 1))
+
+
+async def encolar_notificaciones(
+    db: AsyncSession,
+    notificaciones: Sequence[dict],
+    ahora: Optional[datetime] = None
+) -> int:
+    """
+    Encola notificaciones, ignorando las que ya existen con la misma clave.
+
+    Args:
+        db: Sesión de base de datos (el commit queda a cargo del llamador)
+        notificaciones: Diccionarios con usuario_id, clave_idempotencia,
+            titulo, cuerpo y url
+        ahora: Instante desde el que están disponibles (UTC sin tzinfo)
+
+    Returns:
+        Cantidad de notificaciones nuevas encoladas
+    """
+    ahora = ahora or ahora_utc()
+    encoladas = 0
+    for inicio in range(0, len(notificaciones), FILAS_POR_INSERT):
+        filas = [
+            {**notificacion, "estado": PENDIENTE, "intentos": 0, "disponible_en": ahora}
+            for notificacion in notificaciones[inicio:inicio + FILAS_POR_INSERT]
+        ]
+        stmt = insert_con_conflictos(db, notification_outbox).values(filas)
+        result = await db.execute(stmt.on_conflict_do_nothing(
+            index_elements=[notification_outbox.clave_idempotencia]
+        ))
+        encoladas += result.rowcount
+    return encoladas
+
+
+async def tomar_lote(
+    db: AsyncSession,
+    ahora: datetime,
+    tamano: int,
+    bloqueo: timedelta
+) -> Sequence[Row]:
+    """
+    Toma hasta `tamano` notificaciones listas y las bloquea para este worker.
+
+    Una notificación está lista si está pendiente y ya pasó su espera, o si
+    quedó "enviando" por un worker que no terminó (venció su bloqueo). Se
+    marcan con un solo UPDATE ... RETURNING y se hace commit antes de enviar,
+    para no mantener una transacción abierta durante la entrega.
+    """
+    candidatas = (
+        select(notification_outbox.id)
+        .where(
+            notification_outbox.estado.in_((PENDIENTE, ENVIANDO)),
+            notification_outbox.disponible_en <= ahora
+        )
+        .order_by(notification_outbox.disponible_en)
+        .limit(tamano)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(notification_outbox)
+        .where(
+            notification_outbox.id.in_(candidatas.scalar_subquery()),
+            notification_outbox.estado.in_((PENDIENTE, ENVIANDO)),
+            notification_outbox.disponible_en <= ahora
+        )
+        .values(
+            estado=ENVIANDO,
+            intentos=notification_outbox.intentos + 1,
+            disponible_en=ahora + bloqueo
+        )
+        .returning(
+            notification_outbox.id,
+            notification_outbox.usuario_id,
+            notification_outbox.titulo,
+            notification_outbox.cuerpo,
+            notification_outbox.url,
+            notification_outbox.intentos
+        )
+        .execution_options(synchronize_session=False)
+    )
+    filas = result.all()
+    await db.commit()
+    return filas
+
+
+async def procesar_lote(
+    db: AsyncSession,
+    servicio: Optional[PushService] = None,
+    ahora: Optional[datetime] = None
+) -> dict:
+    """
+    Toma un lote del outbox, lo entrega y registra el resultado de cada notificación.
+
+    - Con al menos un envío correcto queda "enviada".
+    - Si el usuario no tiene suscripciones activas (o todas caducaron) queda
+      "descartada": reintentar no cambiaría nada.
+    - Si hubo fallos transitorios vuelve a "pendiente" con espera exponencial,
+      o queda "fallida" al agotar outbox_max_attempts.
+
+    Returns:
+        Conteo por resultado: {tomadas, enviadas, reintentos, fallidas, descartadas}
+    """
+    servicio = servicio or push_service
+    ahora = ahora or ahora_utc()
+    resumen = {"tomadas": 0, "enviadas": 0, "reintentos": 0, "fallidas": 0, "descartadas": 0}
+
+    filas = await tomar_lote(
+        db,
+        ahora,
+        settings.outbox_batch_size,
+        timedelta(seconds=settings.outbox_lease_seconds)
+    )
+    if not filas:
+        return resumen
+    resumen["tomadas"] = len(filas)
+
+    stats = await servicio.send_messages(db, {
+        fila.id: {
+            "usuario_id": fila.usuario_id,
+            "title": fila.titulo,
+            "body": fila.cuerpo,
+            "url": fila.url
+        }
+        for fila in filas
+    })
+
+    fin = ahora_utc()
+    actualizaciones = []
+    for fila in filas:
+        stats_fila = stats[fila.id]
+        actualizacion = {"id": fila.id, "enviada_at": None, "ultimo_error": None}
+        if stats_fila["sent"] > 0:
+            actualizacion.update(estado=ENVIADA, disponible_en=fin, enviada_at=fin)
+            resumen["enviadas"] += 1
+        elif stats_fila["failed"] == len(stats_fila["invalid"]):
+            actualizacion.update(estado=DESCARTADA, disponible_en=fin,
+                                 ultimo_error="Sin suscripciones activas")
+            resumen["descartadas"] += 1
+        elif fila.intentos >= settings.outbox_max_attempts:
+            actualizacion.update(estado=FALLIDA, disponible_en=fin,
+                                 ultimo_error=f"{stats_fila['failed']} envíos fallidos")
+            resumen["fallidas"] += 1
+        else:
+            actualizacion.update(
+                estado=PENDIENTE,
+                disponible_en=fin + espera_reintento(fila.intentos, settings.outbox_retry_base_seconds),
+                ultimo_error=f"{stats_fila['failed']} envíos fallidos"
+            )
+            resumen["reintentos"] += 1
+        actualizaciones.append(actualizacion)
+
+    await db.execute(update(notification_outbox), actualizaciones)
+    await db.commit()
+    return resumen
+
+
+class TrabajadorOutbox:
+    """
+    Worker en segundo plano que drena el outbox.
+
+    Procesa lotes seguidos mientras vengan llenos y luego espera el intervalo
+    de sondeo, o menos si alguien llama a `despertar()` tras encolar.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker,
+        servicio: Optional[PushService] = None,
+        intervalo_segundos: Optional[float] = None
+    ):
+        self._sessionmaker = sessionmaker
+        self._servicio = servicio
+        self._intervalo = intervalo_segundos or settings.outbox_poll_interval_seconds
+        self._despertar = asyncio.Event()
+
+    def despertar(self) -> None:
+        """Pide procesar el outbox sin esperar al siguiente sondeo."""
+        self._despertar.set()
+
+    async def ejecutar(self) -> None:
+        """Bucle del worker; termina al cancelar la tarea."""
+        logger.info("📬 Worker de notificaciones iniciado")
+        while True:
+            self._despertar.clear()
+            try:
+                async with self._sessionmaker() as db:
+                    resumen = await procesar_lote(db, self._servicio)
+            except Exception as e:
+                logger.error(f"❌ Error procesando el outbox de notificaciones: {str(e)}")
+                resumen = {"tomadas": 0}
+
+            if resumen["tomadas"] >= settings.outbox_batch_size:
+                continue
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._despertar.wait(), self._intervalo)
+
+
+# Instancia global del worker
+trabajador_outbox = TrabajadorOutbox(async_session)
@@ -1,34 +1,175 @@
 """
 Servicio de notificaciones push.
 
-Utiliza pywebpush para enviar notificaciones push a los navegadores.
+Cifra los mensajes con pywebpush fuera del event loop y los entrega con
+aiohttp sobre un pool de conexiones keep-alive compartido (por origen),
+con un límite de envíos simultáneos.
 """
 
+import asyncio
 import json
 import logging
-from typing import Optional
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Hashable, Iterable, Mapping, Optional
+from urllib.parse import urlparse
 
-from pywebpush import webpush, WebPushException
-from sqlalchemy import select
+import aiohttp
+from py_vapid import Vapid
+from pywebpush import WebPusher, WebPushException
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models import push_subscriptions, usuario
+from app.metricas import notificaciones_push
+from app.models import push_subscriptions
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Resultado de cada envío
+ENVIADA = "sent"
+FALLIDA = "failed"
+INVALIDA = "invalid"  # La suscripción ya no existe: se desactiva
+
+# Códigos con los que el servicio push indica que la suscripción caducó
+CODIGOS_SUSCRIPCION_INVALIDA = {404, 410}
+
+# Vigencia del JWT VAPID y margen con el que se renueva antes de expirar
+VIGENCIA_VAPID_SEGUNDOS = 12 * 60 * 60
+MARGEN_VAPID_SEGUNDOS = 60 * 60
+
+
+class _SuscripcionInvalida(Exception):
+    """Las claves de la suscripción no permiten cifrar el mensaje."""
+
+
+def origen_endpoint(endpoint: str) -> str:
+    """Retorna el origen (esquema://host[:puerto]) de un endpoint push."""
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
 
 class PushService:
     """Servicio para enviar notificaciones push."""
 
-    def __init__(self):
-        self.vapid_private_key = settings.vapid_private_key
+    def __init__(
+        self,
+        vapid_private_key: Optional[str] = None,
+        vapid_claims_email: Optional[str] = None,
+        max_concurrencia: Optional[int] = None,
+        max_conexiones_por_origen: Optional[int] = None,
+        timeout_segundos: Optional[float] = None
+    ):
+        self.vapid_private_key = (
+            settings.vapid_private_key if vapid_private_key is None else vapid_private_key
+        )
         self.vapid_claims = {
-            "sub": settings.vapid_claims_email
+            "sub": vapid_claims_email or settings.vapid_claims_email
         }
+        self.max_concurrencia = max_concurrencia or settings.push_max_concurrency
+        self.max_conexiones_por_origen = (
+            max_conexiones_por_origen or settings.push_max_connections_per_origin
+        )
+        self.timeout_segundos = timeout_segundos or settings.push_timeout_seconds
+
+        self._vapid = self._cargar_vapid(self.vapid_private_key)
+        # origen -> (expiración, cabeceras VAPID firmadas); se firman desde hilos
+        self._cabeceras_vapid: dict[str, tuple[int, dict]] = {}
+        self._lock_vapid = threading.Lock()
+        self._sesion: Optional[aiohttp.ClientSession] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def _cargar_vapid(clave: str) -> Optional[Vapid]:
+        """
+        Carga la clave VAPID una sola vez, como lo hacía pywebpush.webpush.
+
+        La clave puede ser la ruta de un archivo PEM/DER o la clave en línea
+        (base64url o PEM). Si falta o no es válida retorna None y los envíos fallan.
+        """
+        if not clave:
+            return None
+        try:
+            if os.path.isfile(clave):
+                return Vapid.from_file(private_key_file=clave)
+            return Vapid.from_string(clave)
+        except Exception as e:
+            logger.error(f"❌ Clave VAPID inválida: {str(e)}")
+            return None
+
+    def _cabeceras_vapid_para(self, endpoint: str) -> dict:
+        """
+        Retorna las cabeceras VAPID para el origen del endpoint.
+
+        La firma (ECDSA) se reutiliza para todos los envíos al mismo servicio
+        push hasta que le quede menos de MARGEN_VAPID_SEGUNDOS de vigencia.
+        """
+        audiencia = origen_endpoint(endpoint)
+        with self._lock_vapid:
+            ahora = int(time.time())
+            cacheadas = self._cabeceras_vapid.get(audiencia)
+            if cacheadas and cacheadas[0] - MARGEN_VAPID_SEGUNDOS > ahora:
+                return cacheadas[1]
+
+            expiracion = ahora + VIGENCIA_VAPID_SEGUNDOS
+            cabeceras = self._vapid.sign({**self.vapid_claims, "aud": audiencia, "exp": expiracion})
+            self._cabeceras_vapid[audiencia] = (expiracion, cabeceras)
+            return cabeceras
+
+    def _preparar_envio(self, subscription_info: dict, datos: bytes) -> tuple[bytes, dict]:
+        """
+        Cifra el mensaje (aes128gcm) y arma las cabeceras de la petición.
 
-    def send_notification(
+        Es trabajo de CPU (ECDH + AES-GCM + firma VAPID), por eso se ejecuta
+        en un hilo y no en el event loop.
+        """
+        cabeceras = {
+            "TTL": "0",
+            "Content-Encoding": "aes128gcm",
+            **self._cabeceras_vapid_para(subscription_info["endpoint"])
+        }
+        try:
+            cifrado = WebPusher(subscription_info).encode(datos, "aes128gcm")
+        except (WebPushException, ValueError) as e:
+            raise _SuscripcionInvalida(str(e)) from e
+        return cifrado["body"], cabeceras
+
+    def _obtener_sesion(self) -> tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        """
+        Retorna la sesión HTTP compartida y el semáforo de concurrencia.
+
+        Se crean de forma perezosa en el event loop actual. El conector mantiene
+        las conexiones abiertas (keep-alive) y limita cuántas hay por origen.
+        """
+        loop = asyncio.get_running_loop()
+        if self._sesion is None or self._sesion.closed or self._loop is not loop:
+            conector = aiohttp.TCPConnector(
+                limit=self.max_concurrencia,
+                limit_per_host=self.max_conexiones_por_origen,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._sesion = aiohttp.ClientSession(
+                connector=conector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_segundos)
+            )
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+            self._loop = loop
+        return self._sesion, self._semaforo
+
+    async def cerrar(self) -> None:
+        """Cierra la sesión HTTP compartida y sus conexiones."""
+        if self._sesion is not None and not self._sesion.closed:
+            await self._sesion.close()
+        self._sesion = None
+        self._semaforo = None
+        self._loop = None
+
+    async def send_notification(
         self,
         subscription_info: dict,
         title: str,
@@ -36,7 +177,7 @@ class PushService:
         icon: Optional[str] = None,
         url: Optional[str] = None,
         tag: Optional[str] = None
-    ) -> bool:
+    ) -> str:
         """
         Envía una notificación push a una suscripción específica.
 
@@ -49,11 +190,26 @@ class PushService:
             tag: Tag para agrupar notificaciones (opcional)
 
         Returns:
-            True si se envió correctamente, False si falló
+            ENVIADA, FALLIDA (error transitorio o de configuración) o
+            INVALIDA (la suscripción caducó o sus claves no son válidas)
         """
-        if not self.vapid_private_key:
-            logger.error("VAPID private key no configurada")
-            return False
+        resultado = await self._enviar(subscription_info, title, body, icon, url, tag)
+        notificaciones_push.inc(result=resultado)
+        return resultado
+
+    async def _enviar(
+        self,
+        subscription_info: dict,
+        title: str,
+        body: str,
+        icon: Optional[str],
+        url: Optional[str],
+        tag: Optional[str]
+    ) -> str:
+        """Cifra y entrega una notificación; ver send_notification."""
+        if self._vapid is None:
+            logger.error("VAPID private key no configurada o inválida")
+            return FALLIDA
 
         payload = {
             "title": title,
@@ -65,25 +221,142 @@ class PushService:
                 "url": url or "/"
             }
         }
+        datos = json.dumps(payload).encode()
+        sesion, semaforo = self._obtener_sesion()
 
-        try:
-            webpush(
-                subscription_info=subscription_info,
-                data=json.dumps(payload),
-                vapid_private_key=self.vapid_private_key,
-                vapid_claims=self.vapid_claims
-            )
+        async with semaforo:
+            try:
+                cuerpo, cabeceras = await asyncio.to_thread(
+                    self._preparar_envio, subscription_info, datos
+                )
+            except _SuscripcionInvalida as e:
+                logger.warning(f"Suscripción con claves inválidas: {e}")
+                return INVALIDA
+            except Exception as e:
+                logger.error(f"Error inesperado preparando notificación: {e}")
+                return FALLIDA
+
+            try:
+                async with sesion.post(
+                    subscription_info["endpoint"], data=cuerpo, headers=cabeceras
+                ) as respuesta:
+                    # Leer el cuerpo devuelve la conexión al pool
+                    await respuesta.read()
+                    codigo = respuesta.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error enviando notificación push: {e!r}")
+                return FALLIDA
+
+        if codigo < 300:
             logger.info(f"Notificación enviada: {title}")
-            return True
-        except WebPushException as e:
-            logger.error(f"Error enviando notificación push: {e}")
-            # Si el código es 410 (Gone) o 404 (Not Found), la suscripción ya no es válida
-            if e.response and e.response.status_code in [404, 410]:
-                logger.warning("Suscripción ya no es válida")
-            return False
-        except Exception as e:
-            logger.error(f"Error inesperado enviando notificación: {e}")
-            return False
+            return ENVIADA
+        if codigo in CODIGOS_SUSCRIPCION_INVALIDA:
+            logger.warning("Suscripción ya no es válida")
+            return INVALIDA
+        logger.error(f"Error enviando notificación push: HTTP {codigo}")
+        return FALLIDA
+
+    async def send_messages(
+        self,
+        db: AsyncSession,
+        mensajes: Mapping[Hashable, dict]
+    ) -> dict[Hashable, dict]:
+        """
+        Envía cada mensaje a todas las suscripciones activas de su usuario.
+
+        Las suscripciones de todos los usuarios se cargan con una sola consulta
+        y los envíos se hacen de forma concurrente. Las suscripciones caducadas
+        se desactivan con un solo UPDATE.
+
+        Args:
+            db: Sesión de base de datos
+            mensajes: {clave: {usuario_id, title, body, icon?, url?}}
+
+        Returns:
+            Diccionario {clave: {sent: int, failed: int, invalid: list}}
+        """
+        stats = {clave: {"sent": 0, "failed": 0, "invalid": []} for clave in mensajes}
+        if not mensajes:
+            return stats
+
+        result = await db.execute(
+            select(
+                push_subscriptions.id,
+                push_subscriptions.usuario_id,
+                push_subscriptions.endpoint,
+                push_subscriptions.p256dh_key,
+                push_subscriptions.auth_key
+            ).where(
+                push_subscriptions.usuario_id.in_({m["usuario_id"] for m in mensajes.values()}),
+                push_subscriptions.activa == True
+            )
+        )
+        subscriptions_por_usuario = defaultdict(list)
+        for sub in result.all():
+            subscriptions_por_usuario[sub.usuario_id].append(sub)
+
+        envios = [
+            (clave, sub)
+            for clave, mensaje in mensajes.items()
+            for sub in subscriptions_por_usuario[mensaje["usuario_id"]]
+        ]
+        resultados = await asyncio.gather(*(
+            self.send_notification(
+                subscription_info={
+                    "endpoint": sub.endpoint,
+                    "keys": {
+                        "p256dh": sub.p256dh_key,
+                        "auth": sub.auth_key
+                    }
+                },
+                title=mensajes[clave]["title"],
+                body=mensajes[clave]["body"],
+                icon=mensajes[clave].get("icon"),
+                url=mensajes[clave].get("url")
+            )
+            for clave, sub in envios
+        ))
+
+        invalidas = set()
+        for (clave, sub), resultado in zip(envios, resultados):
+            stats_mensaje = stats[clave]
+            if resultado == ENVIADA:
+                stats_mensaje["sent"] += 1
+                continue
+            stats_mensaje["failed"] += 1
+            if resultado == INVALIDA:
+                stats_mensaje["invalid"].append(sub.id)
+                invalidas.add(sub.id)
+
+        if invalidas:
+            await db.execute(
+                update(push_subscriptions)
+                .where(push_subscriptions.id.in_(invalidas))
+                .values(activa=False)
+            )
+            await db.commit()
+
+        return stats
+
+    async def send_to_users(
+        self,
+        db: AsyncSession,
+        user_ids: Iterable[int],
+        title: str,
+        body: str,
+        icon: Optional[str] = None,
+        url: Optional[str] = None
+    ) -> dict[int, dict]:
+        """
+        Envía la misma notificación a todas las suscripciones activas de varios usuarios.
+
+        Returns:
+            Diccionario {user_id: {sent: int, failed: int, invalid: list}}
+        """
+        return await self.send_messages(db, {
+            user_id: {"usuario_id": user_id, "title": title, "body": body, "icon": icon, "url": url}
+            for user_id in user_ids
+        })
 
     async def send_to_user(
         self,
@@ -108,46 +381,8 @@ class PushService:
         Returns:
             Diccionario con estadísticas: {sent: int, failed: int, invalid: list}
         """
-        # Obtener todas las suscripciones activas del usuario
-        result = await db.execute(
-            select(push_subscriptions).where(
-                push_subscriptions.usuario_id == user_id,
-                push_subscriptions.activa == True
-            )
-        )
-        subscriptions = result.scalars().all()
-
-        stats = {"sent": 0, "failed": 0, "invalid": []}
-
-        for sub in subscriptions:
-            subscription_info = {
-                "endpoint": sub.endpoint,
-                "keys": {
-                    "p256dh": sub.p256dh_key,
-                    "auth": sub.auth_key
-                }
-            }
-
-            success = self.send_notification(
-                subscription_info=subscription_info,
-                title=title,
-                body=body,
-                icon=icon,
-                url=url
-            )
-
-            if success:
-                stats["sent"] += 1
-            else:
-                stats["failed"] += 1
-                # Marcar suscripción como inactiva si falló
-                sub.activa = False
-                stats["invalid"].append(sub.id)
-
-        if stats["invalid"]:
-            await db.commit()
-
-        return stats
+        stats = await self.send_to_users(db, [user_id], title, body, icon=icon, url=url)
+        return stats[user_id]
 
 
 # Instancia global del servicio
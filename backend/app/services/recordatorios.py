@@ -0,0 +1,146 @@
+"""
+Selección y reprogramación de recordatorios diarios.
+
+Cada usuario con notificaciones activas guarda en `next_reminder_at_utc` el
+próximo instante (UTC) en que le toca el recordatorio. El modelo lo recalcula
+cuando cambia la hora, la zona horaria o se activan/desactivan las
+notificaciones; aquí se seleccionan los vencidos con una consulta de rango
+sobre el índice y se reprograman tras cada envío. Solo se notifica a quien
+aún tiene hábitos pendientes en su fecha local.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Mapping, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Row, and_, case, func, literal, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import habitos, progreso_habitos, registros, usuario
+from app.utils import ZONA_HORARIA_POR_DEFECTO, bit_dia, proximo_recordatorio_utc
+
+# Un recordatorio se envía hasta 5 minutos antes de su hora
+TOLERANCIA_ANTICIPO = timedelta(minutes=5)
+# Recordatorios vencidos hace más de esto (p. ej. ticks perdidos) solo se reprograman
+RETRASO_MAXIMO = timedelta(hours=1)
+
+
+def fecha_local(instante_utc: datetime, zona_horaria: Optional[str]) -> date:
+    """Fecha en la zona del usuario de un instante UTC sin tzinfo."""
+    zona = ZoneInfo(zona_horaria or ZONA_HORARIA_POR_DEFECTO)
+    return instante_utc.replace(tzinfo=timezone.utc).astimezone(zona).date()
+
+
+async def seleccionar_recordatorios_vencidos(db: AsyncSession, ahora: datetime) -> Sequence[Row]:
+    """
+    Retorna los usuarios cuyo recordatorio ya venció (o vence dentro de la tolerancia).
+
+    Args:
+        db: Sesión de base de datos
+        ahora: Instante actual en UTC sin tzinfo
+
+    Returns:
+        Filas (id, hora_recordatorio, timezone, next_reminder_at_utc)
+    """
+    result = await db.execute(
+        select(
+            usuario.id,
+            usuario.hora_recordatorio,
+            usuario.timezone,
+            usuario.next_reminder_at_utc
+        ).where(
+            usuario.next_reminder_at_utc <= ahora + TOLERANCIA_ANTICIPO,
+            usuario.notificaciones_activas == True
+        ).order_by(usuario.next_reminder_at_utc)
+    )
+    return result.all()
+
+
+async def contar_habitos_pendientes(
+    db: AsyncSession,
+    usuarios_por_fecha: Mapping[date, Iterable[int]]
+) -> dict[int, int]:
+    """
+    Cuenta los hábitos pendientes de cada usuario en su fecha local.
+
+    Si el usuario ya tiene el registro del día, son sus progresos sin completar
+    (de hábitos activos); si no, los hábitos activos programados ese día, que
+    son los progresos que tendrá el registro al crearse. Se resuelve con una
+    sola consulta: un SELECT por fecha local distinta (en un tick hay pocas)
+    unidos con UNION ALL, con subconsultas correlacionadas sobre los índices
+    de progreso_habitos y habitos.
+
+    Args:
+        db: Sesión de base de datos
+        usuarios_por_fecha: {fecha local: IDs de usuarios}
+
+    Returns:
+        Diccionario {usuario_id: hábitos pendientes}
+    """
+    consultas = []
+    for fecha, usuario_ids in usuarios_por_fecha.items():
+        usuario_ids = list(usuario_ids)
+        if not usuario_ids:
+            continue
+        sin_completar = (
+            select(func.count(progreso_habitos.id))
+            .join(habitos, habitos.id == progreso_habitos.habito_id)
+            .where(
+                progreso_habitos.registro_id == registros.id,
+                progreso_habitos.completado == False,
+                habitos.activo == 1
+            )
+            .scalar_subquery()
+        )
+        programados = (
+            select(func.count(habitos.id))
+            .where(
+                habitos.usuario_id == usuario.id,
+                habitos.activo == 1,
+                habitos.dias_mask.op("&")(bit_dia(fecha)) != 0
+            )
+            .scalar_subquery()
+        )
+        consultas.append(
+            select(
+                usuario.id.label("usuario_id"),
+                case((registros.id.is_(None), programados), else_=sin_completar).label("pendientes")
+            )
+            .select_from(usuario)
+            .outerjoin(registros, and_(
+                registros.usuario_id == usuario.id,
+                registros.fecha == literal(fecha.isoformat())
+            ))
+            .where(usuario.id.in_(usuario_ids))
+        )
+
+    if not consultas:
+        return {}
+    stmt = consultas[0] if len(consultas) == 1 else union_all(*consultas)
+    result = await db.execute(stmt)
+    return {fila.usuario_id: fila.pendientes for fila in result.all()}
+
+
+async def reprogramar_recordatorios(db: AsyncSession, vencidos: Sequence[Row], ahora: datetime) -> None:
+    """
+    Mueve el próximo recordatorio de los usuarios vencidos a su siguiente ocurrencia.
+
+    La siguiente ocurrencia se calcula después de la ventana de tolerancia, de
+    modo que el próximo tick no vuelva a seleccionarlos. Se actualiza con un
+    solo UPDATE por clave primaria (executemany).
+    """
+    if not vencidos:
+        return
+    despues = ahora + TOLERANCIA_ANTICIPO
+    await db.execute(
+        update(usuario),
+        [
+            {
+                "id": fila.id,
+                "next_reminder_at_utc": proximo_recordatorio_utc(
+                    fila.hora_recordatorio, fila.timezone, despues
+                )
+            }
+            for fila in vencidos
+        ]
+    )
@@ -0,0 +1,193 @@
+"""
+Servicio de agregados diarios (daily_rollups).
+
+Mantiene, por usuario y fecha con registro, cuántos hábitos estaban
+programados y cuántos se completaron. Las rutas de escritura actualizan
+la tabla dentro de su propia transacción y las rutas de lectura la
+consultan en lugar de recalcular desde progreso_habitos.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import insert_con_conflictos
+from app.models import daily_rollups, habitos, progreso_habitos, registros
+from app.utils import bit_dia, contador_habitos_programados
+
+logger = logging.getLogger(__name__)
+
+
+async def recalcular_rollups(
+    db: AsyncSession,
+    usuario_id: int,
+    fechas: Optional[Iterable[str]] = None,
+    desde: Optional[str] = None
+) -> int:
+    """
+    Recalcula desde cero los agregados de un usuario.
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+        fechas: Fechas (YYYY-MM-DD) a recalcular. Si es None, todo el historial
+        desde: Limita el recálculo a fechas >= desde (YYYY-MM-DD)
+
+    Returns:
+        Número de filas de agregados escritas
+    """
+    condiciones = [registros.usuario_id == usuario_id]
+    if fechas is not None:
+        fechas = list(fechas)
+        if not fechas:
+            return 0
+        condiciones.append(registros.fecha.in_(fechas))
+    if desde is not None:
+        condiciones.append(registros.fecha >= desde)
+
+    # Completados por fecha en una sola consulta agrupada
+    completados_result = await db.execute(
+        select(
+            registros.fecha,
+            func.coalesce(
+                func.sum(case((progreso_habitos.completado == True, 1), else_=0)),
+                0
+            )
+        )
+        .select_from(registros)
+        .outerjoin(progreso_habitos, progreso_habitos.registro_id == registros.id)
+        .where(and_(*condiciones))
+        .group_by(registros.fecha)
+    )
+    completados_por_fecha = completados_result.all()
+
+    habitos_result = await db.execute(
+        select(habitos.dias_mask, habitos.created_at).where(habitos.usuario_id == usuario_id)
+    )
+    contar_programados = contador_habitos_programados(habitos_result.all())
+
+    # Reemplazar las filas afectadas (las fechas sin registro quedan eliminadas)
+    borrar = delete(daily_rollups).where(daily_rollups.usuario_id == usuario_id)
+    if fechas is not None:
+        borrar = borrar.where(daily_rollups.fecha.in_(fechas))
+    if desde is not None:
+        borrar = borrar.where(daily_rollups.fecha >= desde)
+    await db.execute(borrar)
+
+    filas = [
+        {
+            "usuario_id": usuario_id,
+            "fecha": fecha,
+            "programados": contar_programados(date.fromisoformat(fecha)),
+            "completados": int(completados),
+        }
+        for fecha, completados in completados_por_fecha
+    ]
+    if filas:
+        await db.execute(insert(daily_rollups), filas)
+
+    return len(filas)
+
+
+async def crear_rollup_registro_nuevo(
+    db: AsyncSession,
+    usuario_id: int,
+    fecha: str
+) -> None:
+    """
+    Crea el agregado de un registro recién creado con un único INSERT ... SELECT.
+
+    Un registro nuevo aún no tiene progresos completados, así que solo hay que
+    contar los hábitos programados ese día (misma regla que recalcular_rollups).
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+        fecha: Fecha del registro (YYYY-MM-DD)
+    """
+    fecha_obj = date.fromisoformat(fecha)
+    # created_at.date() <= fecha, expresado como rango para usar el valor tal cual
+    fin_del_dia = datetime.combine(fecha_obj + timedelta(days=1), time.min)
+
+    programados = (
+        select(
+            literal(usuario_id),
+            literal(fecha),
+            func.count(habitos.id),
+            literal(0)
+        )
+        .where(
+            and_(
+                habitos.usuario_id == usuario_id,
+                habitos.dias_mask.op("&")(bit_dia(fecha_obj)) != 0,
+                habitos.created_at < fin_del_dia
+            )
+        )
+    )
+    stmt = insert_con_conflictos(db, daily_rollups).from_select(
+        ["usuario_id", "fecha", "programados", "completados"], programados
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[daily_rollups.usuario_id, daily_rollups.fecha],
+        set_={
+            "programados": stmt.excluded.programados,
+            "completados": stmt.excluded.completados,
+        }
+    ))
+
+
+async def ajustar_completados(
+    db: AsyncSession,
+    usuario_id: int,
+    fecha: str,
+    delta: int
+) -> None:
+    """
+    Suma `delta` al contador de completados de un día.
+
+    Si la fila aún no existe (historial previo a la tabla), se recalcula ese día.
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+        fecha: Fecha del registro (YYYY-MM-DD)
+        delta: +1 al completar, -1 al desmarcar
+    """
+    if delta == 0:
+        return
+
+    result = await db.execute(
+        update(daily_rollups)
+        .where(
+            and_(
+                daily_rollups.usuario_id == usuario_id,
+                daily_rollups.fecha == fecha
+            )
+        )
+        .values(completados=daily_rollups.completados + delta)
+    )
+    if result.rowcount == 0:
+        await recalcular_rollups(db, usuario_id, [fecha])
+
+
+async def eliminar_rollups(
+    db: AsyncSession,
+    usuario_id: int,
+    fechas: Optional[Iterable[str]] = None
+) -> None:
+    """
+    Elimina los agregados de un usuario (todos o solo las fechas indicadas).
+
+    Args:
+        db: Sesión de base de datos (no hace commit)
+        usuario_id: ID del usuario
+        fechas: Fechas (YYYY-MM-DD) a eliminar. Si es None, todas
+    """
+    borrar = delete(daily_rollups).where(daily_rollups.usuario_id == usuario_id)
+    if fechas is not None:
+        borrar = borrar.where(daily_rollups.fecha.in_(list(fechas)))
+    await db.execute(borrar)
+
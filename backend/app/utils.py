@@ -4,13 +4,28 @@ Utilidades compartidas para la aplicación.
 Funciones helper para manejo de días de hábitos, parsing seguro, etc.
 """
 
+import hashlib
 import json
 import logging
-from datetime import date
-from typing import List
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import Request, Response
 
 logger = logging.getLogger(__name__)
 
+# Letras de los días de la semana en orden de date.weekday()
+DIAS_SEMANA = ['L', 'M', 'X', 'J', 'V', 'S', 'D']
+
+# Bit de cada día en la máscara de días del hábito (bit 0 = Lunes ... bit 6 = Domingo)
+DIA_BITS = {letra: 1 << i for i, letra in enumerate(DIAS_SEMANA)}
+
+# Valores por defecto de la configuración de recordatorios del usuario
+HORA_RECORDATORIO_POR_DEFECTO = "08:00"
+ZONA_HORARIA_POR_DEFECTO = "America/Santo_Domingo"
+
 
 def parsear_dias_habito(dias_str: str) -> List[str]:
     """
@@ -89,3 +104,167 @@ def dia_en_lista(dias_str: str, dia_letra: str) -> bool:
     except ValueError as e:
         logger.warning(f"Error parseando días del hábito: {e}. dias_str='{dias_str}'")
         return False
+
+
+def dias_a_mascara(dias_str: str) -> int:
+    """
+    Convierte la cadena JSON de días del hábito a una máscara de 7 bits.
+
+    Args:
+        dias_str: String JSON con días (ej: '["L", "M", "X"]')
+
+    Returns:
+        Máscara con el bit `weekday()` encendido para cada día (ej: 0b0000111)
+
+    Note:
+        Si el JSON es inválido, retorna 0 (ningún día) y loggea el error
+    """
+    if not dias_str:
+        return 0
+
+    try:
+        dias = parsear_dias_habito(dias_str)
+    except ValueError as e:
+        logger.warning(f"Error parseando días del hábito: {e}. dias_str='{dias_str}'")
+        return 0
+
+    mascara = 0
+    for dia in dias:
+        mascara |= DIA_BITS.get(dia, 0)
+    return mascara
+
+
+def mascara_a_dias(mascara: int) -> List[str]:
+    """
+    Convierte una máscara de días a la lista de letras correspondiente.
+
+    Args:
+        mascara: Máscara de 7 bits (bit 0 = Lunes)
+
+    Returns:
+        Lista de letras en orden de la semana (ej: ['L', 'M', 'X'])
+    """
+    return [letra for letra, bit in DIA_BITS.items() if mascara & bit]
+
+
+def bit_dia(fecha: date) -> int:
+    """Retorna el bit de la máscara de días que corresponde a una fecha."""
+    return 1 << fecha.weekday()
+
+
+def dia_en_mascara(mascara: int, fecha: date) -> bool:
+    """
+    Verifica si una fecha cae en uno de los días de la máscara.
+
+    Args:
+        mascara: Máscara de 7 bits del hábito
+        fecha: Fecha a verificar
+
+    Returns:
+        True si el día de la semana de la fecha está en la máscara
+    """
+    return bool((mascara or 0) & bit_dia(fecha))
+
+
+def contador_habitos_programados(habitos_list) -> Callable[[date], int]:
+    """
+    Prepara un contador de hábitos programados por fecha.
+
+    Los hábitos se agrupan por día de la semana (según su máscara de días) en
+    listas ordenadas de fechas de creación, de modo que contar los hábitos de
+    una fecha es una búsqueda binaria en lugar de recorrer todos los hábitos.
+
+    Args:
+        habitos_list: Filas con atributos dias_mask y created_at
+
+    Returns:
+        Función que recibe una fecha y retorna cuántos hábitos aplican ese día
+    """
+    creados_por_dia = [[] for _ in DIAS_SEMANA]
+    for h in habitos_list:
+        for weekday, creados in enumerate(creados_por_dia):
+            if (h.dias_mask or 0) & (1 << weekday):
+                creados.append(h.created_at.date())
+
+    for creados in creados_por_dia:
+        creados.sort()
+
+    def contar(fecha: date) -> int:
+        # Solo contar hábitos que ya existían en esa fecha
+        return bisect_right(creados_por_dia[fecha.weekday()], fecha)
+
+    return contar
+
+
+def proximo_recordatorio_utc(
+    hora_recordatorio: Optional[str],
+    zona_horaria: Optional[str],
+    despues: datetime
+) -> Optional[datetime]:
+    """
+    Calcula el próximo instante posterior a `despues` en que son las
+    `hora_recordatorio` en la zona horaria del usuario.
+
+    Se avanza por fechas locales (no sumando 24 h en UTC), así el recordatorio
+    se mantiene a la misma hora local al cruzar un cambio de horario. Una hora
+    que no existe ese día (adelanto de primavera) se corre hacia adelante lo
+    que dura el salto; una hora que se repite (atraso de otoño) se toma en su
+    primera ocurrencia.
+
+    Args:
+        hora_recordatorio: Hora local en formato HH:MM
+        zona_horaria: Nombre IANA de la zona (ej: "America/Santo_Domingo")
+        despues: Instante de referencia (sin tzinfo se asume UTC)
+
+    Returns:
+        Instante en UTC sin tzinfo, o None si la hora o la zona no son válidas
+    """
+    try:
+        hora, minuto = map(int, (hora_recordatorio or HORA_RECORDATORIO_POR_DEFECTO).split(":"))
+        hora_local = time(hora, minuto)
+        zona = ZoneInfo(zona_horaria or ZONA_HORARIA_POR_DEFECTO)
+    except (ValueError, ZoneInfoNotFoundError) as e:
+        logger.warning(f"Configuración de recordatorio inválida: {e}")
+        return None
+
+    if despues.tzinfo is None:
+        despues = despues.replace(tzinfo=timezone.utc)
+
+    fecha = despues.astimezone(zona).date()
+    while True:
+        candidato = datetime.combine(fecha, hora_local, tzinfo=zona).astimezone(timezone.utc)
+        if candidato > despues:
+            return candidato.replace(tzinfo=None)
+        fecha += timedelta(days=1)
+
+
+def respuesta_revalidable(request: Request, contenido: Any) -> Response:
+    """
+    Serializa una respuesta JSON con ETag para que el cliente pueda revalidarla.
+
+    El ETag es un hash del cuerpo; si coincide con el If-None-Match de la
+    petición se responde 304 sin cuerpo. Cache-Control "private, no-cache"
+    obliga a revalidar siempre (los datos cambian con cada registro) pero
+    evita volver a transferir meses que no cambiaron.
+
+    Args:
+        request: Petición entrante (para leer If-None-Match)
+        contenido: Datos serializables a JSON
+
+    Returns:
+        Response 200 con el JSON o 304 si el cliente ya tiene esta versión
+    """
+    cuerpo = json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = f'"{hashlib.sha256(cuerpo).hexdigest()[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    etiquetas = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+    if etag in etiquetas or "*" in etiquetas:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
@@ -0,0 +1,7 @@
+"""
+Benchmarks de rendimiento del backend.
+
+Cada módulo se ejecuta de forma independiente desde el directorio backend/:
+
+    python -m benchmarks.bench_rendimiento
+"""
@@ -0,0 +1,123 @@
+"""
+Prueba de carga: latencia de endpoints sin autenticación durante una ráfaga de logins.
+
+Levanta la aplicación en proceso (httpx + ASGITransport, un solo event loop
+como un worker de uvicorn) sobre una base SQLite temporal. Mientras
+`LOGINS_CONCURRENTES` clientes hacen login en bucle, otro cliente ya
+autenticado consulta GET /api/categorias/ y se mide su p50/p99.
+
+Se ejecuta dos veces: con bcrypt bloqueando el event loop (comportamiento
+anterior) y con el pool dedicado de app.security.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_login_storm
+"""
+
+import asyncio
+import statistics
+import time
+from contextlib import contextmanager
+
+from httpx import ASGITransport, AsyncClient
+
+from app import security
+from app.database import get_db
+from app.main import app
+from app.models import categorias, usuario
+from benchmarks.common import crear_engine_temporal, crear_sessionmaker
+
+LOGINS_CONCURRENTES = 8
+DURACION_SEGUNDOS = 5.0
+PAUSA_LECTOR_SEGUNDOS = 0.01
+
+
+@contextmanager
+def bcrypt_en_event_loop():
+    """Reproduce el comportamiento anterior: bcrypt se ejecuta en el event loop."""
+    original = security._ejecutar_bcrypt
+
+    async def en_linea(funcion, *args):
+        return funcion(*args)
+
+    security._ejecutar_bcrypt = en_linea
+    try:
+        yield
+    finally:
+        security._ejecutar_bcrypt = original
+
+
+async def ejecutar(nombre: str, token: str) -> None:
+    """Corre la ráfaga de logins y mide la latencia del lector."""
+    headers = {"Authorization": f"Bearer {token}"}
+    latencias: list[float] = []
+    logins = 0
+    rechazados = 0
+    fin = time.perf_counter() + DURACION_SEGUNDOS
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def login_en_bucle() -> None:
+            nonlocal logins, rechazados
+            while time.perf_counter() < fin:
+                response = await client.post(
+                    "/api/auth/login",
+                    json={"identifier": "bench@example.com", "password": "BenchPassword123"}
+                )
+                if response.status_code == 503:
+                    rechazados += 1
+                    await asyncio.sleep(0.05)
+                else:
+                    logins += 1
+
+        async def lector() -> None:
+            while time.perf_counter() < fin:
+                inicio = time.perf_counter()
+                response = await client.get("/api/categorias/", headers=headers)
+                assert response.status_code == 200
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                await asyncio.sleep(PAUSA_LECTOR_SEGUNDOS)
+
+        await asyncio.gather(lector(), *(login_en_bucle() for _ in range(LOGINS_CONCURRENTES)))
+
+    latencias.sort()
+    p99 = latencias[max(int(len(latencias) * 0.99) - 1, 0)]
+    print(
+        f"{nombre:<26} categorias p50={statistics.median(latencias):7.2f} ms  "
+        f"p99={p99:8.2f} ms  ({len(latencias)} lecturas)  "
+        f"logins={logins}  503={rechazados}"
+    )
+
+
+async def main() -> None:
+    engine = await crear_engine_temporal()
+    sessionmaker = crear_sessionmaker(engine)
+
+    async with sessionmaker() as session:
+        user = usuario(
+            nombre="bench",
+            email="bench@example.com",
+            contrasena=security.hash_password("BenchPassword123")
+        )
+        session.add_all([user, categorias(nombre="Salud")])
+        await session.commit()
+    token = security.create_access_token(data={"sub": str(user.id)})
+
+    async def override_get_db():
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    print(f"{LOGINS_CONCURRENTES} clientes haciendo login durante {DURACION_SEGUNDOS:.0f} s\n")
+    try:
+        with bcrypt_en_event_loop():
+            await ejecutar("bcrypt en el event loop", token)
+        await ejecutar("bcrypt en pool dedicado", token)
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
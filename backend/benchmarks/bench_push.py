@@ -0,0 +1,102 @@
+"""
+Benchmark: entrega de notificaciones push contra un servicio push local.
+
+Compara el envío anterior (pywebpush.webpush síncrono, una suscripción tras
+otra, una conexión nueva por petición) con PushService (cifrado en hilos,
+envíos concurrentes y pool keep-alive por origen).
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_push
+"""
+
+import asyncio
+import json
+import time
+
+from pywebpush import webpush
+
+from app.services.push_service import PushService
+from app.models import push_subscriptions, usuario
+from benchmarks.common import crear_engine_temporal, crear_sessionmaker
+from benchmarks.servidor_push import generar_clave_vapid, generar_suscripcion, servidor_push_local
+
+NUM_USUARIOS = 100
+SUSCRIPCIONES_POR_USUARIO = 2
+LATENCIA_MS = 20
+
+
+def _imprimir(nombre: str, enviadas: int, segundos: float, conexiones: int) -> None:
+    print(
+        f"{nombre:<34} {enviadas:5d} envíos en {segundos:6.2f} s  "
+        f"({enviadas / segundos:8.1f}/s)  conexiones TCP={conexiones}"
+    )
+
+
+async def main() -> None:
+    clave_vapid = generar_clave_vapid()
+    engine = await crear_engine_temporal()
+    sessionmaker = crear_sessionmaker(engine)
+
+    async with servidor_push_local(latencia_ms=LATENCIA_MS) as servidor:
+        async with sessionmaker() as session:
+            usuarios = [
+                usuario(nombre=f"bench{i}", email=f"bench{i}@example.com", contrasena="x")
+                for i in range(NUM_USUARIOS)
+            ]
+            session.add_all(usuarios)
+            await session.flush()
+            suscripciones = []
+            for user in usuarios:
+                for j in range(SUSCRIPCIONES_POR_USUARIO):
+                    info = generar_suscripcion(f"{servidor.url_base}/push/{user.id}-{j}")
+                    suscripciones.append(info)
+                    session.add(push_subscriptions(
+                        usuario_id=user.id,
+                        endpoint=info["endpoint"],
+                        p256dh_key=info["keys"]["p256dh"],
+                        auth_key=info["keys"]["auth"]
+                    ))
+            await session.commit()
+            user_ids = [user.id for user in usuarios]
+
+        print(
+            f"{len(suscripciones)} suscripciones, servicio push local con "
+            f"{LATENCIA_MS} ms de latencia\n"
+        )
+
+        # Antes: webpush síncrono, uno por uno. Se ejecuta en un hilo solo para
+        # que el servicio push local (en este mismo event loop) pueda responder.
+        datos = json.dumps({"title": "Bench", "body": "Recordatorio"})
+
+        def enviar_secuencial() -> None:
+            for info in suscripciones:
+                webpush(
+                    subscription_info=info,
+                    data=datos,
+                    vapid_private_key=clave_vapid,
+                    vapid_claims={"sub": "mailto:bench@example.com"}
+                )
+
+        inicio = time.perf_counter()
+        await asyncio.to_thread(enviar_secuencial)
+        _imprimir("webpush secuencial", servidor.peticiones, time.perf_counter() - inicio,
+                  len(servidor.conexiones))
+
+        # Después: PushService.send_to_users
+        servidor.peticiones = 0
+        servidor.conexiones.clear()
+        servicio = PushService(vapid_private_key=clave_vapid)
+        async with sessionmaker() as session:
+            inicio = time.perf_counter()
+            stats = await servicio.send_to_users(session, user_ids, "Bench", "Recordatorio")
+            segundos = time.perf_counter() - inicio
+        await servicio.cerrar()
+        enviadas = sum(s["sent"] for s in stats.values())
+        _imprimir("PushService.send_to_users", enviadas, segundos, len(servidor.conexiones))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
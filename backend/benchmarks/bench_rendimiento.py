@@ -0,0 +1,105 @@
+"""
+Benchmark de /api/analisis/rendimiento.
+
+Compara la implementación anterior (una consulta COUNT por fecha y parseo del
+JSON de días por hábito y fecha) con la lectura actual desde daily_rollups, sobre
+un historial sembrado de varios años.
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_rendimiento
+"""
+
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, func, select
+
+from app.models import habitos, progreso_habitos, registros
+from app.routers.analisis import get_dia_letra, get_rendimiento_por_dia
+from benchmarks.common import crear_engine_temporal, crear_sessionmaker, medir, poblar_historial
+
+
+def dia_aplica_para_habito(dias_json: str, fecha: date) -> bool:
+    """Chequeo previo de días: parsea el JSON en cada llamada."""
+    try:
+        dias = json.loads(dias_json) if dias_json else []
+        return get_dia_letra(fecha) in dias
+    except (json.JSONDecodeError, TypeError):
+        return False
+
+
+async def rendimiento_anterior(db, usuario_id: int, fecha_inicio: str, fecha_fin: str) -> list:
+    """Reproducción de la implementación previa (N+1 por fecha)."""
+    fechas_result = await db.execute(
+        select(registros.fecha)
+        .where(
+            and_(
+                registros.usuario_id == usuario_id,
+                registros.fecha >= fecha_inicio,
+                registros.fecha <= fecha_fin
+            )
+        )
+        .distinct()
+        .order_by(registros.fecha)
+    )
+    fechas = [row[0] for row in fechas_result.all()]
+
+    habitos_result = await db.execute(
+        select(habitos.id, habitos.dias, habitos.created_at)
+        .where(habitos.usuario_id == usuario_id)
+    )
+    habitos_list = habitos_result.all()
+
+    respuesta = []
+    for fecha in fechas:
+        fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
+        total = sum(
+            1 for h in habitos_list
+            if dia_aplica_para_habito(h.dias, fecha_obj) and h.created_at.date() <= fecha_obj
+        )
+        completados_result = await db.execute(
+            select(func.count())
+            .select_from(progreso_habitos)
+            .join(registros, registros.id == progreso_habitos.registro_id)
+            .where(
+                and_(
+                    registros.usuario_id == usuario_id,
+                    registros.fecha == fecha,
+                    progreso_habitos.completado == True
+                )
+            )
+        )
+        respuesta.append((fecha, total, completados_result.scalar() or 0))
+    return respuesta
+
+
+async def main() -> None:
+    engine = await crear_engine_temporal()
+    session_maker = crear_sessionmaker(engine)
+
+    async with session_maker() as session:
+        user, _, fecha_fin = await poblar_historial(session, anios=3)
+
+    for dias in (30, 365, 3 * 365):
+        inicio = (fecha_fin - timedelta(days=dias)).isoformat()
+        fin = fecha_fin.isoformat()
+        print(f"\nRango de {dias} días")
+
+        async with session_maker() as session:
+            anterior = await rendimiento_anterior(session, user.id, inicio, fin)
+            actual = await get_rendimiento_por_dia(inicio, fin, current_user=user, db=session)
+            assert anterior == [(r.fecha, r.habitos, r.habitos_completados) for r in actual]
+
+            await medir("anterior (COUNT por fecha)", lambda: rendimiento_anterior(session, user.id, inicio, fin))
+            await medir(
+                "actual (daily_rollups)",
+                lambda: get_rendimiento_por_dia(inicio, fin, current_user=user, db=session)
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
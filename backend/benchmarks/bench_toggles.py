@@ -0,0 +1,81 @@
+"""
+Benchmark de escritura concurrente: toggles de progreso.
+
+Lanza muchos toggles concurrentes (cada uno con su propia sesión, como las
+peticiones reales) contra una base SQLite en archivo, primero con los valores
+por defecto de SQLite (journal DELETE, synchronous FULL) y después con los
+PRAGMA de app.database.configurar_sqlite (WAL, synchronous NORMAL, ...).
+
+Uso (desde backend/):
+
+    python -m benchmarks.bench_toggles
+"""
+
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.models import progreso_habitos, registros
+from app.routers.registros import toggle_progreso
+from benchmarks.common import crear_engine_temporal, crear_sessionmaker, poblar_historial
+
+CLIENTES = 20
+TOGGLES_POR_CLIENTE = 50
+
+
+async def ejecutar(nombre: str, config: Settings | None) -> None:
+    """Siembra una base nueva y mide el throughput de toggles concurrentes."""
+    engine = await crear_engine_temporal(config=config)
+    sessionmaker = crear_sessionmaker(engine)
+
+    async with sessionmaker() as session:
+        user, _, fecha_fin = await poblar_historial(session, anios=1, num_habitos=10)
+        result = await session.execute(
+            select(progreso_habitos.id)
+            .join(registros, registros.id == progreso_habitos.registro_id)
+            .where(registros.fecha >= fecha_fin.replace(day=1).isoformat())
+        )
+        progreso_ids = result.scalars().all()
+
+    latencias: list[float] = []
+    errores = 0
+
+    async def cliente(semilla: int) -> None:
+        nonlocal errores
+        rng = random.Random(semilla)
+        for _ in range(TOGGLES_POR_CLIENTE):
+            inicio = time.perf_counter()
+            try:
+                async with sessionmaker() as db:
+                    await toggle_progreso(rng.choice(progreso_ids), current_user=user, db=db)
+            except OperationalError:
+                errores += 1  # "database is locked"
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(CLIENTES)))
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    p99 = latencias[int(len(latencias) * 0.99) - 1] if latencias else 0.0
+    print(
+        f"{nombre:<28} {len(latencias) / total:8.1f} toggles/s  "
+        f"p50={statistics.median(latencias):7.2f} ms  p99={p99:8.2f} ms  errores={errores}"
+    )
+    await engine.dispose()
+
+
+async def main() -> None:
+    print(f"{CLIENTES} clientes x {TOGGLES_POR_CLIENTE} toggles\n")
+    await ejecutar("SQLite por defecto", None)
+    await ejecutar("configurar_sqlite (WAL)", Settings())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Crea una base de datos SQLite temporal y la puebla con un usuario,
+sus hábitos y varios años de registros diarios con progresos.
+"""
+
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import Settings
+from app.database import Base, configurar_sqlite
+from app.models import categorias, habitos, progreso_habitos, registros, usuario
+from app.services.rollups import recalcular_rollups
+
+DIAS_SEMANA = ['L', 'M', 'X', 'J', 'V', 'S', 'D']
+
+
+async def crear_engine_temporal(nombre: str = "bench.db", config: Settings | None = None):
+    """
+    Crea un engine sobre un archivo SQLite temporal con el esquema completo.
+
+    Si se pasa `config`, aplica los PRAGMA de SQLite igual que la aplicación;
+    si no, SQLite queda con sus valores por defecto.
+    """
+    directorio = Path(tempfile.mkdtemp(prefix="marco-bench-"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directorio / nombre}")
+    if config is not None:
+        configurar_sqlite(engine, config)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def crear_sessionmaker(engine) -> async_sessionmaker:
+    """Fábrica de sesiones con la misma configuración que la aplicación."""
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def poblar_historial(
+    session: AsyncSession,
+    anios: int = 3,
+    num_habitos: int = 20,
+    semilla: int = 42,
+) -> tuple[usuario, date, date]:
+    """
+    Crea un usuario con `num_habitos` hábitos y `anios` años de registros diarios.
+
+    Returns:
+        Tupla (usuario, fecha_inicio, fecha_fin) del historial generado
+    """
+    rng = random.Random(semilla)
+    fecha_fin = date.today()
+    fecha_inicio = fecha_fin - timedelta(days=365 * anios)
+
+    user = usuario(nombre="bench", email="bench@example.com", contrasena="x")
+    categoria = categorias(nombre="Bench")
+    session.add_all([user, categoria])
+    await session.flush()
+
+    lista_habitos = []
+    for i in range(num_habitos):
+        dias = sorted(rng.sample(DIAS_SEMANA, rng.randint(1, 7)), key=DIAS_SEMANA.index)
+        habito = habitos(
+            nombre=f"Hábito {i}",
+            categoria_id=categoria.id,
+            usuario_id=user.id,
+            unidad_medida="veces",
+            meta_diaria=1,
+            dias=json.dumps(dias),
+            color="#000000",
+            activo=1,
+            created_at=datetime.combine(fecha_inicio, datetime.min.time()),
+        )
+        lista_habitos.append((habito, set(dias)))
+    session.add_all([h for h, _ in lista_habitos])
+    await session.flush()
+
+    fecha = fecha_inicio
+    while fecha <= fecha_fin:
+        registro = registros(usuario_id=user.id, fecha=fecha.isoformat())
+        session.add(registro)
+        await session.flush()
+        letra = DIAS_SEMANA[fecha.weekday()]
+        filas = [
+            {
+                "registro_id": registro.id,
+                "habito_id": habito.id,
+                "valor": 1,
+                "completado": rng.random() < 0.7,
+            }
+            for habito, dias in lista_habitos
+            if letra in dias
+        ]
+        if filas:
+            await session.execute(insert(progreso_habitos), filas)
+        fecha += timedelta(days=1)
+
+    await recalcular_rollups(session, user.id)
+    await session.commit()
+    return user, fecha_inicio, fecha_fin
+
+
+async def medir(nombre: str, funcion, repeticiones: int = 5) -> float:
+    """Ejecuta una corrutina varias veces e imprime la mediana en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    mediana = statistics.median(tiempos)
+    print(f"{nombre:<40} mediana={mediana:9.2f} ms  min={min(tiempos):9.2f} ms")
+    return mediana
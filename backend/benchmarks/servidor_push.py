@@ -0,0 +1,86 @@
+"""
+Servicio push local para medir la entrega de notificaciones sin red.
+
+Imita a un servicio push real (FCM, Mozilla autopush...) en 127.0.0.1:
+
+- POST /push/{id}   -> 201 (entregada)
+- POST /gone/{id}   -> 410 (suscripción caducada)
+- POST /error/{id}  -> 500 (error transitorio)
+
+Cada respuesta puede retrasarse `latencia_ms` para simular la red. El servidor
+cuenta las peticiones recibidas y las conexiones TCP distintas, lo que permite
+comprobar que el cliente reutiliza conexiones (keep-alive).
+"""
+
+import asyncio
+import base64
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from aiohttp import web
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+CODIGOS_POR_RUTA = {"push": 201, "gone": 410, "error": 500}
+
+
+def _b64url(datos: bytes) -> str:
+    return base64.urlsafe_b64encode(datos).rstrip(b"=").decode()
+
+
+def generar_clave_vapid() -> str:
+    """Genera una clave privada VAPID (P-256, 32 bytes en base64url)."""
+    clave = ec.generate_private_key(ec.SECP256R1())
+    return _b64url(clave.private_numbers().private_value.to_bytes(32, "big"))
+
+
+def generar_suscripcion(endpoint: str) -> dict:
+    """Genera una suscripción con claves válidas, como las de un navegador."""
+    clave = ec.generate_private_key(ec.SECP256R1())
+    publica = clave.public_key().public_bytes(
+        encoding=serialization.Encoding.X962,
+        format=serialization.PublicFormat.UncompressedPoint
+    )
+    return {
+        "endpoint": endpoint,
+        "keys": {"p256dh": _b64url(publica), "auth": _b64url(os.urandom(16))}
+    }
+
+
+@dataclass
+class ServidorPushLocal:
+    """Servidor en ejecución y lo que ha recibido."""
+
+    url_base: str
+    peticiones: int = 0
+    conexiones: set = field(default_factory=set)
+    cabeceras: list = field(default_factory=list)
+
+
+@asynccontextmanager
+async def servidor_push_local(latencia_ms: float = 0.0):
+    """Levanta el servicio push local en un puerto libre mientras dure el bloque."""
+    app = web.Application()
+    servidor = ServidorPushLocal(url_base="")
+
+    async def recibir(request: web.Request) -> web.Response:
+        await request.read()
+        servidor.peticiones += 1
+        servidor.conexiones.add(request.transport.get_extra_info("peername"))
+        servidor.cabeceras.append(dict(request.headers))
+        if latencia_ms:
+            await asyncio.sleep(latencia_ms / 1000)
+        return web.Response(status=CODIGOS_POR_RUTA[request.match_info["ruta"]])
+
+    app.router.add_post("/{ruta:push|gone|error}/{id}", recibir)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, puerto = runner.addresses[0][:2]
+    servidor.url_base = f"http://{host}:{puerto}"
+    try:
+        yield servidor
+    finally:
+        await runner.cleanup()
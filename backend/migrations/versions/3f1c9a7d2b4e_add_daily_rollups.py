@@ -0,0 +1,48 @@
+"""add daily rollups
+
+Tabla de agregados diarios por usuario y fecha. El relleno inicial se hace
+con `python rebuild_rollups.py` (start.sh lo ejecuta si la tabla está vacía).
+
+Revision ID: 3f1c9a7d2b4e
+Revises: 24626d48dd9e
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b4e'
+down_revision: Union[str, Sequence[str], None] = '24626d48dd9e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear tabla daily_rollups."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'daily_rollups' not in inspector.get_table_names():
+        op.create_table(
+            'daily_rollups',
+            sa.Column('usuario_id', sa.Integer(), nullable=False),
+            sa.Column('fecha', sa.String(), nullable=False),
+            sa.Column('programados', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('completados', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+            sa.PrimaryKeyConstraint('usuario_id', 'fecha')
+        )
+
+
+def downgrade() -> None:
+    """Eliminar tabla daily_rollups."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'daily_rollups' in inspector.get_table_names():
+        op.drop_table('daily_rollups')
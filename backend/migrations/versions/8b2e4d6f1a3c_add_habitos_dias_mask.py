@@ -0,0 +1,64 @@
+"""add habitos dias_mask
+
+Agrega la columna dias_mask (máscara de 7 bits, bit 0 = Lunes) y la rellena
+a partir de la lista JSON de días existente.
+
+Revision ID: 8b2e4d6f1a3c
+Revises: 3f1c9a7d2b4e
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import dias_a_mascara
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a3c'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Agregar y rellenar habitos.dias_mask."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    habitos_columns = {col['name'] for col in inspector.get_columns('habitos')}
+    if 'dias_mask' not in habitos_columns:
+        op.add_column('habitos', sa.Column('dias_mask', sa.Integer(), nullable=False, server_default='0'))
+
+    # Rellenar la máscara desde el JSON de días
+    habitos_table = sa.table(
+        'habitos',
+        sa.column('id', sa.Integer),
+        sa.column('dias', sa.String),
+        sa.column('dias_mask', sa.Integer),
+    )
+    filas = conn.execute(sa.select(habitos_table.c.id, habitos_table.c.dias)).all()
+    actualizaciones = [
+        {"habito_id": habito_id, "mascara": dias_a_mascara(dias)}
+        for habito_id, dias in filas
+    ]
+    if actualizaciones:
+        conn.execute(
+            habitos_table.update()
+            .where(habitos_table.c.id == sa.bindparam('habito_id'))
+            .values(dias_mask=sa.bindparam('mascara')),
+            actualizaciones
+        )
+
+
+def downgrade() -> None:
+    """Eliminar habitos.dias_mask."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    habitos_columns = {col['name'] for col in inspector.get_columns('habitos')}
+    if 'dias_mask' in habitos_columns:
+        with op.batch_alter_table('habitos') as batch_op:
+            batch_op.drop_column('dias_mask')
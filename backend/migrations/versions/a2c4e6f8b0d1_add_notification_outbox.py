@@ -0,0 +1,65 @@
+"""add notification_outbox
+
+Tabla de notificaciones pendientes de entrega. El scheduler encola aquí los
+recordatorios con una clave de idempotencia única y un worker en segundo
+plano los envía en lotes con reintentos.
+
+Revision ID: a2c4e6f8b0d1
+Revises: f3b5d7e9a1c2
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c4e6f8b0d1'
+down_revision: Union[str, Sequence[str], None] = 'f3b5d7e9a1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear la tabla notification_outbox y sus índices."""
+    inspector = sa.inspect(op.get_bind())
+
+    if 'notification_outbox' not in inspector.get_table_names():
+        op.create_table(
+            'notification_outbox',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('usuario_id', sa.Integer(), nullable=False),
+            sa.Column('clave_idempotencia', sa.String(), nullable=False),
+            sa.Column('titulo', sa.String(), nullable=False),
+            sa.Column('cuerpo', sa.String(), nullable=False),
+            sa.Column('url', sa.String(), nullable=True),
+            sa.Column('estado', sa.String(), nullable=False),
+            sa.Column('intentos', sa.Integer(), nullable=False),
+            sa.Column('disponible_en', sa.DateTime(), nullable=False),
+            sa.Column('ultimo_error', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.Column('enviada_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('clave_idempotencia')
+        )
+        op.create_index('ix_notification_outbox_id', 'notification_outbox', ['id'])
+        op.create_index('ix_notification_outbox_usuario_id', 'notification_outbox', ['usuario_id'])
+        op.create_index(
+            'ix_notification_outbox_estado_disponible',
+            'notification_outbox',
+            ['estado', 'disponible_en']
+        )
+
+
+def downgrade() -> None:
+    """Eliminar la tabla notification_outbox."""
+    inspector = sa.inspect(op.get_bind())
+
+    if 'notification_outbox' in inspector.get_table_names():
+        op.drop_index('ix_notification_outbox_estado_disponible', table_name='notification_outbox')
+        op.drop_index('ix_notification_outbox_usuario_id', table_name='notification_outbox')
+        op.drop_index('ix_notification_outbox_id', table_name='notification_outbox')
+        op.drop_table('notification_outbox')
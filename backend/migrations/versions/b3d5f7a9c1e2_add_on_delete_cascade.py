@@ -0,0 +1,93 @@
+"""add on delete cascade
+
+Las claves foráneas hacia usuarios, registros, habitos y habito_dias pasan a
+ON DELETE CASCADE, para que borrar un usuario, un registro o un hábito sea una
+sola sentencia DELETE y la base de datos elimine los datos dependientes.
+
+En SQLite una clave foránea no se puede modificar: cada tabla se recrea con
+batch_alter_table. Las claves sin nombre (las de SQLite) se identifican con
+una convención de nombres al reflejar la tabla.
+
+Revision ID: b3d5f7a9c1e2
+Revises: a2c4e6f8b0d1
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d5f7a9c1e2'
+down_revision: Union[str, Sequence[str], None] = 'a2c4e6f8b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabla, columna, tabla referida)
+CLAVES_EN_CASCADA = (
+    ('habitos', 'usuario_id', 'usuarios'),
+    ('registros', 'usuario_id', 'usuarios'),
+    ('progreso_habitos', 'registro_id', 'registros'),
+    ('progreso_habitos', 'habito_id', 'habitos'),
+    ('daily_rollups', 'usuario_id', 'usuarios'),
+    ('registro_habito_dias', 'registro_id', 'registros'),
+    ('registro_habito_dias', 'habito_dia_id', 'habito_dias'),
+    ('habito_dias', 'habito_id', 'habitos'),
+    ('push_subscriptions', 'usuario_id', 'usuarios'),
+    ('notification_outbox', 'usuario_id', 'usuarios'),
+)
+
+CONVENCION_NOMBRES = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'
+}
+
+
+def _nombre_convencion(tabla: str, columna: str, referida: str) -> str:
+    return f'fk_{tabla}_{columna}_{referida}'
+
+
+def _cambiar_ondelete(ondelete: Union[str, None]) -> None:
+    """Recrea las claves foráneas de CLAVES_EN_CASCADA con la acción indicada."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tablas = set(inspector.get_table_names())
+
+    por_tabla: dict[str, list[tuple[str, str, Union[str, None]]]] = {}
+    for tabla, columna, referida in CLAVES_EN_CASCADA:
+        if tabla not in tablas:
+            continue
+        for fk in inspector.get_foreign_keys(tabla):
+            if fk['constrained_columns'] != [columna] or fk['referred_table'] != referida:
+                continue
+            actual = (fk.get('options') or {}).get('ondelete')
+            if (actual or '').upper() != (ondelete or '').upper():
+                nombre = fk['name'] or _nombre_convencion(tabla, columna, referida)
+                por_tabla.setdefault(tabla, []).append((columna, referida, nombre))
+
+    for tabla, claves in por_tabla.items():
+        opciones = {}
+        if tabla == 'registros':
+            # Al recrear la tabla en SQLite hay que conservar AUTOINCREMENT
+            opciones['table_kwargs'] = {'sqlite_autoincrement': True}
+        with op.batch_alter_table(tabla, naming_convention=CONVENCION_NOMBRES, **opciones) as batch_op:
+            for columna, referida, nombre in claves:
+                batch_op.drop_constraint(nombre, type_='foreignkey')
+                batch_op.create_foreign_key(
+                    _nombre_convencion(tabla, columna, referida),
+                    referida,
+                    [columna],
+                    ['id'],
+                    ondelete=ondelete
+                )
+
+
+def upgrade() -> None:
+    """Pasar a ON DELETE CASCADE las claves foráneas de los datos de cada usuario."""
+    _cambiar_ondelete('CASCADE')
+
+
+def downgrade() -> None:
+    """Volver a claves foráneas sin acción al borrar."""
+    _cambiar_ondelete(None)
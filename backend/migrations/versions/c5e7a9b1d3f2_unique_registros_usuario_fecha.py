@@ -0,0 +1,126 @@
+"""unique registros usuario fecha
+
+Fusiona los registros duplicados por (usuario_id, fecha) y agrega un índice
+único para que la creación con INSERT ... ON CONFLICT no pueda duplicarlos.
+
+Revision ID: c5e7a9b1d3f2
+Revises: 8b2e4d6f1a3c
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7a9b1d3f2'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Eliminar duplicados y crear el índice único registros(usuario_id, fecha)."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    indices = {idx['name'] for idx in inspector.get_indexes('registros')}
+    if 'uq_registros_usuario_fecha' in indices:
+        return
+
+    registros_table = sa.table(
+        'registros',
+        sa.column('id', sa.Integer),
+        sa.column('usuario_id', sa.Integer),
+        sa.column('fecha', sa.String),
+    )
+    progresos_table = sa.table(
+        'progreso_habitos',
+        sa.column('id', sa.Integer),
+        sa.column('registro_id', sa.Integer),
+        sa.column('habito_id', sa.Integer),
+        sa.column('completado', sa.Boolean),
+    )
+    rollups_table = sa.table(
+        'daily_rollups',
+        sa.column('usuario_id', sa.Integer),
+        sa.column('fecha', sa.String),
+        sa.column('completados', sa.Integer),
+    )
+
+    # Para cada (usuario, fecha) duplicado se conserva el registro más antiguo
+    duplicados = conn.execute(
+        sa.select(
+            registros_table.c.usuario_id,
+            registros_table.c.fecha,
+            sa.func.min(registros_table.c.id)
+        )
+        .group_by(registros_table.c.usuario_id, registros_table.c.fecha)
+        .having(sa.func.count() > 1)
+    ).all()
+
+    for usuario_id, fecha, conservar_id in duplicados:
+        sobrantes = conn.execute(
+            sa.select(registros_table.c.id).where(
+                sa.and_(
+                    registros_table.c.usuario_id == usuario_id,
+                    registros_table.c.fecha == fecha,
+                    registros_table.c.id != conservar_id
+                )
+            )
+        ).scalars().all()
+
+        # Mover al registro conservado los progresos de hábitos que no tenga
+        habitos_conservados = set(conn.execute(
+            sa.select(progresos_table.c.habito_id).where(progresos_table.c.registro_id == conservar_id)
+        ).scalars().all())
+        for progreso_id, habito_id in conn.execute(
+            sa.select(progresos_table.c.id, progresos_table.c.habito_id)
+            .where(progresos_table.c.registro_id.in_(sobrantes))
+            .order_by(progresos_table.c.id)
+        ).all():
+            if habito_id in habitos_conservados:
+                conn.execute(progresos_table.delete().where(progresos_table.c.id == progreso_id))
+            else:
+                conn.execute(
+                    progresos_table.update()
+                    .where(progresos_table.c.id == progreso_id)
+                    .values(registro_id=conservar_id)
+                )
+                habitos_conservados.add(habito_id)
+
+        conn.execute(registros_table.delete().where(registros_table.c.id.in_(sobrantes)))
+
+        # El agregado del día pasa a contar solo los progresos del registro conservado
+        completados = conn.execute(
+            sa.select(sa.func.count()).select_from(progresos_table).where(
+                sa.and_(
+                    progresos_table.c.registro_id == conservar_id,
+                    progresos_table.c.completado == sa.true()
+                )
+            )
+        ).scalar_one()
+        conn.execute(
+            rollups_table.update()
+            .where(
+                sa.and_(
+                    rollups_table.c.usuario_id == usuario_id,
+                    rollups_table.c.fecha == fecha
+                )
+            )
+            .values(completados=completados)
+        )
+
+    op.create_index('uq_registros_usuario_fecha', 'registros', ['usuario_id', 'fecha'], unique=True)
+
+
+def downgrade() -> None:
+    """Eliminar el índice único de registros."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    indices = {idx['name'] for idx in inspector.get_indexes('registros')}
+    if 'uq_registros_usuario_fecha' in indices:
+        op.drop_index('uq_registros_usuario_fecha', table_name='registros')
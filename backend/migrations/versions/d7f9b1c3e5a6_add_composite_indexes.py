@@ -0,0 +1,52 @@
+"""add composite indexes
+
+Índices compuestos para los predicados más frecuentes de las rutas:
+progresos por registro/hábito, hábitos activos por usuario y suscripciones
+activas por usuario. registros(usuario_id, fecha) ya está cubierto por el
+índice único uq_registros_usuario_fecha.
+
+Revision ID: d7f9b1c3e5a6
+Revises: c5e7a9b1d3f2
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f9b1c3e5a6'
+down_revision: Union[str, Sequence[str], None] = 'c5e7a9b1d3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nombre, tabla, columnas)
+INDICES = [
+    ('ix_progreso_habitos_registro_habito', 'progreso_habitos', ['registro_id', 'habito_id', 'completado']),
+    ('ix_progreso_habitos_habito_id', 'progreso_habitos', ['habito_id']),
+    ('ix_habitos_usuario_activo', 'habitos', ['usuario_id', 'activo']),
+    ('ix_push_subscriptions_usuario_activa', 'push_subscriptions', ['usuario_id', 'activa']),
+]
+
+
+def upgrade() -> None:
+    """Crear los índices compuestos que no existan."""
+    inspector = sa.inspect(op.get_bind())
+
+    for nombre, tabla, columnas in INDICES:
+        existentes = {idx['name'] for idx in inspector.get_indexes(tabla)}
+        if nombre not in existentes:
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade() -> None:
+    """Eliminar los índices compuestos."""
+    inspector = sa.inspect(op.get_bind())
+
+    for nombre, tabla, _ in reversed(INDICES):
+        existentes = {idx['name'] for idx in inspector.get_indexes(tabla)}
+        if nombre in existentes:
+            op.drop_index(nombre, table_name=tabla)
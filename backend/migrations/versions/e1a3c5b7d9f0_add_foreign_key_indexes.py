@@ -0,0 +1,51 @@
+"""add foreign key indexes
+
+Con PRAGMA foreign_keys=ON, SQLite revisa las tablas hijas al borrar o
+modificar una fila padre; sin índice en la columna hija eso es un recorrido
+completo de la tabla. Agrega los índices que faltaban.
+
+Revision ID: e1a3c5b7d9f0
+Revises: d7f9b1c3e5a6
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a3c5b7d9f0'
+down_revision: Union[str, Sequence[str], None] = 'd7f9b1c3e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nombre, tabla, columnas)
+INDICES = [
+    ('ix_habitos_categoria_id', 'habitos', ['categoria_id']),
+    ('ix_habito_dias_habito_id', 'habito_dias', ['habito_id']),
+    ('ix_registro_habito_dias_registro_id', 'registro_habito_dias', ['registro_id']),
+    ('ix_registro_habito_dias_habito_dia_id', 'registro_habito_dias', ['habito_dia_id']),
+]
+
+
+def upgrade() -> None:
+    """Crear los índices de claves foráneas que no existan."""
+    inspector = sa.inspect(op.get_bind())
+
+    for nombre, tabla, columnas in INDICES:
+        existentes = {idx['name'] for idx in inspector.get_indexes(tabla)}
+        if nombre not in existentes:
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade() -> None:
+    """Eliminar los índices de claves foráneas."""
+    inspector = sa.inspect(op.get_bind())
+
+    for nombre, tabla, _ in reversed(INDICES):
+        existentes = {idx['name'] for idx in inspector.get_indexes(tabla)}
+        if nombre in existentes:
+            op.drop_index(nombre, table_name=tabla)
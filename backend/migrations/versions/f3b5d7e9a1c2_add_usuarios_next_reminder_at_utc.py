@@ -0,0 +1,86 @@
+"""add usuarios next_reminder_at_utc
+
+Agrega el próximo recordatorio precalculado en UTC (indexado) para que el
+scheduler seleccione solo los usuarios vencidos con una consulta de rango, y lo
+rellena para los usuarios con notificaciones activas.
+
+Revision ID: f3b5d7e9a1c2
+Revises: e1a3c5b7d9f0
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import proximo_recordatorio_utc
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b5d7e9a1c2'
+down_revision: Union[str, Sequence[str], None] = 'e1a3c5b7d9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Agregar, indexar y rellenar usuarios.next_reminder_at_utc."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    usuarios_columns = {col['name'] for col in inspector.get_columns('usuarios')}
+    if 'next_reminder_at_utc' not in usuarios_columns:
+        op.add_column('usuarios', sa.Column('next_reminder_at_utc', sa.DateTime(), nullable=True))
+
+    existentes = {idx['name'] for idx in inspector.get_indexes('usuarios')}
+    if 'ix_usuarios_next_reminder_at_utc' not in existentes:
+        op.create_index('ix_usuarios_next_reminder_at_utc', 'usuarios', ['next_reminder_at_utc'])
+
+    # Rellenar el próximo recordatorio de los usuarios con notificaciones activas
+    usuarios_table = sa.table(
+        'usuarios',
+        sa.column('id', sa.Integer),
+        sa.column('notificaciones_activas', sa.Boolean),
+        sa.column('hora_recordatorio', sa.String),
+        sa.column('timezone', sa.String),
+        sa.column('next_reminder_at_utc', sa.DateTime),
+    )
+    filas = conn.execute(
+        sa.select(
+            usuarios_table.c.id,
+            usuarios_table.c.hora_recordatorio,
+            usuarios_table.c.timezone
+        ).where(usuarios_table.c.notificaciones_activas == sa.true())
+    ).all()
+    ahora = datetime.now(timezone.utc)
+    actualizaciones = [
+        {
+            "usuario_id": usuario_id,
+            "proximo": proximo_recordatorio_utc(hora_recordatorio, zona, ahora)
+        }
+        for usuario_id, hora_recordatorio, zona in filas
+    ]
+    if actualizaciones:
+        conn.execute(
+            usuarios_table.update()
+            .where(usuarios_table.c.id == sa.bindparam('usuario_id'))
+            .values(next_reminder_at_utc=sa.bindparam('proximo')),
+            actualizaciones
+        )
+
+
+def downgrade() -> None:
+    """Eliminar usuarios.next_reminder_at_utc."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    existentes = {idx['name'] for idx in inspector.get_indexes('usuarios')}
+    if 'ix_usuarios_next_reminder_at_utc' in existentes:
+        op.drop_index('ix_usuarios_next_reminder_at_utc', table_name='usuarios')
+
+    usuarios_columns = {col['name'] for col in inspector.get_columns('usuarios')}
+    if 'next_reminder_at_utc' in usuarios_columns:
+        with op.batch_alter_table('usuarios') as batch_op:
+            batch_op.drop_column('next_reminder_at_utc')
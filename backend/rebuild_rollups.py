@@ -0,0 +1,67 @@
+"""
+Script para reconstruir la tabla de agregados diarios (daily_rollups).
+
+Recalcula desde registros y progreso_habitos los contadores de hábitos
+programados y completados por usuario y fecha. Sirve tanto para el relleno
+inicial como para reparar agregados desincronizados.
+
+Uso:
+    python rebuild_rollups.py               # Todos los usuarios
+    python rebuild_rollups.py --usuario 5   # Solo un usuario
+    python rebuild_rollups.py --si-vacia    # Solo si la tabla está vacía
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import func, select
+
+from app.database import async_session, engine
+from app.models import daily_rollups, usuario
+from app.services.rollups import recalcular_rollups
+
+
+async def rebuild_rollups(usuario_id: int | None = None, si_vacia: bool = False) -> bool:
+    """Reconstruye los agregados de uno o todos los usuarios."""
+    print("🔄 Reconstruyendo agregados diarios...")
+
+    try:
+        async with async_session() as session:
+            if si_vacia:
+                existentes = await session.scalar(select(func.count()).select_from(daily_rollups))
+                if existentes:
+                    print(f"✅ La tabla ya tiene {existentes} filas, no se reconstruye")
+                    return True
+
+            if usuario_id is not None:
+                usuario_ids = [usuario_id]
+            else:
+                result = await session.execute(select(usuario.id).order_by(usuario.id))
+                usuario_ids = list(result.scalars().all())
+
+            total = 0
+            for uid in usuario_ids:
+                # Una transacción por usuario para no retener el bloqueo de escritura
+                filas = await recalcular_rollups(session, uid)
+                await session.commit()
+                total += filas
+                print(f"  👤 Usuario {uid}: {filas} días")
+
+        print(f"✅ Agregados reconstruidos: {total} filas para {len(usuario_ids)} usuarios")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error al reconstruir agregados: {e}")
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla daily_rollups")
+    parser.add_argument("--usuario", type=int, help="ID del usuario a reconstruir")
+    parser.add_argument("--si-vacia", action="store_true", help="Solo reconstruir si la tabla está vacía")
+    args = parser.parse_args()
+
+    success = asyncio.run(rebuild_rollups(args.usuario, args.si_vacia))
+    sys.exit(0 if success else 1)
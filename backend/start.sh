@@ -28,6 +28,10 @@ alembic upgrade head
 echo ""
 echo "✅ Migraciones completadas exitosamente"
 
+echo ""
+echo "📈 Rellenando agregados diarios si es necesario..."
+python rebuild_rollups.py --si-vacia
+
 echo ""
 echo "🔍 Versión actual después de migración..."
 alembic current
@@ -5,18 +5,23 @@ Este archivo contiene fixtures que se pueden usar en todos los tests.
 """
 
 import asyncio
+from collections import Counter
+from contextlib import contextmanager
 from typing import AsyncGenerator, Generator
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.config import get_settings
+from app.database import Base, configurar_sqlite, get_db, get_db_lectura, get_db_replica
+from app.instrumentacion import forma_sentencia, instrumentar_engine
 from app.models import usuario, categorias
-from app.security import hash_password
+from app.security import cache_autenticacion, hash_password
 
 
 # URL de base de datos en memoria para tests
@@ -35,6 +40,19 @@ def event_loop() -> Generator:
     loop.close()
 
 
+
+@pytest.fixture(autouse=True)
+def limpiar_cache_autenticacion():
+    """
+    Vacía la caché de autenticación entre tests.
+
+    Cada test crea su base en memoria desde cero (los IDs se repiten), así
+    que un token cacheado en un test no debe servir en el siguiente.
+    """
+    cache_autenticacion.limpiar()
+    yield
+    cache_autenticacion.limpiar()
+
 @pytest_asyncio.fixture
 async def test_engine():
     """
@@ -49,6 +67,10 @@ async def test_engine():
         poolclass=StaticPool,  # Necesario para SQLite en memoria
         echo=False  # Cambiar a True para debug de SQL
     )
+    # Mismos PRAGMA que en producción (incluye foreign_keys=ON)
+    configurar_sqlite(engine, get_settings())
+    # Las respuestas llevan Server-Timing con las consultas de este engine
+    instrumentar_engine(engine)
 
     # Crear todas las tablas
     async with engine.begin() as conn:
@@ -63,6 +85,56 @@ async def test_engine():
     await engine.dispose()
 
 
+
+@pytest.fixture
+def contar_queries(test_engine):
+    """
+    Cuenta las sentencias SQL ejecutadas contra el engine de test.
+
+    Uso:
+        with contar_queries() as sentencias:
+            await test_client.get(...)
+        assert len(sentencias) <= 5
+    """
+    @contextmanager
+    def contar():
+        sentencias = []
+
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", registrar)
+        try:
+            yield sentencias
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", registrar)
+
+    return contar
+
+
+@pytest.fixture
+def max_queries(contar_queries):
+    """
+    Falla si el bloque ejecuta más de `maximo` sentencias SQL.
+
+    El mensaje de error agrupa las sentencias por forma, con la más repetida
+    primero, para que un N+1 se vea de inmediato.
+
+    Uso:
+        with max_queries(4):
+            await test_client.get("/api/habitos/", headers=auth_headers)
+    """
+    @contextmanager
+    def limitar(maximo: int):
+        with contar_queries() as sentencias:
+            yield sentencias
+        if len(sentencias) > maximo:
+            formas = Counter(forma_sentencia(sentencia) for sentencia in sentencias)
+            detalle = "\n".join(f"  {veces}x {forma}" for forma, veces in formas.most_common())
+            pytest.fail(f"{len(sentencias)} consultas (máximo {maximo}):\n{detalle}")
+
+    return limitar
+
 @pytest_asyncio.fixture
 async def test_db_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     """
@@ -101,6 +173,9 @@ async def test_client(test_db_session: AsyncSession) -> AsyncGenerator[AsyncClie
         yield test_db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    # Las rutas de lectura ven la misma base (y los datos sin commit del test)
+    app.dependency_overrides[get_db_lectura] = override_get_db
+    app.dependency_overrides[get_db_replica] = override_get_db
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as client:
@@ -125,6 +200,9 @@ def sync_test_client(test_db_session: AsyncSession) -> Generator[TestClient, Non
         yield test_db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    # Las rutas de lectura ven la misma base (y los datos sin commit del test)
+    app.dependency_overrides[get_db_lectura] = override_get_db
+    app.dependency_overrides[get_db_replica] = override_get_db
 
     with TestClient(app) as client:
         yield client
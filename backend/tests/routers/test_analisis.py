@@ -0,0 +1,271 @@
+"""
+Tests para los endpoints de análisis.
+
+Principios Zen aplicados:
+- Datos de prueba explícitos con fechas fijas
+- Un test = una responsabilidad
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import usuario, categorias, habitos, registros, progreso_habitos
+from app.services.rollups import recalcular_rollups
+
+
+# 2024-01-01 fue lunes
+FECHA_CREACION = datetime(2024, 1, 1, 8, 0, 0)
+
+
+@pytest_asyncio.fixture
+async def habitos_analisis(
+    test_db_session: AsyncSession,
+    test_user: usuario,
+    test_categoria: categorias
+) -> list[habitos]:
+    """Crea dos hábitos: uno de lunes a viernes y otro solo los lunes."""
+    lista = [
+        habitos(
+            nombre="Leer",
+            categoria_id=test_categoria.id,
+            usuario_id=test_user.id,
+            unidad_medida="páginas",
+            meta_diaria=10.0,
+            dias='["L", "M", "X", "J", "V"]',
+            color="#112233",
+            activo=1,
+            created_at=FECHA_CREACION
+        ),
+        habitos(
+            nombre="Correr",
+            categoria_id=test_categoria.id,
+            usuario_id=test_user.id,
+            unidad_medida="km",
+            meta_diaria=5.0,
+            dias='["L"]',
+            color="#445566",
+            activo=1,
+            created_at=FECHA_CREACION
+        ),
+    ]
+    test_db_session.add_all(lista)
+    await test_db_session.commit()
+    return lista
+
+
+async def crear_registro(
+    db: AsyncSession,
+    usuario_id: int,
+    fecha: str,
+    completados: dict[int, bool]
+) -> registros:
+    """Crea un registro con un progreso por hábito indicado en `completados`."""
+    registro = registros(usuario_id=usuario_id, fecha=fecha)
+    db.add(registro)
+    await db.flush()
+    for habito_id, completado in completados.items():
+        db.add(progreso_habitos(
+            registro_id=registro.id,
+            habito_id=habito_id,
+            valor=1 if completado else 0,
+            completado=completado
+        ))
+    await db.flush()
+    await recalcular_rollups(db, usuario_id, [fecha])
+    await db.commit()
+    return registro
+
+
+class TestRendimiento:
+    """Tests para el endpoint de rendimiento por día."""
+
+    @pytest.mark.asyncio
+    async def test_rendimiento_requires_auth(self, test_client: AsyncClient):
+        """Test: Debe requerir autenticación."""
+        response = await test_client.get(
+            "/api/analisis/rendimiento",
+            params={"fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31"}
+        )
+
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_rendimiento_invalid_date_fails(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict
+    ):
+        """Test: Debe rechazar fechas con formato inválido."""
+        response = await test_client.get(
+            "/api/analisis/rendimiento",
+            params={"fecha_inicio": "01/01/2024", "fecha_fin": "2024-01-31"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_rendimiento_counts_scheduled_and_completed(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habitos_analisis: list[habitos],
+        auth_headers: dict
+    ):
+        """Test: Debe contar hábitos programados y completados por fecha con registro."""
+        leer, correr = habitos_analisis
+        # Lunes: ambos hábitos aplican, uno completado
+        await crear_registro(test_db_session, test_user.id, "2024-01-08", {leer.id: True, correr.id: False})
+        # Martes: solo "Leer" aplica, completado
+        await crear_registro(test_db_session, test_user.id, "2024-01-09", {leer.id: True})
+        # Sábado: ningún hábito aplica
+        await crear_registro(test_db_session, test_user.id, "2024-01-13", {})
+
+        response = await test_client.get(
+            "/api/analisis/rendimiento",
+            params={"fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"fecha": "2024-01-08", "habitos": 2, "habitos_completados": 1},
+            {"fecha": "2024-01-09", "habitos": 1, "habitos_completados": 1},
+            {"fecha": "2024-01-13", "habitos": 0, "habitos_completados": 0},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_rendimiento_ignores_habits_created_later(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habitos_analisis: list[habitos],
+        auth_headers: dict
+    ):
+        """Test: No debe contar hábitos creados después de la fecha."""
+        await crear_registro(test_db_session, test_user.id, "2023-12-25", {})
+
+        response = await test_client.get(
+            "/api/analisis/rendimiento",
+            params={"fecha_inicio": "2023-12-01", "fecha_fin": "2023-12-31"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"fecha": "2023-12-25", "habitos": 0, "habitos_completados": 0},
+        ]
+
+
+class TestCumplimiento:
+    """Tests para el endpoint de cumplimiento por hábito."""
+
+    @pytest.mark.asyncio
+    async def test_cumplimiento_requires_auth(self, test_client: AsyncClient):
+        """Test: Debe requerir autenticación."""
+        response = await test_client.get(
+            "/api/analisis/cumplimiento",
+            params={"fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31"}
+        )
+
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_cumplimiento_empty_without_registros(
+        self,
+        test_client: AsyncClient,
+        habitos_analisis: list[habitos],
+        auth_headers: dict
+    ):
+        """Test: Debe retornar lista vacía si no hay registros en el rango."""
+        response = await test_client.get(
+            "/api/analisis/cumplimiento",
+            params={"fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_cumplimiento_per_habit(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habitos_analisis: list[habitos],
+        auth_headers: dict
+    ):
+        """Test: Debe contar días aplicables y completados por hábito."""
+        leer, correr = habitos_analisis
+        await crear_registro(test_db_session, test_user.id, "2024-01-08", {leer.id: True, correr.id: True})
+        await crear_registro(test_db_session, test_user.id, "2024-01-09", {leer.id: False})
+        await crear_registro(test_db_session, test_user.id, "2024-01-10", {leer.id: True})
+        await crear_registro(test_db_session, test_user.id, "2024-01-15", {leer.id: True, correr.id: False})
+
+        response = await test_client.get(
+            "/api/analisis/cumplimiento",
+            params={"fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert sorted(response.json(), key=lambda h: h["nombre_habito"]) == [
+            {
+                "fecha": "2024-01-08",
+                "nombre_habito": "Correr",
+                "habitos_completados": 1,
+                "total_habitos": 2,
+                "color": "#445566"
+            },
+            {
+                "fecha": "2024-01-08",
+                "nombre_habito": "Leer",
+                "habitos_completados": 3,
+                "total_habitos": 4,
+                "color": "#112233"
+            },
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cumplimiento_query_count_is_constant(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        contar_queries,
+        test_user: usuario,
+        habitos_analisis: list[habitos],
+        auth_headers: dict
+    ):
+        """Test: El número de queries no debe crecer con el rango de fechas."""
+        leer, correr = habitos_analisis
+        fecha = date(2024, 1, 1)
+        while fecha < date(2025, 1, 1):
+            await crear_registro(
+                test_db_session, test_user.id, fecha.isoformat(),
+                {leer.id: fecha.day % 2 == 0, correr.id: True}
+            )
+            fecha += timedelta(days=7)
+
+        # El primer uso del token carga al usuario; los siguientes salen de la caché
+        await test_client.get("/api/auth/me", headers=auth_headers)
+
+        conteos = []
+        for fecha_fin in ("2024-01-31", "2024-12-31"):
+            with contar_queries() as sentencias:
+                response = await test_client.get(
+                    "/api/analisis/cumplimiento",
+                    params={"fecha_inicio": "2024-01-01", "fecha_fin": fecha_fin},
+                    headers=auth_headers
+                )
+            assert response.status_code == 200
+            conteos.append(len(sentencias))
+
+        assert conteos[0] == conteos[1]
+        assert conteos[1] <= 4
@@ -7,12 +7,27 @@ Principios Zen aplicados:
 - Nombres claros que documentan el comportamiento esperado
 """
 
+from datetime import datetime
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import usuario
-from app.security import hash_password
+from app.models import (
+    categorias,
+    daily_rollups,
+    habito_dias,
+    habitos,
+    notification_outbox,
+    progreso_habitos,
+    push_subscriptions,
+    registro_habito_dias,
+    registros,
+    usuario,
+)
+from app.routers import auth
+from app.security import cache_autenticacion, hash_password
 
 
 class TestRegister:
@@ -345,3 +360,130 @@ class TestUpdateMe:
         )
 
         assert response.status_code == 401  # Unauthorized (no hay token)
+
+
+class TestCacheAutenticacion:
+    """Tests de la caché de tokens verificados en get_current_user."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_requests_skip_user_query(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        contar_queries
+    ):
+        """Test: Tras el primer uso del token, identificar al usuario no consulta la BD."""
+        await test_client.get("/api/auth/me", headers=auth_headers)
+
+        with contar_queries() as sentencias:
+            response = await test_client.get("/api/auth/me", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert not any("FROM usuarios" in s for s in sentencias)
+        assert cache_autenticacion.estadisticas()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_me_invalidates_cache(
+        self,
+        test_client: AsyncClient,
+        auth_token: str,
+        auth_headers: dict
+    ):
+        """Test: PUT /auth/me descarta el usuario cacheado."""
+        await test_client.get("/api/auth/me", headers=auth_headers)
+        assert cache_autenticacion.obtener(auth_token) is not None
+
+        response = await test_client.put(
+            "/api/auth/me",
+            headers=auth_headers,
+            json={"ver_futuro": True}
+        )
+
+        assert response.status_code == 200
+        assert cache_autenticacion.obtener(auth_token) is None
+        me = await test_client.get("/api/auth/me", headers=auth_headers)
+        assert me.json()["ver_futuro"] is True
+
+    @pytest.mark.asyncio
+    async def test_deleted_account_token_is_rejected(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict
+    ):
+        """Test: Un token cacheado deja de servir al eliminar la cuenta."""
+        await test_client.get("/api/auth/me", headers=auth_headers)
+
+        response = await test_client.delete("/api/auth/delete-account", headers=auth_headers)
+        assert response.status_code == 204
+
+        me = await test_client.get("/api/auth/me", headers=auth_headers)
+        assert me.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_background_delete_rejects_token_immediately(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        monkeypatch
+    ):
+        """Test: Con en_segundo_plano, el token deja de servir en cuanto responde 202."""
+        pendientes = []
+
+        async def eliminacion_sin_terminar(usuario_id, incluir_cuenta=False):
+            # Simula los lotes todavía en curso: la fila del usuario sigue existiendo
+            pendientes.append((usuario_id, incluir_cuenta))
+
+        monkeypatch.setattr(auth, "eliminar_en_lotes", eliminacion_sin_terminar)
+        await test_client.get("/api/auth/me", headers=auth_headers)
+
+        response = await test_client.delete(
+            "/api/auth/delete-account", params={"en_segundo_plano": "true"}, headers=auth_headers
+        )
+        assert response.status_code == 202
+        assert pendientes and pendientes[0][1] is True
+
+        me = await test_client.get("/api/auth/me", headers=auth_headers)
+        assert me.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_delete_account_cascades_to_all_user_data(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        auth_headers: dict
+    ):
+        """Test: Un solo DELETE del usuario borra en cascada todos sus datos."""
+        usuario_id = test_user.id
+        habito = habitos(
+            nombre="Leer", categoria_id=test_categoria.id, usuario_id=usuario_id,
+            unidad_medida="páginas", meta_diaria=10, dias='["L"]', color="#000000"
+        )
+        registro = registros(usuario_id=usuario_id, fecha="2024-05-01")
+        test_db_session.add_all([habito, registro])
+        await test_db_session.flush()
+        dia = habito_dias(habito_id=habito.id)
+        test_db_session.add_all([
+            progreso_habitos(registro_id=registro.id, habito_id=habito.id),
+            daily_rollups(usuario_id=usuario_id, fecha="2024-05-01", programados=1, completados=0),
+            push_subscriptions(usuario_id=usuario_id, endpoint="https://push.example/1", p256dh_key="k", auth_key="a"),
+            notification_outbox(
+                usuario_id=usuario_id, clave_idempotencia="prueba", titulo="t", cuerpo="c",
+                disponible_en=datetime(2024, 5, 1)
+            ),
+            dia,
+        ])
+        await test_db_session.flush()
+        test_db_session.add(registro_habito_dias(registro_id=registro.id, habito_dia_id=dia.id))
+        await test_db_session.commit()
+
+        response = await test_client.delete("/api/auth/delete-account", headers=auth_headers)
+
+        assert response.status_code == 204
+        for modelo in (
+            usuario, habitos, registros, progreso_habitos, daily_rollups,
+            push_subscriptions, notification_outbox, habito_dias, registro_habito_dias
+        ):
+            total = await test_db_session.scalar(select(func.count()).select_from(modelo))
+            assert total == 0, modelo.__tablename__
@@ -11,7 +11,7 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import categorias
+from app.models import categorias, habitos, usuario
 
 
 class TestGetCategorias:
@@ -249,3 +249,27 @@ class TestDeleteCategoria:
         # Segunda eliminación
         response = await test_client.delete(f"/api/categorias/{test_categoria.id}", headers=auth_headers)
         assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_delete_categoria_in_use(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        auth_headers: dict
+    ):
+        """Test: Una categoría usada por un hábito no se elimina (409, no 500)."""
+        test_db_session.add(habitos(
+            nombre="Leer", categoria_id=test_categoria.id, usuario_id=test_user.id,
+            unidad_medida="páginas", meta_diaria=10, dias='["L"]', color="#000000"
+        ))
+        await test_db_session.commit()
+
+        response = await test_client.delete(f"/api/categorias/{test_categoria.id}", headers=auth_headers)
+
+        assert response.status_code == 409
+        assert "hábitos asociados" in response.json()["detail"]
+
+        get_response = await test_client.get(f"/api/categorias/{test_categoria.id}", headers=auth_headers)
+        assert get_response.status_code == 200
@@ -0,0 +1,194 @@
+"""
+Tests para la exportación del historial en streaming.
+
+Principios Zen aplicados:
+- El cuerpo se reconstruye y se compara con lo sembrado, no con la implementación
+- Cada formato se prueba por separado: NDJSON, CSV y gzip
+"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import database
+from app.models import usuario, categorias, habitos, registros, progreso_habitos
+from app.routers import exportar
+
+
+@pytest.fixture(autouse=True)
+def sesiones_de_test(monkeypatch, test_engine):
+    """La exportación abre su propia sesión: se apunta al engine de test."""
+    fabrica = async_sessionmaker(test_engine, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_replica", fabrica)
+    monkeypatch.setattr(database, "async_session_lectura", fabrica)
+
+
+@pytest_asyncio.fixture
+async def historial(
+    test_db_session: AsyncSession,
+    test_user: usuario,
+    test_categoria: categorias
+) -> list[habitos]:
+    """Dos hábitos, dos días con progresos y un día sin progresos."""
+    leer = habitos(
+        nombre="Leer", categoria_id=test_categoria.id, usuario_id=test_user.id,
+        unidad_medida="páginas", meta_diaria=10, dias='["L"]', color="#112233"
+    )
+    correr = habitos(
+        nombre="Correr", categoria_id=test_categoria.id, usuario_id=test_user.id,
+        unidad_medida="km", meta_diaria=5, dias='["L"]', color="#445566"
+    )
+    test_db_session.add_all([leer, correr])
+    await test_db_session.flush()
+
+    for fecha, valores in [("2024-05-02", (10, 2)), ("2024-05-01", (4, 5)), ("2024-05-03", None)]:
+        registro = registros(usuario_id=test_user.id, fecha=fecha, notas=f"nota {fecha}")
+        test_db_session.add(registro)
+        await test_db_session.flush()
+        if valores:
+            for habito, valor in zip((leer, correr), valores):
+                test_db_session.add(progreso_habitos(
+                    registro_id=registro.id, habito_id=habito.id,
+                    valor=valor, completado=valor >= habito.meta_diaria
+                ))
+    await test_db_session.commit()
+    return [leer, correr]
+
+
+class TestExportar:
+    """Tests de GET /api/export."""
+
+    @pytest.mark.asyncio
+    async def test_ndjson_nests_progresos_per_registro(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos]
+    ):
+        """Test: Una línea por registro, en orden de fecha, con sus progresos y hábitos."""
+        response = await test_client.get("/api/export", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "attachment" in response.headers["content-disposition"]
+
+        lineas = [json.loads(linea) for linea in response.text.splitlines()]
+        assert [linea["fecha"] for linea in lineas] == ["2024-05-01", "2024-05-02", "2024-05-03"]
+        assert lineas[2]["progresos"] == []
+
+        primero = lineas[0]
+        assert primero["notas"] == "nota 2024-05-01"
+        assert [(p["habito"], p["valor"], p["completado"]) for p in primero["progresos"]] == [
+            ("Leer", 4, False), ("Correr", 5, True)
+        ]
+        assert primero["progresos"][0]["categoria"] == "Salud"
+        assert primero["progresos"][0]["unidad_medida"] == "páginas"
+        assert primero["progresos"][0]["color"] == "#112233"
+
+    @pytest.mark.asyncio
+    async def test_csv_has_one_row_per_progreso(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos]
+    ):
+        """Test: El CSV tiene encabezado y una fila por progreso (o por registro vacío)."""
+        response = await test_client.get(
+            "/api/export", params={"formato": "csv"}, headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+
+        filas = list(csv.DictReader(io.StringIO(response.text)))
+        assert list(filas[0].keys()) == exportar.COLUMNAS_CSV
+        assert len(filas) == 5
+        assert [(f["fecha"], f["habito"], f["completado"]) for f in filas] == [
+            ("2024-05-01", "Leer", "0"),
+            ("2024-05-01", "Correr", "1"),
+            ("2024-05-02", "Leer", "1"),
+            ("2024-05-02", "Correr", "0"),
+            ("2024-05-03", "", ""),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_gzip_body(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos]
+    ):
+        """Test: Con gzip=true el cuerpo enviado está comprimido y se descomprime al NDJSON."""
+        async with test_client.stream(
+            "GET", "/api/export", params={"gzip": "true"}, headers=auth_headers
+        ) as response:
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == "gzip"
+            crudo = b"".join([parte async for parte in response.aiter_raw()])
+
+        lineas = gzip.decompress(crudo).decode("utf-8").splitlines()
+        assert len(lineas) == 3
+        assert json.loads(lineas[0])["fecha"] == "2024-05-01"
+
+    @pytest.mark.asyncio
+    async def test_large_history_is_sent_in_blocks(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        historial: list[habitos],
+        monkeypatch
+    ):
+        """Test: El cuerpo sale en varios bloques y no como una sola cadena al final."""
+        monkeypatch.setattr(exportar, "TAMANO_BLOQUE", 256)
+        monkeypatch.setattr(exportar, "FILAS_POR_LOTE", 7)
+        test_db_session.add_all([
+            registros(usuario_id=test_user.id, fecha=f"2023-{mes:02d}-{dia:02d}")
+            for mes in range(1, 13) for dia in range(1, 29)
+        ])
+        await test_db_session.commit()
+
+        # El transporte ASGI de httpx junta el cuerpo: se consume el generador directamente
+        bloques = [
+            bloque async for bloque in exportar.exportar_historial(
+                test_user.id, exportar.FormatoExportacion.ndjson, comprimir=False
+            )
+        ]
+
+        assert len(bloques) > 1
+        assert all(len(bloque) < 2 * 256 for bloque in bloques)
+        lineas = b"".join(bloques).decode("utf-8").splitlines()
+        assert len(lineas) == 12 * 28 + 3
+
+    @pytest.mark.asyncio
+    async def test_only_current_user_data(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        auth_headers: dict,
+        historial: list[habitos]
+    ):
+        """Test: No se exportan los registros de otros usuarios."""
+        otro = usuario(nombre="otro", email="otro@example.com", contrasena="x")
+        test_db_session.add(otro)
+        await test_db_session.flush()
+        test_db_session.add(registros(usuario_id=otro.id, fecha="2024-05-01"))
+        await test_db_session.commit()
+
+        response = await test_client.get("/api/export", headers=auth_headers)
+
+        ids = {json.loads(linea)["id"] for linea in response.text.splitlines()}
+        assert len(ids) == 3
+
+    @pytest.mark.asyncio
+    async def test_requires_authentication(self, test_client: AsyncClient):
+        """Test: Sin token no hay exportación."""
+        response = await test_client.get("/api/export")
+
+        assert response.status_code in (401, 403)
@@ -0,0 +1,49 @@
+"""
+Tests para los endpoints de días de hábitos.
+
+Principios Zen aplicados:
+- Errores explícitos: un hábito inexistente es 404, no un error de integridad
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import usuario, categorias, habitos
+
+
+class TestCreateHabitoDia:
+    """Tests para el endpoint de creación de días de hábitos."""
+
+    @pytest.mark.asyncio
+    async def test_create_habito_dia_success(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias
+    ):
+        """Test: Debe crear el día para un hábito existente."""
+        habito = habitos(
+            nombre="Leer", categoria_id=test_categoria.id, usuario_id=test_user.id,
+            unidad_medida="páginas", meta_diaria=10, dias='["L"]', color="#000000"
+        )
+        test_db_session.add(habito)
+        await test_db_session.commit()
+
+        response = await test_client.post(
+            "/api/habito-dias/", json={"habito_id": habito.id, "estado": True}
+        )
+
+        assert response.status_code == 201
+        assert response.json()["habito_id"] == habito.id
+
+    @pytest.mark.asyncio
+    async def test_create_habito_dia_habito_not_found(self, test_client: AsyncClient):
+        """Test: Debe retornar 404 si el hábito no existe."""
+        response = await test_client.post(
+            "/api/habito-dias/", json={"habito_id": 999, "estado": False}
+        )
+
+        assert response.status_code == 404
+        assert "no encontrado" in response.json()["detail"]
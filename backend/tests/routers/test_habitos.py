@@ -238,12 +238,7 @@ class TestCreateHabito:
         test_client: AsyncClient,
         auth_headers: dict
     ):
-        """
-        Test: Actualmente SQLite no valida foreign keys en tests.
-
-        NOTA: Este test documenta el comportamiento actual. En producción,
-        se debería validar que la categoría existe antes de crear el hábito.
-        """
+        """Test: Debe rechazar una categoría inexistente."""
         response = await test_client.post(
             "/api/habitos/",
             headers=auth_headers,
@@ -258,9 +253,8 @@ class TestCreateHabito:
             }
         )
 
-        # TODO: Agregar validación en el endpoint para verificar que categoria_id existe
-        # Por ahora, SQLite no valida foreign keys en tests, así que se crea exitosamente
-        assert response.status_code == 201
+        assert response.status_code == 400
+        assert response.json()["detail"] == "La categoría no existe"
 
 
 class TestUpdateHabito:
@@ -288,6 +282,27 @@ class TestUpdateHabito:
         assert data["nombre"] == "Correr (Actualizado)"
         assert data["meta_diaria"] == 45.0
 
+    @pytest.mark.asyncio
+    async def test_update_habito_dias_keeps_list_form_and_mask(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_habito: habitos,
+        auth_headers: dict
+    ):
+        """Test: Cambiar los días debe devolver la lista y actualizar la máscara."""
+        response = await test_client.put(
+            f"/api/habitos/{test_habito.id}",
+            headers=auth_headers,
+            json={"dias": '["S", "D"]'}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["dias"] == '["S", "D"]'
+
+        await test_db_session.refresh(test_habito)
+        assert test_habito.dias_mask == 0b1100000
+
     @pytest.mark.asyncio
     async def test_update_habito_not_found(
         self,
@@ -0,0 +1,76 @@
+"""
+Tests para el endpoint /metrics.
+
+Principios Zen aplicados:
+- Las métricas son globales al proceso: se comparan antes y después
+- Las rutas se identifican por su plantilla, no por la URL concreta
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from app.metricas import TIPO_CONTENIDO, latencia_http, notificaciones_push, peticiones_http
+from app.services.push_service import PushService
+
+
+class TestMetrics:
+    """Tests de la exposición de métricas."""
+
+    @pytest.mark.asyncio
+    async def test_requests_are_labeled_by_route_template(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict
+    ):
+        """Test: Las peticiones se cuentan por plantilla de ruta y estado."""
+        ruta = "/api/habitos/{habito_id}"
+        antes = peticiones_http.valor(method="GET", route=ruta, status=404)
+        observaciones = latencia_http.cantidad(method="GET", route=ruta)
+
+        for habito_id in (123, 456):
+            await test_client.get(f"/api/habitos/{habito_id}", headers=auth_headers)
+
+        assert peticiones_http.valor(method="GET", route=ruta, status=404) == antes + 2
+        assert latencia_http.cantidad(method="GET", route=ruta) == observaciones + 2
+
+        response = await test_client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == TIPO_CONTENIDO
+        assert f'http_requests_total{{method="GET",route="{ruta}",status="404"}}' in response.text
+        assert "/api/habitos/123" not in response.text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/habitos/{habito_id}",le="+Inf"}' in response.text
+
+    @pytest.mark.asyncio
+    async def test_exposes_gauges_and_cache_ratio(self, test_client: AsyncClient):
+        """Test: /metrics incluye peticiones en curso, pool y caché de autenticación."""
+        response = await test_client.get("/metrics")
+
+        # La propia petición a /metrics está en curso
+        assert "http_requests_in_progress 1" in response.text
+        assert "# TYPE auth_cache_hit_ratio gauge" in response.text
+        assert "# TYPE bcrypt_pending gauge" in response.text
+        assert "# TYPE db_pool_checkout_wait_seconds histogram" in response.text
+
+    @pytest.mark.asyncio
+    async def test_token_is_required_when_configured(self, test_client: AsyncClient, monkeypatch):
+        """Test: Con METRICS_TOKEN, /metrics exige el token."""
+        from app import main
+        monkeypatch.setattr(main.settings, "metrics_token", "secreto")
+
+        sin_token = await test_client.get("/metrics")
+        con_token = await test_client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+
+        assert sin_token.status_code == 401
+        assert con_token.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_push_outcomes_are_counted(self):
+        """Test: Cada envío push suma en su resultado."""
+        antes = notificaciones_push.valor(result="failed")
+
+        # Sin clave VAPID el envío falla sin tocar la red
+        await PushService(vapid_private_key="").send_notification(
+            {"endpoint": "https://push.example.com/x", "keys": {}}, "Título", "Cuerpo"
+        )
+
+        assert notificaciones_push.valor(result="failed") == antes + 1
@@ -0,0 +1,366 @@
+"""
+Tests para los endpoints de notificaciones.
+
+Principios Zen aplicados:
+- El próximo recordatorio se fija explícitamente en la base de datos
+- El endpoint solo encola; la entrega se prueba en tests/unit/test_outbox.py
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import categorias, habitos, notification_outbox, progreso_habitos, registros, usuario
+from app.security import cache_autenticacion
+from app.services.recordatorios import TOLERANCIA_ANTICIPO, fecha_local
+
+
+def ahora_utc() -> datetime:
+    """Instante actual en UTC sin tzinfo, como se guarda next_reminder_at_utc."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def crear_habito(db: AsyncSession, usuario_id: int, dias_mask: int = 0b1111111) -> int:
+    """Crea un hábito activo (por defecto programado todos los días)."""
+    categoria = (await db.execute(select(categorias))).scalars().first()
+    if categoria is None:
+        categoria = categorias(nombre="Salud")
+        db.add(categoria)
+        await db.flush()
+    habito = habitos(
+        nombre="Leer",
+        categoria_id=categoria.id,
+        usuario_id=usuario_id,
+        unidad_medida="páginas",
+        meta_diaria=10,
+        dias="[]",
+        dias_mask=dias_mask,
+        color="#000000"
+    )
+    db.add(habito)
+    await db.commit()
+    return habito.id
+
+
+async def crear_usuario_con_recordatorio(
+    db: AsyncSession,
+    nombre: str,
+    proximo: datetime,
+    zona_horaria: Optional[str] = None,
+    con_habito: bool = True
+) -> int:
+    """
+    Crea un usuario con notificaciones activas y fija su próximo recordatorio.
+
+    Por defecto le crea un hábito diario, para que tenga algo pendiente.
+    """
+    user = usuario(
+        nombre=nombre,
+        email=f"{nombre}@example.com",
+        contrasena="x",
+        notificaciones_activas=True,
+        timezone=zona_horaria or "America/Santo_Domingo"
+    )
+    db.add(user)
+    await db.flush()
+    await db.execute(
+        update(usuario).where(usuario.id == user.id).values(next_reminder_at_utc=proximo)
+    )
+    await db.commit()
+    if con_habito:
+        await crear_habito(db, user.id)
+    return user.id
+
+
+async def registrar_dia(db: AsyncSession, usuario_id: int, fecha: date, completados: dict[int, bool]) -> None:
+    """Crea el registro de un día con un progreso por hábito ({habito_id: completado})."""
+    registro = registros(usuario_id=usuario_id, fecha=fecha.isoformat())
+    db.add(registro)
+    await db.flush()
+    db.add_all([
+        progreso_habitos(registro_id=registro.id, habito_id=habito_id, valor=0, completado=completado)
+        for habito_id, completado in completados.items()
+    ])
+    await db.commit()
+
+
+async def cuerpos_encolados(db: AsyncSession) -> dict[int, str]:
+    """Cuerpo de la notificación encolada por usuario."""
+    result = await db.execute(select(notification_outbox.usuario_id, notification_outbox.cuerpo))
+    return dict(result.all())
+
+
+async def proximo_recordatorio(db: AsyncSession, usuario_id: int):
+    """Lee next_reminder_at_utc directamente de la base de datos."""
+    result = await db.execute(
+        select(usuario.next_reminder_at_utc).where(usuario.id == usuario_id)
+    )
+    return result.scalar_one()
+
+
+class TestPreferencias:
+    """Tests del mantenimiento de next_reminder_at_utc al cambiar preferencias."""
+
+    @pytest.mark.asyncio
+    async def test_enabling_schedules_next_reminder(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        auth_headers: dict
+    ):
+        """Test: Activar recordatorios programa el próximo a la hora local elegida."""
+        response = await test_client.put(
+            "/api/notifications/preferences",
+            json={
+                "notificaciones_activas": True,
+                "hora_recordatorio": "09:15",
+                "timezone": "Europe/Madrid"
+            },
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        proximo = await proximo_recordatorio(test_db_session, test_user.id)
+        ahora = ahora_utc()
+        assert ahora < proximo <= ahora + timedelta(days=1)
+        local = proximo.replace(tzinfo=timezone.utc).astimezone(ZoneInfo("Europe/Madrid"))
+        assert (local.hour, local.minute) == (9, 15)
+
+    @pytest.mark.asyncio
+    async def test_disabling_clears_next_reminder(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        auth_headers: dict
+    ):
+        """Test: Desactivar las notificaciones deja de programar recordatorios."""
+        await test_client.put(
+            "/api/notifications/preferences",
+            json={"notificaciones_activas": True},
+            headers=auth_headers
+        )
+        await test_client.put(
+            "/api/notifications/preferences",
+            json={"notificaciones_activas": False},
+            headers=auth_headers
+        )
+
+        assert await proximo_recordatorio(test_db_session, test_user.id) is None
+
+
+class TestSendReminders:
+    """Tests del endpoint llamado por Cloud Scheduler."""
+
+    @pytest.mark.asyncio
+    async def test_only_due_users_are_processed(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession
+    ):
+        """Test: Solo se encolan los vencidos; los muy atrasados se reprograman sin encolar."""
+        ahora = ahora_utc()
+        vencido = await crear_usuario_con_recordatorio(test_db_session, "vencido", ahora - timedelta(minutes=10))
+        anticipado = await crear_usuario_con_recordatorio(test_db_session, "anticipado", ahora + timedelta(minutes=3))
+        atrasado = await crear_usuario_con_recordatorio(test_db_session, "atrasado", ahora - timedelta(hours=3))
+        futuro = await crear_usuario_con_recordatorio(test_db_session, "futuro", ahora + timedelta(hours=2))
+
+        response = await test_client.post("/api/notifications/send-reminders")
+
+        assert response.status_code == 200
+        data = response.json()
+        acciones = {d["user_id"]: d["accion"] for d in data["debug"]}
+        assert acciones == {atrasado: "saltado", vencido: "encolado", anticipado: "encolado"}
+        assert data["stats"] == {"checked": 3, "enqueued": 2, "duplicates": 0, "skipped": 1, "no_pending": 0}
+        result = await test_db_session.execute(select(notification_outbox.usuario_id))
+        assert sorted(result.scalars().all()) == sorted([vencido, anticipado])
+
+        test_db_session.expire_all()
+        for usuario_id in (vencido, anticipado, atrasado):
+            assert await proximo_recordatorio(test_db_session, usuario_id) > ahora + TOLERANCIA_ANTICIPO
+        assert await proximo_recordatorio(test_db_session, futuro) == ahora + timedelta(hours=2)
+
+    @pytest.mark.asyncio
+    async def test_rescheduled_users_leave_auth_cache(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        auth_token: str,
+        auth_headers: dict
+    ):
+        """Test: Tras reprogramar, el snapshot cacheado (con el recordatorio viejo) se descarta."""
+        await test_client.get("/api/auth/me", headers=auth_headers)
+        await test_db_session.execute(
+            update(usuario)
+            .where(usuario.id == test_user.id)
+            .values(notificaciones_activas=True, next_reminder_at_utc=ahora_utc() - timedelta(minutes=1))
+        )
+        await test_db_session.commit()
+        await test_client.get("/api/auth/me", headers=auth_headers)
+        assert cache_autenticacion.obtener(auth_token) is not None
+
+        response = await test_client.post("/api/notifications/send-reminders")
+
+        assert response.json()["stats"]["checked"] == 1
+        assert cache_autenticacion.obtener(auth_token) is None
+
+    @pytest.mark.asyncio
+    async def test_second_tick_does_not_repeat(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession
+    ):
+        """Test: Un usuario ya procesado no vuelve a seleccionarse en el siguiente tick."""
+        await crear_usuario_con_recordatorio(test_db_session, "vencido", ahora_utc() - timedelta(minutes=1))
+
+        primero = await test_client.post("/api/notifications/send-reminders")
+        segundo = await test_client.post("/api/notifications/send-reminders")
+
+        assert primero.json()["stats"]["checked"] == 1
+        assert segundo.json()["stats"]["checked"] == 0
+
+    @pytest.mark.asyncio
+    async def test_overlapping_ticks_enqueue_once(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession
+    ):
+        """Test: Dos ticks que ven el mismo recordatorio vencido lo encolan una sola vez."""
+        recordatorio = ahora_utc() - timedelta(minutes=1)
+        usuario_id = await crear_usuario_con_recordatorio(test_db_session, "vencido", recordatorio)
+
+        primero = await test_client.post("/api/notifications/send-reminders")
+        # Otra instancia leyó el recordatorio antes de que se reprogramara
+        await test_db_session.execute(
+            update(usuario).where(usuario.id == usuario_id).values(next_reminder_at_utc=recordatorio)
+        )
+        await test_db_session.commit()
+        segundo = await test_client.post("/api/notifications/send-reminders")
+
+        assert primero.json()["stats"]["enqueued"] == 1
+        assert segundo.json()["stats"] == {
+            "checked": 1, "enqueued": 0, "duplicates": 1, "skipped": 0, "no_pending": 0
+        }
+        result = await test_db_session.execute(select(notification_outbox))
+        assert len(result.scalars().all()) == 1
+
+    @pytest.mark.asyncio
+    async def test_only_users_with_pending_habits_are_notified(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession
+    ):
+        """Test: Se notifica solo a quien tiene hábitos pendientes hoy, con el conteo en el mensaje."""
+        recordatorio = ahora_utc() - timedelta(minutes=1)
+        hoy = fecha_local(recordatorio, None)
+        otro_dia = 1 << ((hoy.weekday() + 1) % 7)
+
+        completo = await crear_usuario_con_recordatorio(test_db_session, "completo", recordatorio)
+        (habito,) = (await test_db_session.execute(
+            select(habitos.id).where(habitos.usuario_id == completo)
+        )).scalars().all()
+        await registrar_dia(test_db_session, completo, hoy, {habito: True})
+
+        con_registro = await crear_usuario_con_recordatorio(test_db_session, "con_registro", recordatorio)
+        habitos_con_registro = [
+            *(await test_db_session.execute(
+                select(habitos.id).where(habitos.usuario_id == con_registro)
+            )).scalars().all(),
+            await crear_habito(test_db_session, con_registro),
+            await crear_habito(test_db_session, con_registro),
+        ]
+        await registrar_dia(test_db_session, con_registro, hoy, {
+            habitos_con_registro[0]: True, habitos_con_registro[1]: False, habitos_con_registro[2]: False
+        })
+
+        sin_registro = await crear_usuario_con_recordatorio(test_db_session, "sin_registro", recordatorio)
+        await crear_habito(test_db_session, sin_registro, dias_mask=otro_dia)
+
+        otro_dia_solo = await crear_usuario_con_recordatorio(
+            test_db_session, "otro_dia", recordatorio, con_habito=False
+        )
+        await crear_habito(test_db_session, otro_dia_solo, dias_mask=otro_dia)
+
+        response = await test_client.post("/api/notifications/send-reminders")
+
+        data = response.json()
+        assert data["stats"] == {"checked": 4, "enqueued": 2, "duplicates": 0, "skipped": 0, "no_pending": 2}
+        pendientes = {d["user_id"]: d["pendientes"] for d in data["debug"]}
+        assert pendientes == {completo: 0, con_registro: 2, sin_registro: 1, otro_dia_solo: 0}
+        assert await cuerpos_encolados(test_db_session) == {
+            con_registro: "¡Te quedan 2 hábitos pendientes hoy!",
+            sin_registro: "¡Te queda 1 hábito pendiente hoy!",
+        }
+
+    @pytest.mark.asyncio
+    async def test_pending_habits_use_each_users_local_date(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession
+    ):
+        """Test: Cada usuario se evalúa en su fecha local, aunque sean distintas en el mismo tick."""
+        recordatorio = ahora_utc() - timedelta(minutes=1)
+        adelantado = await crear_usuario_con_recordatorio(
+            test_db_session, "adelantado", recordatorio, "Pacific/Kiritimati"
+        )
+        atrasado = await crear_usuario_con_recordatorio(
+            test_db_session, "atrasado", recordatorio, "Pacific/Pago_Pago"
+        )
+        fecha_adelantado = fecha_local(recordatorio, "Pacific/Kiritimati")
+        fecha_atrasado = fecha_local(recordatorio, "Pacific/Pago_Pago")
+        assert fecha_adelantado != fecha_atrasado
+
+        # Ambos completaron el día local del adelantado; solo a él no le queda nada
+        for usuario_id in (adelantado, atrasado):
+            (habito,) = (await test_db_session.execute(
+                select(habitos.id).where(habitos.usuario_id == usuario_id)
+            )).scalars().all()
+            await registrar_dia(test_db_session, usuario_id, fecha_adelantado, {habito: True})
+
+        response = await test_client.post("/api/notifications/send-reminders")
+
+        assert response.json()["stats"]["no_pending"] == 1
+        assert list(await cuerpos_encolados(test_db_session)) == [atrasado]
+
+    @pytest.mark.asyncio
+    async def test_cost_does_not_grow_with_total_users(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        contar_queries
+    ):
+        """Test: Las sentencias por tick no dependen de cuántos usuarios no vencidos hay."""
+        ahora = ahora_utc()
+        await crear_usuario_con_recordatorio(test_db_session, "vencido", ahora - timedelta(minutes=1))
+
+        with contar_queries() as pocos:
+            await test_client.post("/api/notifications/send-reminders")
+
+        await crear_usuario_con_recordatorio(test_db_session, "vencido2", ahora - timedelta(minutes=1))
+        await test_db_session.execute(
+            insert(usuario),
+            [
+                {
+                    "nombre": f"u{i}",
+                    "email": f"u{i}@example.com",
+                    "contrasena": "x",
+                    "notificaciones_activas": True,
+                    "next_reminder_at_utc": ahora + timedelta(hours=1 + i % 20)
+                }
+                for i in range(500)
+            ]
+        )
+        await test_db_session.commit()
+
+        with contar_queries() as muchos:
+            response = await test_client.post("/api/notifications/send-reminders")
+
+        assert response.json()["stats"]["checked"] == 1
+        assert len(muchos) == len(pocos)
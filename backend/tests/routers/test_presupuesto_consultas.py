@@ -0,0 +1,152 @@
+"""
+Presupuesto de consultas SQL por endpoint.
+
+Cada endpoint tiene un máximo de sentencias que no debe depender de cuántos
+hábitos o registros tenga el usuario. Un N+1 nuevo hace fallar el test con
+la sentencia repetida al principio del mensaje.
+
+Principios Zen aplicados:
+- Los datos tienen varios hábitos y días, para que un bucle de consultas se note
+- El presupuesto es explícito por endpoint
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import categorias, habitos, progreso_habitos, registros, usuario
+from app.services.rollups import recalcular_rollups
+
+HOY = date.today()
+DIAS_CON_REGISTRO = 10
+HABITOS = 6
+
+
+@pytest_asyncio.fixture
+async def historial(
+    test_db_session: AsyncSession,
+    test_user: usuario,
+    test_categoria: categorias
+) -> list[habitos]:
+    """Varios hábitos diarios con registros y progresos de los últimos días."""
+    lista = [
+        habitos(
+            nombre=f"Hábito {i}",
+            categoria_id=test_categoria.id,
+            usuario_id=test_user.id,
+            unidad_medida="veces",
+            meta_diaria=1.0,
+            dias='["L", "M", "X", "J", "V", "S", "D"]',
+            color="#123456",
+            activo=1,
+            created_at=datetime.combine(HOY - timedelta(days=60), datetime.min.time())
+        )
+        for i in range(HABITOS)
+    ]
+    test_db_session.add_all(lista)
+    await test_db_session.flush()
+    for dias_atras in range(DIAS_CON_REGISTRO):
+        registro = registros(usuario_id=test_user.id, fecha=(HOY - timedelta(days=dias_atras)).isoformat())
+        test_db_session.add(registro)
+        await test_db_session.flush()
+        test_db_session.add_all([
+            progreso_habitos(registro_id=registro.id, habito_id=h.id, valor=1, completado=i % 2 == 0)
+            for i, h in enumerate(lista)
+        ])
+    await test_db_session.flush()
+    await recalcular_rollups(test_db_session, test_user.id)
+    await test_db_session.commit()
+    return lista
+
+
+# (ruta, máximo de sentencias) con el usuario ya autenticado en la caché
+RUTAS_LECTURA = [
+    ("/api/habitos/", 2),
+    ("/api/categorias/", 2),
+    ("/api/registros/", 2),
+    (f"/api/registros/fecha/{HOY}", 3),
+    (f"/api/registros/dia/{HOY - timedelta(days=DIAS_CON_REGISTRO + 5)}", 3),
+    (f"/api/registros/calendario/{HOY.year}/{HOY.month}", 3),
+    (f"/api/registros/calendario/{HOY.year}/{HOY.month}/habitos", 2),
+    (f"/api/analisis/rendimiento?fecha_inicio={HOY - timedelta(days=30)}&fecha_fin={HOY}", 2),
+    (f"/api/analisis/cumplimiento?fecha_inicio={HOY - timedelta(days=30)}&fecha_fin={HOY}", 4),
+    ("/api/auth/me", 1),
+    ("/api/notifications/preferences", 1),
+]
+
+
+class TestPresupuestoConsultas:
+    """Tests del máximo de consultas por endpoint."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("ruta,maximo", RUTAS_LECTURA)
+    async def test_read_endpoints_stay_within_budget(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos],
+        max_queries,
+        ruta: str,
+        maximo: int
+    ):
+        """Test: Las lecturas no superan su presupuesto de consultas."""
+        with max_queries(maximo):
+            response = await test_client.get(ruta, headers=auth_headers)
+
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_server_timing_reports_the_same_count(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos],
+        contar_queries
+    ):
+        """Test: La cabecera Server-Timing informa las consultas de la petición."""
+        with contar_queries() as sentencias:
+            response = await test_client.get(f"/api/registros/fecha/{HOY}", headers=auth_headers)
+
+        assert f'desc="{len(sentencias)} consultas"' in response.headers["server-timing"]
+
+
+class TestPresupuestoEliminacion:
+    """Tests del máximo de consultas al eliminar: no depende del historial."""
+
+    @pytest.mark.asyncio
+    # Incluye la consulta del usuario autenticado
+    @pytest.mark.parametrize("ruta,maximo", [
+        ("/api/auth/delete-account", 2),
+        ("/api/auth/delete-all-data", 3),
+    ])
+    async def test_account_deletes_stay_within_budget(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos],
+        max_queries,
+        ruta: str,
+        maximo: int
+    ):
+        """Test: Borrar la cuenta o sus datos es un número fijo de sentencias."""
+        with max_queries(maximo):
+            response = await test_client.delete(ruta, headers=auth_headers)
+
+        assert response.status_code == 204
+
+    @pytest.mark.asyncio
+    async def test_delete_habito_stays_within_budget(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict,
+        historial: list[habitos],
+        max_queries
+    ):
+        """Test: Borrar un hábito no ejecuta un DELETE por progreso (más el recálculo desde su creación)."""
+        with max_queries(6):
+            response = await test_client.delete(f"/api/habitos/{historial[0].id}", headers=auth_headers)
+
+        assert response.status_code == 204
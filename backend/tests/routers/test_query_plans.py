@@ -0,0 +1,198 @@
+"""
+Tests de regresión de planes de consulta (SQLite).
+
+Ejecuta los flujos principales de cada router, captura las sentencias SQL
+que emiten y corre EXPLAIN QUERY PLAN sobre cada una. Falla si alguna
+recorre una tabla completa en lugar de usar un índice.
+
+Principios Zen aplicados:
+- Se analizan las consultas reales de las rutas, no copias de ellas
+- El mensaje de error muestra la sentencia y su plan
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Base
+from app.models import usuario, categorias, habitos
+
+
+TABLAS = set(Base.metadata.tables)
+
+# "SCAN tabla" o "SCAN tabla USING [COVERING] INDEX ..." es un recorrido completo
+PATRON_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@pytest_asyncio.fixture
+async def habitos_plan(
+    test_db_session: AsyncSession,
+    test_user: usuario,
+    test_categoria: categorias
+) -> list[habitos]:
+    """Crea un par de hábitos para que las rutas tengan datos que recorrer."""
+    creados = [
+        habitos(
+            nombre=nombre,
+            categoria_id=test_categoria.id,
+            usuario_id=test_user.id,
+            unidad_medida="veces",
+            meta_diaria=1.0,
+            dias=dias,
+            color="#123456",
+            activo=1,
+            created_at=datetime(2024, 1, 1)
+        )
+        for nombre, dias in (("Leer", '["L", "X", "V"]'), ("Nadar", '["S", "D"]'))
+    ]
+    test_db_session.add_all(creados)
+    await test_db_session.commit()
+    return creados
+
+
+@pytest.fixture
+def capturar_sentencias(test_engine):
+    """Captura (sentencia, parámetros) de todo lo ejecutado contra el engine de test."""
+    capturadas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            capturadas.append((statement, parameters))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", registrar)
+    yield capturadas
+    event.remove(test_engine.sync_engine, "before_cursor_execute", registrar)
+
+
+async def recorridos_completos(test_engine, sentencias) -> list[str]:
+    """Retorna una descripción de cada sentencia cuyo plan recorre una tabla completa."""
+    problemas = []
+    vistas = set()
+    async with test_engine.connect() as conn:
+        for statement, parameters in sentencias:
+            verbo = statement.lstrip().split(None, 1)[0].upper()
+            if verbo not in ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH") or statement in vistas:
+                continue
+            vistas.add(statement)
+
+            plan = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            for fila in plan:
+                detalle = fila[-1]
+                coincidencia = PATRON_SCAN.match(detalle)
+                if coincidencia and coincidencia.group(1) in TABLAS:
+                    problemas.append(f"{detalle}\n    en: {' '.join(statement.split())}")
+    return problemas
+
+
+class TestQueryPlans:
+    """Las consultas principales de cada router deben usar índices."""
+
+    @pytest.mark.asyncio
+    async def test_registros_queries_use_indexes(
+        self,
+        test_client: AsyncClient,
+        test_engine,
+        habitos_plan: list[habitos],
+        auth_headers: dict,
+        capturar_sentencias
+    ):
+        """Test: Registro del día, toggle, actualización y calendarios."""
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        progreso_id = registro["progresos"][0]["id"]
+        await test_client.post(f"/api/registros/progreso/toggle/{progreso_id}", headers=auth_headers)
+        await test_client.put(
+            f"/api/registros/progreso/{progreso_id}",
+            json={"valor": 0.5, "completado": False},
+            headers=auth_headers
+        )
+        await test_client.get("/api/registros/existe/2024-03-04", headers=auth_headers)
+        await test_client.get("/api/registros/calendario/2024/3", headers=auth_headers)
+        await test_client.get("/api/registros/calendario/2024/3/habitos", headers=auth_headers)
+        await test_client.get(
+            f"/api/registros/calendario/2024/3/habito/{habitos_plan[0].id}", headers=auth_headers
+        )
+
+        assert await recorridos_completos(test_engine, capturar_sentencias) == []
+
+    @pytest.mark.asyncio
+    async def test_analisis_queries_use_indexes(
+        self,
+        test_client: AsyncClient,
+        test_engine,
+        habitos_plan: list[habitos],
+        auth_headers: dict,
+        capturar_sentencias
+    ):
+        """Test: Rendimiento y cumplimiento."""
+        await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)
+        rango = {"fecha_inicio": "2024-03-01", "fecha_fin": "2024-03-31"}
+        await test_client.get("/api/analisis/rendimiento", params=rango, headers=auth_headers)
+        await test_client.get("/api/analisis/cumplimiento", params=rango, headers=auth_headers)
+
+        assert await recorridos_completos(test_engine, capturar_sentencias) == []
+
+    @pytest.mark.asyncio
+    async def test_habitos_queries_use_indexes(
+        self,
+        test_client: AsyncClient,
+        test_engine,
+        habitos_plan: list[habitos],
+        auth_headers: dict,
+        capturar_sentencias
+    ):
+        """Test: Listado, edición y eliminación de hábitos."""
+        await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)
+        habito_id = habitos_plan[0].id
+        await test_client.get("/api/habitos/", headers=auth_headers)
+        await test_client.get(f"/api/habitos/{habito_id}", headers=auth_headers)
+        await test_client.put(
+            f"/api/habitos/{habito_id}",
+            json={"dias": '["L", "M"]'},
+            headers=auth_headers
+        )
+        await test_client.delete(f"/api/habitos/{habito_id}", headers=auth_headers)
+
+        assert await recorridos_completos(test_engine, capturar_sentencias) == []
+
+    @pytest.mark.asyncio
+    async def test_notifications_queries_use_indexes(
+        self,
+        test_client: AsyncClient,
+        test_engine,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habitos_plan: list[habitos],
+        auth_headers: dict,
+        capturar_sentencias
+    ):
+        """Test: Suscripción, recordatorios programados y cancelación de notificaciones push."""
+        # El usuario de test tiene un recordatorio vencido y hábitos por contar
+        await test_db_session.execute(
+            update(usuario).where(usuario.id == test_user.id).values(
+                notificaciones_activas=True,
+                next_reminder_at_utc=datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=1)
+            )
+        )
+        await test_db_session.commit()
+
+        suscripcion = {
+            "endpoint": "https://push.example.com/abc",
+            "p256dh_key": "clave",
+            "auth_key": "auth"
+        }
+        await test_client.post("/api/notifications/subscribe", json=suscripcion, headers=auth_headers)
+        await test_client.get("/api/notifications/preferences", headers=auth_headers)
+        recordatorios = await test_client.post("/api/notifications/send-reminders")
+        assert recordatorios.json()["stats"]["checked"] == 1
+        await test_client.delete(
+            "/api/notifications/unsubscribe",
+            params={"endpoint": suscripcion["endpoint"]},
+            headers=auth_headers
+        )
+
+        assert await recorridos_completos(test_engine, capturar_sentencias) == []
@@ -0,0 +1,689 @@
+"""
+Tests para los endpoints de registros y progresos.
+
+Principios Zen aplicados:
+- Tests explícitos y descriptivos
+- Verificación de los agregados diarios mantenidos por las escrituras
+"""
+
+from datetime import date, datetime
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, get_db_lectura
+from app.models import usuario, categorias, habitos, daily_rollups, registros, progreso_habitos
+from app.routers.registros import crear_registro_del_dia, router
+
+
+TODOS_LOS_DIAS = '["L", "M", "X", "J", "V", "S", "D"]'
+
+
+@pytest_asyncio.fixture
+async def habito_diario(
+    test_db_session: AsyncSession,
+    test_user: usuario,
+    test_categoria: categorias
+) -> habitos:
+    """Crea un hábito activo todos los días desde 2024."""
+    habito = habitos(
+        nombre="Meditar",
+        categoria_id=test_categoria.id,
+        usuario_id=test_user.id,
+        unidad_medida="minutos",
+        meta_diaria=15.0,
+        dias=TODOS_LOS_DIAS,
+        color="#00AA00",
+        activo=1,
+        created_at=datetime(2024, 1, 1)
+    )
+    test_db_session.add(habito)
+    await test_db_session.commit()
+    await test_db_session.refresh(habito)
+    return habito
+
+
+async def obtener_rollup(db: AsyncSession, usuario_id: int, fecha: str):
+    """Lee la fila de agregado diario de un usuario y fecha."""
+    result = await db.execute(
+        select(daily_rollups).where(
+            daily_rollups.usuario_id == usuario_id,
+            daily_rollups.fecha == fecha
+        ).execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+class TestRegistroPorFecha:
+    """Tests para el endpoint de obtener/crear registro por fecha."""
+
+    @pytest.mark.asyncio
+    async def test_get_registro_creates_progresos_and_rollup(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: Debe crear el registro con progresos y su agregado diario."""
+        response = await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["habito_id"] for p in data["progresos"]] == [habito_diario.id]
+
+        rollup = await obtener_rollup(test_db_session, test_user.id, "2024-03-04")
+        assert rollup is not None
+        assert rollup.programados == 1
+        assert rollup.completados == 0
+
+    @pytest.mark.asyncio
+    async def test_get_registro_future_date_forbidden(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict
+    ):
+        """Test: Debe rechazar fechas futuras si el usuario no tiene 'ver_futuro'."""
+        fecha = date(date.today().year + 1, 1, 1).isoformat()
+        response = await test_client.get(f"/api/registros/fecha/{fecha}", headers=auth_headers)
+
+        assert response.status_code == 403
+
+
+    @pytest.mark.asyncio
+    async def test_first_visit_statement_count_is_fixed(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        habito_diario: habitos,
+        auth_headers: dict,
+        contar_queries
+    ):
+        """Test: Crear el día cuesta las mismas sentencias sin importar cuántos hábitos aplican."""
+        for i in range(5):
+            test_db_session.add(habitos(
+                nombre=f"Fin de semana {i}",
+                categoria_id=test_categoria.id,
+                usuario_id=test_user.id,
+                unidad_medida="veces",
+                meta_diaria=1.0,
+                dias='["S", "D"]',
+                color="#AA0000",
+                activo=1,
+                created_at=datetime(2024, 1, 1)
+            ))
+        test_db_session.add(habitos(
+            nombre="Inactivo",
+            categoria_id=test_categoria.id,
+            usuario_id=test_user.id,
+            unidad_medida="veces",
+            meta_diaria=1.0,
+            dias=TODOS_LOS_DIAS,
+            color="#AAAAAA",
+            activo=0,
+            created_at=datetime(2024, 1, 1)
+        ))
+        await test_db_session.commit()
+
+        # El primer uso del token carga al usuario; los siguientes salen de la caché
+        await test_client.get("/api/auth/me", headers=auth_headers)
+
+        conteos = {}
+        progresos = {}
+        for fecha in ("2024-03-04", "2024-03-09"):  # Lunes y sábado
+            with contar_queries() as sentencias:
+                response = await test_client.get(f"/api/registros/fecha/{fecha}", headers=auth_headers)
+            assert response.status_code == 200
+            conteos[fecha] = len(sentencias)
+            progresos[fecha] = len(response.json()["progresos"])
+
+        assert progresos == {"2024-03-04": 1, "2024-03-09": 6}
+        assert conteos["2024-03-04"] == conteos["2024-03-09"]
+
+        rollup = await obtener_rollup(test_db_session, test_user.id, "2024-03-09")
+        assert rollup.programados == 7  # Incluye el inactivo, igual que recalcular_rollups
+
+    @pytest.mark.asyncio
+    async def test_crear_registro_del_dia_never_duplicates(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habito_diario: habitos
+    ):
+        """Test: Una segunda creación del mismo día no inserta nada."""
+        primero = await crear_registro_del_dia(test_db_session, test_user.id, date(2024, 3, 4))
+        segundo = await crear_registro_del_dia(test_db_session, test_user.id, date(2024, 3, 4))
+        await test_db_session.commit()
+
+        assert primero is not None
+        assert segundo is None
+        total_registros = await test_db_session.scalar(
+            select(func.count()).select_from(registros).where(registros.usuario_id == test_user.id)
+        )
+        total_progresos = await test_db_session.scalar(
+            select(func.count()).select_from(progreso_habitos).where(progreso_habitos.registro_id == primero)
+        )
+        assert total_registros == 1
+        assert total_progresos == 1
+
+
+class TestRegistroVirtual:
+    """Tests de la vista del día sin crear el registro (GET /registros/dia/{fecha})."""
+
+    @pytest_asyncio.fixture
+    async def habitos_variados(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        habito_diario: habitos
+    ) -> list[int]:
+        """El hábito diario, uno de fin de semana y uno inactivo; IDs de los programados el sábado."""
+        fin_de_semana = habitos(
+            nombre="Correr", categoria_id=test_categoria.id, usuario_id=test_user.id,
+            unidad_medida="km", meta_diaria=5.0, dias='["S", "D"]', color="#AA0000", activo=1
+        )
+        inactivo = habitos(
+            nombre="Inactivo", categoria_id=test_categoria.id, usuario_id=test_user.id,
+            unidad_medida="veces", meta_diaria=1.0, dias=TODOS_LOS_DIAS, color="#AAAAAA", activo=0
+        )
+        test_db_session.add_all([fin_de_semana, inactivo])
+        await test_db_session.commit()
+        return [habito_diario.id, fin_de_semana.id]
+
+    @pytest.mark.asyncio
+    async def test_virtual_day_is_read_only(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        habitos_variados: list[int],
+        auth_headers: dict,
+        contar_queries
+    ):
+        """Test: El día virtual sale de la programación de los hábitos sin escribir nada."""
+        with contar_queries() as sentencias:
+            response = await test_client.get("/api/registros/dia/2024-03-09", headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["virtual"] is True
+        assert data["id"] is None
+        assert [(p["id"], p["habito_id"], p["completado"]) for p in data["progresos"]] == [
+            (None, habito_id, False) for habito_id in habitos_variados
+        ]
+        assert all(s.startswith("SELECT") for s in sentencias)
+        for modelo in (registros, progreso_habitos, daily_rollups):
+            assert await test_db_session.scalar(select(func.count()).select_from(modelo)) == 0
+
+    def test_day_view_uses_read_only_session(self):
+        """Test: La vista del día depende de la sesión de solo lectura, no de get_db."""
+        ruta = next(r for r in router.routes if r.path == "/registros/dia/{fecha}")
+        llamadas = set()
+        pendientes = [ruta.dependant]
+        while pendientes:
+            dependencia = pendientes.pop()
+            llamadas.add(dependencia.call)
+            pendientes.extend(dependencia.dependencies)
+
+        assert get_db_lectura in llamadas
+        assert get_db not in llamadas
+
+    @pytest.mark.asyncio
+    async def test_materializing_matches_virtual_day(
+        self,
+        test_client: AsyncClient,
+        habitos_variados: list[int],
+        auth_headers: dict
+    ):
+        """Test: POST crea el día con los mismos hábitos; luego el GET devuelve el real."""
+        virtual = (await test_client.get("/api/registros/dia/2024-03-09", headers=auth_headers)).json()
+
+        response = await test_client.post("/api/registros/fecha/2024-03-09", headers=auth_headers)
+        assert response.status_code == 200
+        real = response.json()
+        assert real["virtual"] is False
+        assert [p["habito_id"] for p in real["progresos"]] == [p["habito_id"] for p in virtual["progresos"]]
+        assert all(p["id"] is not None for p in real["progresos"])
+
+        # Idempotente, y la vista del día ya ve el registro guardado
+        again = await test_client.post("/api/registros/fecha/2024-03-09", headers=auth_headers)
+        assert again.json()["id"] == real["id"]
+        leido = (await test_client.get("/api/registros/dia/2024-03-09", headers=auth_headers)).json()
+        assert (leido["virtual"], leido["id"]) == (False, real["id"])
+
+    @pytest.mark.asyncio
+    async def test_virtual_future_date_forbidden(
+        self,
+        test_client: AsyncClient,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: El modo virtual respeta 'ver_futuro'."""
+        response = await test_client.get("/api/registros/dia/2999-01-01", headers=auth_headers)
+        assert response.status_code == 403
+        response = await test_client.post("/api/registros/fecha/2999-01-01", headers=auth_headers)
+        assert response.status_code == 403
+
+
+class TestProgresoRollups:
+    """Tests de mantenimiento de agregados al modificar progresos."""
+
+    @pytest.mark.asyncio
+    async def test_toggle_updates_rollup(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: Alternar un progreso debe sumar y restar del agregado."""
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        progreso_id = registro["progresos"][0]["id"]
+
+        response = await test_client.post(f"/api/registros/progreso/toggle/{progreso_id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["completado"] is True
+        assert response.json()["valor"] == 15.0
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).completados == 1
+
+        response = await test_client.post(f"/api/registros/progreso/toggle/{progreso_id}", headers=auth_headers)
+        assert response.json()["completado"] is False
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).completados == 0
+
+    @pytest.mark.asyncio
+    async def test_toggle_is_a_single_update(
+        self,
+        test_client: AsyncClient,
+        habito_diario: habitos,
+        auth_headers: dict,
+        contar_queries
+    ):
+        """Test: El toggle es un UPDATE con RETURNING más el ajuste del agregado."""
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        progreso_id = registro["progresos"][0]["id"]
+
+        with contar_queries() as sentencias:
+            response = await test_client.post(f"/api/registros/progreso/toggle/{progreso_id}", headers=auth_headers)
+
+        assert response.status_code == 200
+        escrituras = [s for s in sentencias if not s.startswith("SELECT usuarios")]
+        assert [s.split()[:2] for s in escrituras] == [["UPDATE", "progreso_habitos"], ["UPDATE", "daily_rollups"]]
+
+    @pytest.mark.asyncio
+    async def test_toggle_missing_or_foreign_progress(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: 404 si el progreso no existe y 403 si es de otro usuario."""
+        otro = usuario(nombre="otro", email="otro@example.com", contrasena="x")
+        test_db_session.add(otro)
+        await test_db_session.flush()
+        registro_ajeno = registros(usuario_id=otro.id, fecha="2024-03-04")
+        test_db_session.add(registro_ajeno)
+        await test_db_session.flush()
+        ajeno = progreso_habitos(registro_id=registro_ajeno.id, habito_id=habito_diario.id)
+        test_db_session.add(ajeno)
+        await test_db_session.commit()
+
+        response = await test_client.post(f"/api/registros/progreso/toggle/{ajeno.id}", headers=auth_headers)
+        assert response.status_code == 403
+        response = await test_client.post("/api/registros/progreso/toggle/999999", headers=auth_headers)
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_update_progreso_updates_rollup(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: Actualizar 'completado' debe reflejarse en el agregado."""
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        progreso_id = registro["progresos"][0]["id"]
+
+        response = await test_client.put(
+            f"/api/registros/progreso/{progreso_id}",
+            json={"valor": 15, "completado": True},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).completados == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_habito_recalculates_rollups(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: Eliminar un hábito debe descontarlo de los agregados."""
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        await test_client.post(
+            f"/api/registros/progreso/toggle/{registro['progresos'][0]['id']}",
+            headers=auth_headers
+        )
+
+        response = await test_client.delete(f"/api/habitos/{habito_diario.id}", headers=auth_headers)
+        assert response.status_code == 204
+
+        rollup = await obtener_rollup(test_db_session, test_user.id, "2024-03-04")
+        assert rollup.programados == 0
+        assert rollup.completados == 0
+
+
+    @pytest.mark.asyncio
+    async def test_delete_inactive_habito_recalculates_rollups(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: Un hábito inactivo (sin progresos) también se descuenta de los programados."""
+        inactivo = habitos(
+            nombre="Inactivo", categoria_id=test_categoria.id, usuario_id=test_user.id,
+            unidad_medida="veces", meta_diaria=1.0, dias=TODOS_LOS_DIAS, color="#AAAAAA",
+            activo=0, created_at=datetime(2024, 1, 1)
+        )
+        test_db_session.add(inactivo)
+        await test_db_session.commit()
+        await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).programados == 2
+
+        response = await test_client.delete(f"/api/habitos/{inactivo.id}", headers=auth_headers)
+        assert response.status_code == 204
+
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).programados == 1
+
+
+class TestProgresoLote:
+    """Tests de la actualización de varios progresos en una petición."""
+
+    @pytest_asyncio.fixture
+    async def progresos_del_dia(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        habito_diario: habitos,
+        auth_headers: dict
+    ) -> list[int]:
+        """IDs de los progresos de 2024-03-04 con tres hábitos diarios."""
+        test_db_session.add_all([
+            habitos(
+                nombre=f"Hábito {i}", categoria_id=test_categoria.id, usuario_id=test_user.id,
+                unidad_medida="veces", meta_diaria=1.0, dias=TODOS_LOS_DIAS, color="#000000",
+                activo=1, created_at=datetime(2024, 1, 1)
+            )
+            for i in range(2)
+        ])
+        await test_db_session.commit()
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        return [p["id"] for p in registro["progresos"]]
+
+    @pytest.mark.asyncio
+    async def test_applies_all_changes_and_updates_rollup(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        progresos_del_dia: list[int],
+        auth_headers: dict
+    ):
+        """Test: Los cambios se aplican juntos y el agregado suma los completados."""
+        primero, segundo, tercero = progresos_del_dia
+
+        response = await test_client.put(
+            "/api/registros/progreso/lote",
+            json={"cambios": [
+                {"id": segundo, "completado": True, "valor": 1},
+                {"id": primero, "completado": True, "valor": 15},
+                {"id": tercero, "valor": 0.5},
+            ]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [(p["id"], p["completado"], p["valor"]) for p in data] == [
+            (primero, True, 15.0), (segundo, True, 1.0), (tercero, False, 0.5)
+        ]
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).completados == 2
+
+        response = await test_client.put(
+            "/api/registros/progreso/lote",
+            json={"cambios": [{"id": primero, "completado": False, "valor": 0}]},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert (await obtener_rollup(test_db_session, test_user.id, "2024-03-04")).completados == 1
+
+    @pytest.mark.asyncio
+    async def test_foreign_progress_rejects_whole_batch(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        progresos_del_dia: list[int],
+        auth_headers: dict
+    ):
+        """Test: Si un progreso es de otro usuario no se aplica ningún cambio."""
+        otro = usuario(nombre="otro", email="otro@example.com", contrasena="x")
+        test_db_session.add(otro)
+        await test_db_session.flush()
+        registro_ajeno = registros(usuario_id=otro.id, fecha="2024-03-04")
+        test_db_session.add(registro_ajeno)
+        await test_db_session.flush()
+        ajeno = progreso_habitos(registro_id=registro_ajeno.id, habito_id=progresos_del_dia[0])
+        test_db_session.add(ajeno)
+        await test_db_session.commit()
+        ajeno_id = ajeno.id
+
+        response = await test_client.put(
+            "/api/registros/progreso/lote",
+            json={"cambios": [
+                {"id": progresos_del_dia[0], "completado": True},
+                {"id": ajeno_id, "completado": True},
+            ]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 404
+        assert str(ajeno_id) in response.json()["detail"]
+        completados = await test_db_session.scalar(
+            select(func.count()).select_from(progreso_habitos).where(progreso_habitos.completado.is_(True))
+        )
+        assert completados == 0
+
+    @pytest.mark.asyncio
+    async def test_duplicate_ids_are_rejected(
+        self,
+        test_client: AsyncClient,
+        progresos_del_dia: list[int],
+        auth_headers: dict
+    ):
+        """Test: Un mismo progreso dos veces en el lote es un error."""
+        progreso_id = progresos_del_dia[0]
+        response = await test_client.put(
+            "/api/registros/progreso/lote",
+            json={"cambios": [{"id": progreso_id, "completado": True}, {"id": progreso_id, "valor": 0}]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_statement_count_does_not_grow_with_batch(
+        self,
+        test_client: AsyncClient,
+        progresos_del_dia: list[int],
+        auth_headers: dict,
+        max_queries
+    ):
+        """Test: Propiedad, UPDATE y agregado: las mismas sentencias para 1 o 3 cambios."""
+        with max_queries(4):
+            response = await test_client.put(
+                "/api/registros/progreso/lote",
+                json={"cambios": [{"id": i, "completado": True} for i in progresos_del_dia]},
+                headers=auth_headers
+            )
+
+        assert response.status_code == 200
+
+
+class TestCalendario:
+    """Tests para el calendario mensual."""
+
+    @pytest.mark.asyncio
+    async def test_calendario_reads_rollups(
+        self,
+        test_client: AsyncClient,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: El calendario debe reflejar registros y completados del mes."""
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        await test_client.post(
+            f"/api/registros/progreso/toggle/{registro['progresos'][0]['id']}",
+            headers=auth_headers
+        )
+
+        response = await test_client.get("/api/registros/calendario/2024/3", headers=auth_headers)
+
+        assert response.status_code == 200
+        dias = {d["fecha"]: d for d in response.json()}
+        assert len(dias) == 31
+        assert dias["2024-03-04"] == {
+            "fecha": "2024-03-04",
+            "total_habitos": 1,
+            "habitos_completados": 1,
+            "porcentaje": 100.0,
+            "tiene_registro": True
+        }
+        assert dias["2024-03-05"]["tiene_registro"] is False
+        assert dias["2024-03-05"]["total_habitos"] == 1
+
+    @pytest.mark.asyncio
+    async def test_calendario_invalid_month_fails(
+        self,
+        test_client: AsyncClient,
+        auth_headers: dict
+    ):
+        """Test: Debe rechazar meses fuera de 1-12."""
+        response = await test_client.get("/api/registros/calendario/2024/13", headers=auth_headers)
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_calendario_etag_revalidation(
+        self,
+        test_client: AsyncClient,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: El calendario responde 304 con el mismo ETag y cambia tras un toggle."""
+        url = "/api/registros/calendario/2024/3"
+        response = await test_client.get(url, headers=auth_headers)
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        no_modificado = await test_client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert no_modificado.status_code == 304
+        assert no_modificado.content == b""
+
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        await test_client.post(
+            f"/api/registros/progreso/toggle/{registro['progresos'][0]['id']}",
+            headers=auth_headers
+        )
+
+        modificado = await test_client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert modificado.status_code == 200
+        assert modificado.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_matriz_habitos_mes(
+        self,
+        test_client: AsyncClient,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: La matriz coincide con el endpoint por hábito para cada hábito."""
+        fin_de_semana = habitos(
+            nombre="Correr",
+            categoria_id=test_categoria.id,
+            usuario_id=test_user.id,
+            unidad_medida="km",
+            meta_diaria=5.0,
+            dias='["S", "D"]',
+            color="#0000AA",
+            activo=1,
+            created_at=datetime(2024, 3, 10)
+        )
+        test_db_session.add(fin_de_semana)
+        await test_db_session.commit()
+
+        registro = (await test_client.get("/api/registros/fecha/2024-03-04", headers=auth_headers)).json()
+        await test_client.post(
+            f"/api/registros/progreso/toggle/{registro['progresos'][0]['id']}",
+            headers=auth_headers
+        )
+
+        response = await test_client.get("/api/registros/calendario/2024/3/habitos", headers=auth_headers)
+
+        assert response.status_code == 200
+        matriz = response.json()
+        assert matriz["fecha_inicio"] == "2024-03-01"
+        assert matriz["dias"] == 31
+        filas = {f["habito_id"]: f["estados"] for f in matriz["habitos"]}
+        assert set(filas) == {habito_diario.id, fin_de_semana.id}
+        assert filas[habito_diario.id][3] == "3"  # 2024-03-04: programado y completado
+        assert filas[fin_de_semana.id][:9] == "000000000"  # Creado el domingo 2024-03-10
+        assert filas[fin_de_semana.id][9] == "1"
+
+        for habito_id, estados in filas.items():
+            por_habito = (await test_client.get(
+                f"/api/registros/calendario/2024/3/habito/{habito_id}", headers=auth_headers
+            )).json()
+            esperado = "".join(str(int(d["programado"]) | int(d["completado"]) << 1) for d in por_habito)
+            assert estados == esperado
+
+    @pytest.mark.asyncio
+    async def test_matriz_habitos_mes_filters_ids(
+        self,
+        test_client: AsyncClient,
+        habito_diario: habitos,
+        auth_headers: dict
+    ):
+        """Test: Solo devuelve los hábitos pedidos que pertenecen al usuario."""
+        response = await test_client.get(
+            f"/api/registros/calendario/2024/2/habitos?habito_id={habito_diario.id}&habito_id=9999",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        matriz = response.json()
+        assert matriz["dias"] == 29
+        assert [f["habito_id"] for f in matriz["habitos"]] == [habito_diario.id]
+        assert matriz["habitos"][0]["estados"] == "1" * 29
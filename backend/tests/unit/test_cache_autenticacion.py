@@ -0,0 +1,117 @@
+"""
+Tests unitarios para la caché de autenticación.
+
+Principios Zen aplicados:
+- Reloj controlado: el vencimiento se prueba sin esperar
+"""
+
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect as sa_inspect
+
+from app.models import usuario
+from app.services.cache_autenticacion import CacheAutenticacion
+
+
+class RelojFalso:
+    """Reloj monotónico controlado por el test."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+def crear_usuario(usuario_id: int) -> usuario:
+    return usuario(id=usuario_id, nombre=f"u{usuario_id}", email=f"u{usuario_id}@example.com", contrasena="x")
+
+
+class TestCacheAutenticacion:
+    """Tests de TTL, LRU, invalidación y contadores."""
+
+    def test_hit_returns_detached_copy(self):
+        """Test: Un acierto retorna una copia con los mismos datos."""
+        cache = CacheAutenticacion(ttl_segundos=60, max_entradas=10)
+        original = crear_usuario(1)
+        cache.guardar("token", original)
+
+        snapshot = cache.obtener("token")
+
+        assert snapshot is not original
+        assert (snapshot.id, snapshot.email) == (1, "u1@example.com")
+
+    def test_snapshot_keeps_next_reminder(self):
+        """Test: La copia conserva next_reminder_at_utc sin recalcularlo ni marcar cambios."""
+        cache = CacheAutenticacion(ttl_segundos=60, max_entradas=10)
+        original = crear_usuario(1)
+        original.notificaciones_activas = True
+        original.next_reminder_at_utc = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        cache.guardar("token", original)
+
+        snapshot = cache.obtener("token")
+
+        assert snapshot.next_reminder_at_utc == datetime(2020, 1, 1, tzinfo=timezone.utc)
+        assert not sa_inspect(snapshot).modified
+        assert cache.estadisticas()["hits"] == 1
+
+    def test_entries_expire_after_ttl(self):
+        """Test: Una entrada vencida cuenta como fallo y se descarta."""
+        reloj = RelojFalso()
+        cache = CacheAutenticacion(ttl_segundos=60, max_entradas=10, reloj=reloj)
+        cache.guardar("token", crear_usuario(1))
+
+        reloj.ahora += 59
+        assert cache.obtener("token") is not None
+        reloj.ahora += 2
+        assert cache.obtener("token") is None
+        assert cache.estadisticas()["entries"] == 0
+
+    def test_entry_never_outlives_token(self):
+        """Test: No se cachea más allá del exp del token."""
+        reloj = RelojFalso()
+        cache = CacheAutenticacion(ttl_segundos=60, max_entradas=10, reloj=reloj)
+
+        cache.guardar("vencido", crear_usuario(1), expira_token=time.time() - 1)
+        cache.guardar("casi", crear_usuario(1), expira_token=time.time() + 5)
+
+        assert cache.obtener("vencido") is None
+        reloj.ahora += 10
+        assert cache.obtener("casi") is None
+
+    def test_lru_eviction(self):
+        """Test: Al superar el máximo se descarta la entrada usada hace más tiempo."""
+        cache = CacheAutenticacion(ttl_segundos=60, max_entradas=2)
+        cache.guardar("a", crear_usuario(1))
+        cache.guardar("b", crear_usuario(2))
+        cache.obtener("a")  # "b" pasa a ser la menos reciente
+        cache.guardar("c", crear_usuario(3))
+
+        assert cache.obtener("b") is None
+        assert cache.obtener("a") is not None
+        assert cache.obtener("c") is not None
+        assert cache.estadisticas()["evictions"] == 1
+
+    def test_invalidate_user_drops_all_tokens(self):
+        """Test: Invalidar un usuario descarta todos sus tokens y solo los suyos."""
+        cache = CacheAutenticacion(ttl_segundos=60, max_entradas=10)
+        cache.guardar("movil", crear_usuario(1))
+        cache.guardar("web", crear_usuario(1))
+        cache.guardar("otro", crear_usuario(2))
+
+        cache.invalidar_usuario(1)
+
+        assert cache.obtener("movil") is None
+        assert cache.obtener("web") is None
+        assert cache.obtener("otro") is not None
+
+    def test_disabled_cache_stores_nothing(self):
+        """Test: Con TTL 0 la caché no guarda entradas."""
+        cache = CacheAutenticacion(ttl_segundos=0, max_entradas=10)
+        cache.guardar("token", crear_usuario(1))
+
+        assert cache.obtener("token") is None
+        assert cache.estadisticas() == {
+            "hits": 0, "misses": 1, "evictions": 0, "entries": 0, "hit_ratio": 0.0
+        }
@@ -0,0 +1,177 @@
+"""
+Tests unitarios para la configuración de conexiones SQLite.
+
+Principios Zen aplicados:
+- Se verifica el valor efectivo de cada PRAGMA en una base en archivo
+- Las sesiones de solo lectura y la réplica se prueban contra un escritor real
+"""
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import Settings
+from app import database
+from app.database import (
+    Base,
+    SesionSoloLectura,
+    abrir_sesion_replica,
+    configurar_sqlite,
+    crear_engine_replica,
+    opciones_solo_lectura,
+    pragmas_sqlite,
+)
+from app.models import categorias
+
+
+class TestConfigurarSqlite:
+    """Tests del hook de conexión con los PRAGMA de SQLite."""
+
+    @pytest.mark.asyncio
+    async def test_connection_gets_configured_pragmas(self, tmp_path):
+        """Test: Cada conexión nueva sale con WAL, NORMAL, foreign_keys, etc."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}")
+        configurar_sqlite(engine, Settings(sqlite_busy_timeout_ms=1234, sqlite_cache_size=-4096))
+
+        async with engine.connect() as conn:
+            valores = {
+                pragma: (await conn.exec_driver_sql(f"PRAGMA {pragma}")).scalar()
+                for pragma in (
+                    "journal_mode", "synchronous", "busy_timeout",
+                    "cache_size", "temp_store", "foreign_keys"
+                )
+            }
+        await engine.dispose()
+
+        assert valores == {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "busy_timeout": 1234,
+            "cache_size": -4096,
+            "temp_store": 2,  # MEMORY
+            "foreign_keys": 1,
+        }
+
+    def test_pragmas_can_be_disabled(self):
+        """Test: Los ajustes opcionales no generan su PRAGMA al desactivarse."""
+        pragmas = pragmas_sqlite(Settings(
+            sqlite_wal=False,
+            sqlite_temp_store_memory=False,
+            sqlite_foreign_keys=False
+        ))
+
+        assert not any("journal_mode" in p or "temp_store" in p for p in pragmas)
+        assert "PRAGMA foreign_keys = OFF" in pragmas
+
+    def test_invalid_synchronous_fails(self):
+        """Test: Un valor de synchronous inválido se rechaza."""
+        with pytest.raises(ValueError):
+            pragmas_sqlite(Settings(sqlite_synchronous="RAPIDO"))
+
+
+class TestSesionSoloLectura:
+    """Tests de la sesión usada por las rutas de lectura."""
+
+    @pytest.mark.asyncio
+    async def test_reader_does_not_hold_a_transaction(self, tmp_path):
+        """Test: Una lectura en curso no bloquea al escritor (sin BEGIN en SQLite)."""
+        # Sin WAL: una transacción de lectura abierta impediría el commit del escritor
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'lectura.db'}",
+            connect_args={"timeout": 0.1}
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sesion_lectura = async_sessionmaker(
+            engine.execution_options(**opciones_solo_lectura(engine)),
+            class_=AsyncSession,
+            sync_session_class=SesionSoloLectura
+        )
+        try:
+            async with sesion_lectura() as lectura:
+                assert (await lectura.execute(select(categorias))).all() == []
+                conexion = await lectura.connection()
+                driver = (await conexion.get_raw_connection()).driver_connection
+                assert not driver.in_transaction
+
+                async with engine.begin() as escritor:
+                    await escritor.execute(text("INSERT INTO categorias (nombre) VALUES ('Salud')"))
+
+                nombres = (await lectura.execute(select(categorias.nombre))).scalars().all()
+                assert nombres == ["Salud"]
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_orm_writes_are_rejected(self, test_engine):
+        """Test: Agregar un objeto y hacer flush en la sesión de lectura falla."""
+        sesion_lectura = async_sessionmaker(test_engine, class_=AsyncSession, sync_session_class=SesionSoloLectura)
+
+        async with sesion_lectura() as lectura:
+            lectura.add(categorias(nombre="Salud"))
+            with pytest.raises(RuntimeError, match="solo lectura"):
+                await lectura.flush()
+
+    def test_options_per_dialect(self):
+        """Test: READ ONLY en PostgreSQL; SQLite ya difiere el BEGIN hasta la primera escritura."""
+        assert opciones_solo_lectura(create_async_engine("sqlite+aiosqlite://")) == {}
+        assert opciones_solo_lectura(create_async_engine("postgresql+asyncpg://u:p@localhost/db")) == {
+            "postgresql_readonly": True
+        }
+
+
+class TestReplica:
+    """Tests del motor de lectura para análisis y calendario."""
+
+    def test_not_configured_by_default(self):
+        """Test: Sin database_url_read no se crea un segundo motor."""
+        assert crear_engine_replica(Settings(database_url_read="")) is None
+
+    @pytest.mark.asyncio
+    async def test_sqlite_reader_sees_commits_and_cannot_write(self, tmp_path):
+        """Test: El lector en modo ro sobre el mismo archivo WAL ve los commits y no escribe."""
+        ruta = tmp_path / "replica.db"
+        escritor = create_async_engine(f"sqlite+aiosqlite:///{ruta}")
+        configurar_sqlite(escritor, Settings())
+        replica = crear_engine_replica(
+            Settings(database_url_read=f"sqlite+aiosqlite:///file:{ruta}?mode=ro&uri=true")
+        )
+        try:
+            async with escritor.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with replica.connect() as lector:
+                async with escritor.begin() as conn:
+                    await conn.execute(text("INSERT INTO categorias (nombre) VALUES ('Salud')"))
+                nombres = (await lector.execute(select(categorias.nombre))).scalars().all()
+                assert nombres == ["Salud"]
+                with pytest.raises(OperationalError):
+                    await lector.execute(text("INSERT INTO categorias (nombre) VALUES ('Ocio')"))
+        finally:
+            await replica.dispose()
+            await escritor.dispose()
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_falls_back_to_primary(self, tmp_path, test_engine, monkeypatch):
+        """Test: Con el pool de lectura agotado, la sesión se abre en el principal."""
+        monkeypatch.setattr(database, "respaldos_replica", 0)
+        replica = crear_engine_replica(Settings(
+            database_url_read=f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}",
+            database_read_pool_size=1,
+            database_read_pool_timeout_seconds=0.05
+        ))
+        fabrica_replica = async_sessionmaker(replica, class_=AsyncSession)
+        fabrica_principal = async_sessionmaker(test_engine, class_=AsyncSession)
+        try:
+            async with replica.connect():
+                session = await abrir_sesion_replica(fabrica_replica, fabrica_principal)
+                async with session:
+                    assert session.get_bind().url == test_engine.url
+            assert database.respaldos_replica == 1
+
+            session = await abrir_sesion_replica(fabrica_replica, fabrica_principal)
+            async with session:
+                assert session.get_bind().url == replica.url
+            assert database.respaldos_replica == 1
+        finally:
+            await replica.dispose()
@@ -0,0 +1,94 @@
+"""
+Tests unitarios para la eliminación de datos de usuario por lotes.
+
+Principios Zen aplicados:
+- Se cuentan las sentencias DELETE para comprobar que el borrado va por lotes
+- El resultado se verifica en la base de datos, no en la sesión
+"""
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import categorias, daily_rollups, habitos, progreso_habitos, registros, usuario
+from app.security import cache_autenticacion
+from app.services.eliminacion import eliminar_en_lotes
+
+REGISTROS = 7
+
+
+async def crear_historial(db: AsyncSession, usuario_id: int, categoria_id: int) -> None:
+    """Un hábito con REGISTROS días de registro, progreso y agregado."""
+    habito = habitos(
+        nombre="Leer", categoria_id=categoria_id, usuario_id=usuario_id,
+        unidad_medida="páginas", meta_diaria=10, dias='["L"]', color="#000000"
+    )
+    db.add(habito)
+    for dia in range(1, REGISTROS + 1):
+        registro = registros(usuario_id=usuario_id, fecha=f"2024-05-{dia:02d}")
+        db.add(registro)
+        await db.flush()
+        db.add(progreso_habitos(registro_id=registro.id, habito_id=habito.id))
+        db.add(daily_rollups(usuario_id=usuario_id, fecha=registro.fecha, programados=1, completados=0))
+    await db.commit()
+
+
+async def contar(db: AsyncSession, modelo) -> int:
+    return await db.scalar(select(func.count()).select_from(modelo))
+
+
+class TestEliminarEnLotes:
+    """Tests del borrado por lotes en segundo plano."""
+
+    @pytest.mark.asyncio
+    async def test_data_is_deleted_in_batches(
+        self,
+        test_engine,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias,
+        contar_queries
+    ):
+        """Test: Los registros se borran en lotes del tamaño pedido y la cuenta se conserva."""
+        await crear_historial(test_db_session, test_user.id, test_categoria.id)
+
+        with contar_queries() as sentencias:
+            eliminados = await eliminar_en_lotes(
+                test_user.id,
+                tamano_lote=3,
+                fabrica_sesiones=async_sessionmaker(test_engine, expire_on_commit=False)
+            )
+
+        assert eliminados == REGISTROS
+        # 3 + 3 + 1 y un lote vacío que confirma el final
+        assert sum(s.startswith("DELETE FROM registros") for s in sentencias) == 4
+        assert await contar(test_db_session, registros) == 0
+        assert not cache_autenticacion.bloqueado(test_user.id)
+        assert await contar(test_db_session, progreso_habitos) == 0
+        assert await contar(test_db_session, daily_rollups) == 0
+        assert await contar(test_db_session, habitos) == 1
+        assert await contar(test_db_session, usuario) == 1
+
+    @pytest.mark.asyncio
+    async def test_account_is_deleted_last(
+        self,
+        test_engine,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        test_categoria: categorias
+    ):
+        """Test: Con incluir_cuenta, el usuario y sus hábitos se borran al final y se levanta el bloqueo."""
+        await crear_historial(test_db_session, test_user.id, test_categoria.id)
+        cache_autenticacion.bloquear_usuario(test_user.id)
+
+        await eliminar_en_lotes(
+            test_user.id,
+            incluir_cuenta=True,
+            tamano_lote=5,
+            fabrica_sesiones=async_sessionmaker(test_engine, expire_on_commit=False)
+        )
+
+        assert await contar(test_db_session, usuario) == 0
+        assert await contar(test_db_session, habitos) == 0
+        assert await contar(test_db_session, registros) == 0
+        assert not cache_autenticacion.bloqueado(test_user.id)
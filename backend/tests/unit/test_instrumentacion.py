@@ -0,0 +1,89 @@
+"""
+Tests unitarios para la instrumentación de consultas por petición.
+
+Principios Zen aplicados:
+- Una app Starlette mínima sobre el engine de test aísla el middleware
+- El N+1 se provoca a propósito con un bucle de consultas
+"""
+
+import logging
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.instrumentacion import MiddlewareConsultas, forma_sentencia, medir_consultas
+
+
+def crear_app(test_engine, consultas_por_peticion: int) -> Starlette:
+    """App con una ruta que ejecuta la misma consulta varias veces."""
+    async def ruta(request):
+        async with test_engine.connect() as conn:
+            for i in range(consultas_por_peticion):
+                await conn.execute(text("SELECT :i"), {"i": i})
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/ruta", ruta)])
+    app.add_middleware(MiddlewareConsultas, umbral_n_mas_uno=5)
+    return app
+
+
+async def pedir(app: Starlette):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/ruta")
+
+
+class TestFormaSentencia:
+    """Tests de la normalización de sentencias."""
+
+    def test_in_lists_of_any_length_share_a_shape(self):
+        """Test: Las listas IN de distinto largo y los espacios no cambian la forma."""
+        corta = "SELECT * FROM habitos WHERE id IN (?, ?)"
+        larga = "SELECT *\n  FROM habitos\n WHERE id IN (?, ?, ?, ?)"
+
+        assert forma_sentencia(corta) == forma_sentencia(larga) == "SELECT * FROM habitos WHERE id IN (?)"
+
+    def test_postgres_parameters_are_normalized(self):
+        """Test: También se reconocen los parámetros del driver de PostgreSQL."""
+        assert forma_sentencia("SELECT 1 WHERE id IN ($1::INTEGER, $2::INTEGER)") == "SELECT 1 WHERE id IN (?)"
+        assert forma_sentencia("UPDATE t SET a = %(a)s WHERE id IN (%(id_1)s, %(id_2)s)") == (
+            "UPDATE t SET a = %(a)s WHERE id IN (?)"
+        )
+
+
+class TestMiddlewareConsultas:
+    """Tests de la cabecera Server-Timing y la detección de N+1."""
+
+    @pytest.mark.asyncio
+    async def test_reports_count_and_time(self, test_engine):
+        """Test: La respuesta informa cuántas consultas hizo y cuánto tardaron."""
+        response = await pedir(crear_app(test_engine, 3))
+
+        server_timing = response.headers["server-timing"]
+        assert server_timing.startswith('db;dur=')
+        assert 'desc="3 consultas"' in server_timing
+        assert "app;dur=" in server_timing
+        assert "n1" not in server_timing
+
+    @pytest.mark.asyncio
+    async def test_flags_repeated_statements(self, test_engine, caplog):
+        """Test: La misma sentencia por encima del umbral se marca como N+1."""
+        with caplog.at_level(logging.WARNING, logger="app.instrumentacion"):
+            response = await pedir(crear_app(test_engine, 6))
+
+        assert 'n1;desc="sentencia repetida 6 veces"' in response.headers["server-timing"]
+        assert "6 ejecuciones de: SELECT ?" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_only_counts_queries_inside_the_request(self, test_engine):
+        """Test: Las consultas fuera de una petición (tareas de fondo) no se atribuyen a nadie."""
+        async with test_engine.connect() as conn:
+            with medir_consultas() as dentro:
+                await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+
+        assert dentro.total == 1
+        assert list(dentro.por_forma) == ["SELECT 1"]
@@ -0,0 +1,102 @@
+"""
+Tests unitarios para el registro de métricas en formato Prometheus.
+
+Principios Zen aplicados:
+- Se verifica el texto expuesto, que es lo que lee Prometheus
+- Cada test usa su propio registro; el global no se toca
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.metricas import RegistroMetricas, espera_pool, instrumentar_pool, razon_aciertos
+
+
+class TestRegistroMetricas:
+    """Tests de los tipos de métrica y su exposición."""
+
+    def test_counter_and_gauge_with_labels(self):
+        """Test: Contadores y medidores exponen una serie por combinación de etiquetas."""
+        registro = RegistroMetricas()
+        peticiones = registro.contador("peticiones_total", "Peticiones", ("route", "status"))
+        en_curso = registro.medidor("en_curso", "En curso")
+
+        peticiones.inc(route="/api/habitos/{habito_id}", status=200)
+        peticiones.inc(route="/api/habitos/{habito_id}", status=200)
+        peticiones.inc(route='/con "comillas"', status=404)
+        en_curso.inc()
+        en_curso.inc()
+        en_curso.dec()
+
+        texto = registro.exponer()
+        assert "# TYPE peticiones_total counter" in texto
+        assert 'peticiones_total{route="/api/habitos/{habito_id}",status="200"} 2' in texto
+        assert 'peticiones_total{route="/con \\"comillas\\"",status="404"} 1' in texto
+        assert "# TYPE en_curso gauge\nen_curso 1\n" in texto
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test: Los buckets del histograma son acumulados e incluyen +Inf, suma y cantidad."""
+        registro = RegistroMetricas()
+        latencia = registro.histograma("latencia_seconds", "Latencia", ("route",), buckets=(0.1, 1.0))
+
+        for valor in (0.05, 0.1, 0.5, 3.0):
+            latencia.observe(valor, route="/r")
+
+        lineas = registro.exponer().splitlines()
+        assert 'latencia_seconds_bucket{route="/r",le="0.1"} 2' in lineas
+        assert 'latencia_seconds_bucket{route="/r",le="1"} 3' in lineas
+        assert 'latencia_seconds_bucket{route="/r",le="+Inf"} 4' in lineas
+        assert 'latencia_seconds_sum{route="/r"} 3.65' in lineas
+        assert 'latencia_seconds_count{route="/r"} 4' in lineas
+
+    def test_collectors_of_the_same_metric_are_merged(self):
+        """Test: Dos recolectores de la misma métrica la declaran una sola vez."""
+        registro = RegistroMetricas()
+        for pool in ("primary", "read"):
+            registro.agregar_recolector(
+                lambda pool=pool: [("db_pool_size", "gauge", "Tamaño", [({"pool": pool}, 5)])]
+            )
+
+        texto = registro.exponer()
+        assert texto.count("# TYPE db_pool_size gauge") == 1
+        assert 'db_pool_size{pool="primary"} 5' in texto
+        assert 'db_pool_size{pool="read"} 5' in texto
+
+    def test_hit_ratio(self):
+        """Test: La proporción de aciertos es 0 sin consultas."""
+        assert razon_aciertos(0, 0) == 0.0
+        assert razon_aciertos(3, 1) == 0.75
+
+
+class TestInstrumentarPool:
+    """Tests de la espera de checkout del pool."""
+
+    @pytest.mark.asyncio
+    async def test_measures_checkout_wait(self, tmp_path):
+        """Test: Con el pool agotado, la espera de quien hace cola queda registrada."""
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0
+        )
+        instrumentar_pool(engine, "prueba")
+        antes = espera_pool.cantidad()
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                esperando = asyncio.create_task(engine.connect().__aenter__())
+                await asyncio.sleep(0.05)
+                assert not esperando.done()
+            conn2 = await esperando
+            await conn2.close()
+
+            assert espera_pool.cantidad() == antes + 2
+            serie = espera_pool._series[()]
+            # La segunda obtención esperó al menos lo que tardó en liberarse la primera
+            assert serie["suma"] >= 0.05
+            # Sobrevive a dispose(), que recrea el pool con la misma clase
+            await engine.dispose()
+            assert type(engine.sync_engine.pool).__name__.endswith("ConEspera")
+        finally:
+            await engine.dispose()
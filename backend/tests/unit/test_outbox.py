@@ -0,0 +1,244 @@
+"""
+Tests unitarios para el outbox de notificaciones.
+
+Principios Zen aplicados:
+- Sin red: las entregas van al servicio push local de benchmarks/servidor_push.py
+- El tiempo se pasa explícito (`ahora`) para probar esperas y bloqueos
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import notification_outbox, push_subscriptions, usuario
+from app.services import outbox
+from app.services.outbox import (
+    DESCARTADA,
+    ENVIADA,
+    ENVIANDO,
+    FALLIDA,
+    PENDIENTE,
+    TrabajadorOutbox,
+    clave_recordatorio,
+    encolar_notificaciones,
+    espera_reintento,
+    procesar_lote,
+)
+from app.services.push_service import PushService
+from benchmarks.servidor_push import generar_clave_vapid, generar_suscripcion, servidor_push_local
+
+AHORA = datetime(2024, 5, 1, 12, 0)
+
+
+@pytest_asyncio.fixture
+async def servidor_push():
+    """Servicio push local en un puerto libre."""
+    async with servidor_push_local() as servidor:
+        yield servidor
+
+
+@pytest_asyncio.fixture
+async def servicio():
+    """PushService con una clave VAPID propia."""
+    servicio = PushService(vapid_private_key=generar_clave_vapid())
+    yield servicio
+    await servicio.cerrar()
+
+
+async def suscribir(db: AsyncSession, usuario_id: int, endpoint: str) -> None:
+    """Guarda una suscripción activa con claves válidas."""
+    info = generar_suscripcion(endpoint)
+    db.add(push_subscriptions(
+        usuario_id=usuario_id,
+        endpoint=endpoint,
+        p256dh_key=info["keys"]["p256dh"],
+        auth_key=info["keys"]["auth"],
+        activa=True
+    ))
+    await db.commit()
+
+
+async def encolar(db: AsyncSession, usuario_id: int, dia: date = date(2024, 5, 1)) -> int:
+    """Encola el recordatorio de un día y hace commit."""
+    encoladas = await encolar_notificaciones(db, [{
+        "usuario_id": usuario_id,
+        "clave_idempotencia": clave_recordatorio(usuario_id, dia),
+        "titulo": "Recordatorio",
+        "cuerpo": "Registra tus hábitos",
+        "url": "/habitos"
+    }], AHORA)
+    await db.commit()
+    return encoladas
+
+
+async def leer_outbox(db: AsyncSession) -> list[notification_outbox]:
+    """Lee las filas del outbox sin usar objetos en caché."""
+    db.expire_all()
+    result = await db.execute(select(notification_outbox).order_by(notification_outbox.id))
+    return result.scalars().all()
+
+
+class TestEncolar:
+    """Tests de la deduplicación al encolar."""
+
+    @pytest.mark.asyncio
+    async def test_same_key_is_enqueued_once(self, test_db_session: AsyncSession, test_user: usuario):
+        """Test: La misma clave (usuario, día, recordatorio) solo se encola una vez."""
+        usuario_id = test_user.id
+        assert await encolar(test_db_session, usuario_id) == 1
+        assert await encolar(test_db_session, usuario_id) == 0
+        assert await encolar(test_db_session, usuario_id, date(2024, 5, 2)) == 1
+
+        filas = await leer_outbox(test_db_session)
+        assert [f.clave_idempotencia for f in filas] == [
+            f"recordatorio:{usuario_id}:2024-05-01",
+            f"recordatorio:{usuario_id}:2024-05-02",
+        ]
+        assert all(f.estado == PENDIENTE and f.intentos == 0 for f in filas)
+
+
+class TestProcesarLote:
+    """Tests de la entrega de un lote y el registro de resultados."""
+
+    @pytest.mark.asyncio
+    async def test_delivered_notification_is_marked_sent(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servidor_push,
+        servicio
+    ):
+        """Test: Una entrega correcta marca la notificación como enviada."""
+        await suscribir(test_db_session, test_user.id, f"{servidor_push.url_base}/push/1")
+        await encolar(test_db_session, test_user.id)
+
+        resumen = await procesar_lote(test_db_session, servicio, AHORA)
+
+        assert resumen == {"tomadas": 1, "enviadas": 1, "reintentos": 0, "fallidas": 0, "descartadas": 0}
+        assert servidor_push.peticiones == 1
+        (fila,) = await leer_outbox(test_db_session)
+        assert (fila.estado, fila.intentos) == (ENVIADA, 1)
+        assert fila.enviada_at is not None
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_retries_with_exponential_backoff(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servidor_push,
+        servicio,
+        monkeypatch
+    ):
+        """Test: Un error transitorio reprograma con espera base, 2·base... hasta agotar intentos."""
+        monkeypatch.setattr(outbox.settings, "outbox_max_attempts", 3)
+        await suscribir(test_db_session, test_user.id, f"{servidor_push.url_base}/error/1")
+        await encolar(test_db_session, test_user.id)
+
+        base = outbox.settings.outbox_retry_base_seconds
+        ahora = AHORA
+        for intento in (1, 2):
+            antes = outbox.ahora_utc()
+            resumen = await procesar_lote(test_db_session, servicio, ahora)
+            assert resumen["reintentos"] == 1
+            (fila,) = await leer_outbox(test_db_session)
+            assert fila.estado == PENDIENTE
+            # La espera se cuenta desde el final de la entrega
+            espera = fila.disponible_en - antes
+            assert espera_reintento(intento, base) <= espera < espera_reintento(intento, base) + timedelta(seconds=5)
+            # Antes de que venza la espera no se vuelve a tomar
+            assert (await procesar_lote(test_db_session, servicio, ahora))["tomadas"] == 0
+            ahora = fila.disponible_en
+
+        resumen = await procesar_lote(test_db_session, servicio, ahora)
+
+        assert resumen["fallidas"] == 1
+        (fila,) = await leer_outbox(test_db_session)
+        assert (fila.estado, fila.intentos) == (FALLIDA, 3)
+        assert espera_reintento(2, base) == 2 * espera_reintento(1, base)
+
+    @pytest.mark.asyncio
+    async def test_user_without_subscriptions_is_discarded(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servicio
+    ):
+        """Test: Sin suscripciones activas no se reintenta."""
+        await encolar(test_db_session, test_user.id)
+
+        resumen = await procesar_lote(test_db_session, servicio, AHORA)
+
+        assert resumen["descartadas"] == 1
+        (fila,) = await leer_outbox(test_db_session)
+        assert fila.estado == DESCARTADA
+
+    @pytest.mark.asyncio
+    async def test_abandoned_claim_is_retaken_after_lease(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servidor_push,
+        servicio
+    ):
+        """Test: Una notificación tomada por un worker que murió se reintenta al vencer el bloqueo."""
+        await suscribir(test_db_session, test_user.id, f"{servidor_push.url_base}/push/1")
+        await encolar(test_db_session, test_user.id)
+        (fila,) = await leer_outbox(test_db_session)
+        fila.estado = ENVIANDO
+        fila.disponible_en = AHORA + timedelta(minutes=5)
+        await test_db_session.commit()
+
+        assert (await procesar_lote(test_db_session, servicio, AHORA))["tomadas"] == 0
+        resumen = await procesar_lote(test_db_session, servicio, AHORA + timedelta(minutes=5))
+
+        assert resumen["enviadas"] == 1
+
+
+class TestTrabajadorOutbox:
+    """Tests del worker en segundo plano."""
+
+    @pytest.mark.asyncio
+    async def test_worker_drains_when_woken(
+        self,
+        test_engine,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servidor_push,
+        servicio
+    ):
+        """Test: Al despertarlo, el worker entrega lo encolado sin esperar el sondeo."""
+        await suscribir(test_db_session, test_user.id, f"{servidor_push.url_base}/push/1")
+        trabajador = TrabajadorOutbox(
+            async_sessionmaker(test_engine, expire_on_commit=False),
+            servicio,
+            intervalo_segundos=60
+        )
+        tarea = asyncio.create_task(trabajador.ejecutar())
+        try:
+            await asyncio.sleep(0.05)
+            await encolar_notificaciones(test_db_session, [{
+                "usuario_id": test_user.id,
+                "clave_idempotencia": "prueba",
+                "titulo": "Recordatorio",
+                "cuerpo": "Registra tus hábitos",
+                "url": None
+            }])
+            await test_db_session.commit()
+            trabajador.despertar()
+
+            for _ in range(100):
+                if servidor_push.peticiones:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            tarea.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarea
+
+        assert servidor_push.peticiones == 1
+        (fila,) = await leer_outbox(test_db_session)
+        assert fila.estado == ENVIADA
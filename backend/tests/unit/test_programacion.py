@@ -0,0 +1,82 @@
+"""
+Tests unitarios para el cálculo de fechas programadas.
+
+Principios Zen aplicados:
+- Las implementaciones se comparan contra el recorrido ingenuo día a día
+- Casos aleatorios con semilla fija para que cualquier fallo sea reproducible
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.programacion import IndiceSemanal, iterar_fechas_programadas
+from app.utils import dia_en_mascara
+
+SEMILLA = 20240101
+CASOS = 500
+
+
+def fechas_ingenuas(dias_mask, inicio, fin, creado=None):
+    """Referencia: recorre el rango día a día."""
+    resultado = []
+    fecha = inicio
+    while fecha <= fin:
+        if dia_en_mascara(dias_mask, fecha) and (creado is None or fecha >= creado):
+            resultado.append(fecha)
+        fecha += timedelta(days=1)
+    return resultado
+
+
+def fecha_aleatoria(rng, base=date(2020, 1, 1), dias=1500):
+    return base + timedelta(days=rng.randrange(dias))
+
+
+def casos_aleatorios():
+    """Genera (máscara, inicio, fin, creado) con rangos vacíos, cortos y largos."""
+    rng = random.Random(SEMILLA)
+    for _ in range(CASOS):
+        dias_mask = rng.randrange(128)
+        inicio = fecha_aleatoria(rng)
+        fin = inicio + timedelta(days=rng.choice([rng.randrange(-3, 10), rng.randrange(800)]))
+        creado = rng.choice([None, fecha_aleatoria(rng)])
+        yield dias_mask, inicio, fin, creado
+
+
+class TestIterarFechasProgramadas:
+    """Tests del generador perezoso de fechas."""
+
+    def test_matches_naive_loop(self):
+        """Test: Genera exactamente las fechas del recorrido día a día."""
+        for dias_mask, inicio, fin, creado in casos_aleatorios():
+            assert list(iterar_fechas_programadas(dias_mask, inicio, fin, creado)) == (
+                fechas_ingenuas(dias_mask, inicio, fin, creado)
+            )
+
+    def test_is_lazy(self):
+        """Test: Se puede consumir parcialmente un rango muy largo."""
+        fechas = iterar_fechas_programadas(0b0000001, date(2024, 1, 1), date(9999, 12, 31))
+        assert next(fechas) == date(2024, 1, 1)
+        assert next(fechas) == date(2024, 1, 8)
+
+
+class TestIndiceSemanal:
+    """Tests del índice de fechas por día de la semana."""
+
+    @pytest.mark.parametrize("semilla", range(5))
+    def test_matches_naive_filter(self, semilla):
+        """Test: contar() y primera() coinciden con filtrar la lista completa."""
+        rng = random.Random(SEMILLA + semilla)
+        fechas = list({fecha_aleatoria(rng, dias=400) for _ in range(rng.randrange(200))})
+        indice = IndiceSemanal(fechas)
+
+        for _ in range(100):
+            dias_mask = rng.randrange(128)
+            desde = rng.choice([None, fecha_aleatoria(rng, dias=400)])
+            aplicables = sorted(
+                f for f in fechas
+                if dia_en_mascara(dias_mask, f) and (desde is None or f >= desde)
+            )
+            assert indice.contar(dias_mask, desde) == len(aplicables)
+            assert indice.primera(dias_mask, desde) == (aplicables[0] if aplicables else None)
@@ -0,0 +1,177 @@
+"""
+Tests unitarios para la entrega de notificaciones push.
+
+Principios Zen aplicados:
+- Sin red: se usa el servicio push local de benchmarks/servidor_push.py
+- Claves reales: el cifrado se ejecuta igual que en producción
+"""
+
+import pytest
+import pytest_asyncio
+from py_vapid import Vapid
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import push_subscriptions, usuario
+from app.services.push_service import ENVIADA, FALLIDA, INVALIDA, PushService
+from benchmarks.servidor_push import generar_clave_vapid, generar_suscripcion, servidor_push_local
+
+
+@pytest_asyncio.fixture
+async def servidor_push():
+    """Servicio push local en un puerto libre."""
+    async with servidor_push_local() as servidor:
+        yield servidor
+
+
+@pytest_asyncio.fixture
+async def servicio():
+    """PushService con una clave VAPID propia y pocas conexiones por origen."""
+    servicio = PushService(
+        vapid_private_key=generar_clave_vapid(),
+        vapid_claims_email="mailto:test@example.com",
+        max_conexiones_por_origen=2
+    )
+    yield servicio
+    await servicio.cerrar()
+
+
+async def crear_suscripcion(db: AsyncSession, usuario_id: int, endpoint: str) -> push_subscriptions:
+    """Guarda una suscripción con claves válidas para el endpoint dado."""
+    info = generar_suscripcion(endpoint)
+    subscription = push_subscriptions(
+        usuario_id=usuario_id,
+        endpoint=endpoint,
+        p256dh_key=info["keys"]["p256dh"],
+        auth_key=info["keys"]["auth"],
+        activa=True
+    )
+    db.add(subscription)
+    await db.commit()
+    return subscription
+
+
+class TestSendNotification:
+    """Tests del envío a una suscripción."""
+
+    @pytest.mark.asyncio
+    async def test_classifies_push_service_responses(self, servidor_push, servicio):
+        """Test: 201 es enviada, 410 inválida y 500 un fallo transitorio."""
+        resultados = [
+            await servicio.send_notification(
+                generar_suscripcion(f"{servidor_push.url_base}/{ruta}/1"), "Título", "Cuerpo"
+            )
+            for ruta in ("push", "gone", "error")
+        ]
+
+        assert resultados == [ENVIADA, INVALIDA, FALLIDA]
+
+    @pytest.mark.asyncio
+    async def test_malformed_keys_are_invalid(self, servidor_push, servicio):
+        """Test: Una suscripción con claves que no se pueden usar es inválida."""
+        info = {
+            "endpoint": f"{servidor_push.url_base}/push/1",
+            "keys": {"p256dh": "no-es-una-clave", "auth": "x"}
+        }
+
+        assert await servicio.send_notification(info, "Título", "Cuerpo") == INVALIDA
+        assert servidor_push.peticiones == 0
+
+    @pytest.mark.asyncio
+    async def test_reuses_connections_per_origin(self, servidor_push, servicio):
+        """Test: Los envíos reutilizan el pool keep-alive en lugar de abrir una conexión por envío."""
+        info = generar_suscripcion(f"{servidor_push.url_base}/push/1")
+
+        for _ in range(10):
+            assert await servicio.send_notification(info, "Título", "Cuerpo") == ENVIADA
+
+        assert servidor_push.peticiones == 10
+        assert len(servidor_push.conexiones) <= 2
+
+    @pytest.mark.asyncio
+    async def test_vapid_audience_is_the_endpoint_origin(self, servidor_push, servicio):
+        """Test: Las cabeceras VAPID se firman una vez por origen y se reutilizan."""
+        info = generar_suscripcion(f"{servidor_push.url_base}/push/1")
+
+        await servicio.send_notification(info, "Título", "Cuerpo")
+        await servicio.send_notification(info, "Título", "Cuerpo")
+
+        assert list(servicio._cabeceras_vapid) == [servidor_push.url_base]
+        primera, segunda = servidor_push.cabeceras
+        assert primera["Authorization"].startswith("vapid ")
+        assert primera["Authorization"] == segunda["Authorization"]
+        assert primera["Content-Encoding"] == "aes128gcm"
+
+    @pytest.mark.asyncio
+    async def test_without_vapid_key_fails(self, servidor_push):
+        """Test: Sin clave VAPID configurada no se envía nada."""
+        servicio = PushService(vapid_private_key="")
+        info = generar_suscripcion(f"{servidor_push.url_base}/push/1")
+
+        assert await servicio.send_notification(info, "Título", "Cuerpo") == FALLIDA
+        assert servidor_push.peticiones == 0
+
+
+    @pytest.mark.asyncio
+    async def test_vapid_key_from_file(self, servidor_push, tmp_path):
+        """Test: La clave VAPID también puede ser la ruta de un archivo PEM, como en pywebpush."""
+        archivo = tmp_path / "vapid_private.pem"
+        vapid = Vapid()
+        vapid.generate_keys()
+        vapid.save_key(str(archivo))
+        servicio = PushService(vapid_private_key=str(archivo), vapid_claims_email="mailto:test@example.com")
+        info = generar_suscripcion(f"{servidor_push.url_base}/push/1")
+
+        try:
+            assert await servicio.send_notification(info, "Título", "Cuerpo") == ENVIADA
+        finally:
+            await servicio.cerrar()
+        assert servidor_push.peticiones == 1
+
+class TestSendToUsers:
+    """Tests del envío a todas las suscripciones de varios usuarios."""
+
+    @pytest.mark.asyncio
+    async def test_aggregates_stats_and_deactivates_gone(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servidor_push,
+        servicio
+    ):
+        """Test: Agrega sent/failed/invalid y solo desactiva las suscripciones caducadas."""
+        otro = usuario(nombre="otro", email="otro@example.com", contrasena="x")
+        test_db_session.add(otro)
+        await test_db_session.commit()
+
+        await crear_suscripcion(test_db_session, test_user.id, f"{servidor_push.url_base}/push/1")
+        caducada = await crear_suscripcion(test_db_session, test_user.id, f"{servidor_push.url_base}/gone/2")
+        con_error = await crear_suscripcion(test_db_session, test_user.id, f"{servidor_push.url_base}/error/3")
+        await crear_suscripcion(test_db_session, otro.id, f"{servidor_push.url_base}/push/4")
+
+        stats = await servicio.send_to_users(test_db_session, [test_user.id, otro.id], "Título", "Cuerpo")
+
+        assert stats == {
+            test_user.id: {"sent": 1, "failed": 2, "invalid": [caducada.id]},
+            otro.id: {"sent": 1, "failed": 0, "invalid": []},
+        }
+        result = await test_db_session.execute(
+            select(push_subscriptions.id).where(push_subscriptions.activa == False)
+        )
+        assert result.scalars().all() == [caducada.id]
+        assert con_error.activa
+
+    @pytest.mark.asyncio
+    async def test_send_to_user_keeps_previous_shape(
+        self,
+        test_db_session: AsyncSession,
+        test_user: usuario,
+        servidor_push,
+        servicio
+    ):
+        """Test: send_to_user retorna las mismas estadísticas que antes."""
+        await crear_suscripcion(test_db_session, test_user.id, f"{servidor_push.url_base}/push/1")
+
+        stats = await servicio.send_to_user(test_db_session, test_user.id, "Título", "Cuerpo")
+
+        assert stats == {"sent": 1, "failed": 0, "invalid": []}
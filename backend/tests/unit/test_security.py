@@ -0,0 +1,57 @@
+"""
+Tests unitarios para el hashing de contraseñas fuera del event loop.
+
+Principios Zen aplicados:
+- La contrapresión se prueba llenando la cola de forma determinista
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app import security
+from app.security import hash_password_async, verify_password, verify_password_async
+
+
+class TestBcryptAsync:
+    """Tests del API async de bcrypt."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_roundtrip(self):
+        """Test: El hash async se verifica igual que el síncrono."""
+        hashed = await hash_password_async("Secreta123")
+
+        assert verify_password("Secreta123", hashed)
+        assert await verify_password_async("Secreta123", hashed)
+        assert not await verify_password_async("Otra123", hashed)
+
+    @pytest.mark.asyncio
+    async def test_runs_off_the_event_loop_thread(self):
+        """Test: La operación corre en un hilo del pool de bcrypt."""
+        hilo = await security._ejecutar_bcrypt(lambda: threading.current_thread().name)
+
+        assert hilo.startswith("bcrypt")
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_with_503(self, monkeypatch):
+        """Test: Con la cola llena se responde 503 en vez de encolar más trabajo."""
+        monkeypatch.setattr(security.settings, "bcrypt_max_pending", 2)
+        liberar = threading.Event()
+
+        ocupadas = [
+            asyncio.create_task(security._ejecutar_bcrypt(liberar.wait))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await hash_password_async("Secreta123")
+
+        liberar.set()
+        await asyncio.gather(*ocupadas)
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "1"}
+        assert security.bcrypt_pendientes() == 0
@@ -0,0 +1,102 @@
+"""
+Tests unitarios para las utilidades de días de hábitos y recordatorios.
+
+Principios Zen aplicados:
+- Casos explícitos, incluidos los JSON inválidos
+"""
+
+from datetime import date, datetime, timezone
+
+from app.utils import (
+    bit_dia,
+    dia_en_mascara,
+    dias_a_mascara,
+    mascara_a_dias,
+    obtener_dia_letra,
+    proximo_recordatorio_utc,
+)
+
+
+class TestMascaraDias:
+    """Tests de conversión entre la lista JSON de días y la máscara de bits."""
+
+    def test_dias_a_mascara_sets_weekday_bits(self):
+        """Test: Cada letra enciende el bit de su weekday()."""
+        assert dias_a_mascara('["L"]') == 0b0000001
+        assert dias_a_mascara('["D"]') == 0b1000000
+        assert dias_a_mascara('["L", "M", "X", "J", "V"]') == 0b0011111
+        assert dias_a_mascara('["L", "M", "X", "J", "V", "S", "D"]') == 0b1111111
+
+    def test_dias_a_mascara_invalid_json_is_empty(self):
+        """Test: Un JSON inválido o vacío no programa ningún día."""
+        assert dias_a_mascara("no es json") == 0
+        assert dias_a_mascara('{"L": true}') == 0
+        assert dias_a_mascara("") == 0
+
+    def test_dias_a_mascara_ignores_unknown_letters(self):
+        """Test: Las letras desconocidas se ignoran."""
+        assert dias_a_mascara('["L", "Z"]') == 0b0000001
+
+    def test_mascara_a_dias_roundtrip(self):
+        """Test: La máscara vuelve a la lista en orden de la semana."""
+        assert mascara_a_dias(dias_a_mascara('["V", "L", "X"]')) == ["L", "X", "V"]
+
+    def test_dia_en_mascara_matches_letter(self):
+        """Test: El chequeo por bits coincide con la letra del día."""
+        mascara = dias_a_mascara('["L", "S"]')
+        # 2024-01-01 fue lunes
+        for offset in range(14):
+            fecha = date(2024, 1, 1 + offset)
+            assert dia_en_mascara(mascara, fecha) == (obtener_dia_letra(fecha) in ("L", "S"))
+            assert bit_dia(fecha) == 1 << fecha.weekday()
+
+
+class TestProximoRecordatorio:
+    """Tests del cálculo del próximo recordatorio en UTC."""
+
+    def test_later_today_or_tomorrow(self):
+        """Test: Si la hora ya pasó hoy, el recordatorio es mañana."""
+        # Santo Domingo es UTC-4 todo el año
+        assert proximo_recordatorio_utc("08:00", "America/Santo_Domingo", datetime(2024, 5, 1, 11, 0)) \
+            == datetime(2024, 5, 1, 12, 0)
+        assert proximo_recordatorio_utc("08:00", "America/Santo_Domingo", datetime(2024, 5, 1, 12, 0)) \
+            == datetime(2024, 5, 2, 12, 0)
+
+    def test_accepts_aware_reference(self):
+        """Test: La referencia puede tener tzinfo; el resultado es UTC sin tzinfo."""
+        despues = datetime(2024, 5, 1, 11, 0, tzinfo=timezone.utc)
+
+        assert proximo_recordatorio_utc("08:00", "America/Santo_Domingo", despues) == datetime(2024, 5, 1, 12, 0)
+
+    def test_keeps_local_time_across_dst(self):
+        """Test: Al cruzar el cambio de horario se mantiene la hora local, no las 24 h UTC."""
+        # Nueva York pasa de UTC-5 a UTC-4 el 2024-03-10
+        antes = proximo_recordatorio_utc("08:00", "America/New_York", datetime(2024, 3, 9, 12, 0))
+        despues = proximo_recordatorio_utc("08:00", "America/New_York", antes)
+
+        assert antes == datetime(2024, 3, 9, 13, 0)
+        assert despues == datetime(2024, 3, 10, 12, 0)
+
+    def test_nonexistent_local_time_moves_forward(self):
+        """Test: Las 02:30 del día del adelanto no existen; se envía a las 03:30 locales."""
+        assert proximo_recordatorio_utc("02:30", "America/New_York", datetime(2024, 3, 10, 0, 0)) \
+            == datetime(2024, 3, 10, 7, 30)
+
+    def test_repeated_local_time_uses_first_occurrence(self):
+        """Test: Las 01:30 del día del atraso ocurren dos veces; se usa la primera y no se repite."""
+        primera = proximo_recordatorio_utc("01:30", "America/New_York", datetime(2024, 11, 3, 0, 0))
+
+        assert primera == datetime(2024, 11, 3, 5, 30)
+        assert proximo_recordatorio_utc("01:30", "America/New_York", primera) == datetime(2024, 11, 4, 6, 30)
+
+    def test_invalid_configuration_returns_none(self):
+        """Test: Una hora o zona inválida no programa recordatorios."""
+        referencia = datetime(2024, 5, 1)
+
+        assert proximo_recordatorio_utc("8am", "America/Santo_Domingo", referencia) is None
+        assert proximo_recordatorio_utc("25:00", "America/Santo_Domingo", referencia) is None
+        assert proximo_recordatorio_utc("08:00", "Marte/Olympus", referencia) is None
+
+    def test_defaults_when_missing(self):
+        """Test: Sin hora ni zona se usan los valores por defecto (08:00, Santo Domingo)."""
+        assert proximo_recordatorio_utc(None, None, datetime(2024, 5, 1)) == datetime(2024, 5, 1, 12, 0)
@@ -162,6 +162,23 @@ export interface RegistroConProgresos extends Registro {
   progresos: ProgresoHabito[];
 }
 
+/**
+ * Vista de un día. Si `virtual` es true el registro aún no existe: los ids son
+ * null y se crea con materializarRegistro() antes de la primera escritura.
+ */
+export interface ProgresoDelDia extends Omit<ProgresoHabito, 'id' | 'registro_id' | 'created_at'> {
+  id: number | null;
+  registro_id: number | null;
+  created_at: string | null;
+}
+
+export interface RegistroDelDia extends Omit<Registro, 'id' | 'created_at'> {
+  id: number | null;
+  created_at: string | null;
+  virtual: boolean;
+  progresos: ProgresoDelDia[];
+}
+
 export interface ProgresoDiaCalendario {
   fecha: string;
   total_habitos: number;
@@ -467,6 +484,36 @@ export async function getRegistroPorFecha(fecha: string): Promise<RegistroConPro
   return response.json();
 }
 
+/**
+ * Obtiene el día sin crear el registro si no existe (solo lectura)
+ */
+export async function getDiaPorFecha(fecha: string): Promise<RegistroDelDia> {
+  const response = await fetchConAuth(`/registros/dia/${fecha}`);
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Error al obtener registro');
+  }
+
+  return response.json();
+}
+
+/**
+ * Crea el registro de una fecha si no existe y lo retorna con sus progresos
+ */
+export async function materializarRegistro(fecha: string): Promise<RegistroConProgresos> {
+  const response = await fetchConAuth(`/registros/fecha/${fecha}`, {
+    method: 'POST',
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Error al crear registro');
+  }
+
+  return response.json();
+}
+
 /**
  * Elimina un registro por su ID
  */
@@ -515,6 +562,30 @@ export async function updateProgreso(
   return response.json();
 }
 
+export interface CambioProgreso {
+  id: number;
+  valor?: number;
+  completado?: boolean;
+}
+
+/**
+ * Aplica varios cambios de progreso en una sola petición (y una sola transacción).
+ * Usa keepalive para que el envío sobreviva al cierre de la página.
+ */
+export async function updateProgresosLote(cambios: CambioProgreso[]): Promise<ProgresoHabito[]> {
+  const response = await fetchConAuth('/registros/progreso/lote', {
+    method: 'PUT',
+    body: JSON.stringify({ cambios }),
+    keepalive: true,
+  });
+
+  if (!response.ok) {
+    throw new Error('Error al actualizar progreso');
+  }
+
+  return response.json();
+}
+
 /**
  * Obtiene el progreso de todos los días de un mes para el calendario
  */
@@ -556,6 +627,54 @@ export async function getProgresoMesHabito(
   return response.json();
 }
 
+/**
+ * Matriz compacta hábitos × días de un mes.
+ * Cada fila tiene un dígito por día: bit 0 = programado, bit 1 = completado.
+ */
+export interface MatrizHabitosMes {
+  fecha_inicio: string;
+  dias: number;
+  habitos: { habito_id: number; estados: string }[];
+}
+
+/**
+ * Obtiene el progreso de varios hábitos en el mes con una sola petición
+ * y lo expande a una lista de días por hábito
+ */
+export async function getProgresoMesHabitos(
+  year: number,
+  month: number,
+  habitoIds: number[]
+): Promise<Map<number, ProgresoHabitoDiaCalendario[]>> {
+  const params = new URLSearchParams();
+  for (const id of habitoIds) {
+    params.append('habito_id', String(id));
+  }
+  const response = await fetchConAuth(`/registros/calendario/${year}/${month}/habitos?${params}`);
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Error al obtener progreso de los hábitos');
+  }
+
+  const matriz: MatrizHabitosMes = await response.json();
+  const prefijoMes = matriz.fecha_inicio.slice(0, 8);
+  const progresos = new Map<number, ProgresoHabitoDiaCalendario[]>();
+
+  for (const { habito_id, estados } of matriz.habitos) {
+    progresos.set(
+      habito_id,
+      Array.from(estados, (estado, i) => ({
+        fecha: `${prefijoMes}${String(i + 1).padStart(2, '0')}`,
+        programado: (Number(estado) & 1) !== 0,
+        completado: (Number(estado) & 2) !== 0,
+      }))
+    );
+  }
+
+  return progresos;
+}
+
 // ==================== Usuarios API ====================
 
 /**